@@ -0,0 +1,188 @@
+"""Reuse of earlier answers to recurring application questions.
+
+Questions like "Why do you want to work at X?" come up on almost every
+application. Answers are remembered per owner (user or guest session) and
+scope (company, role, resume and the notes given for the question). A new
+question is matched against the owner's earlier questions in that scope with
+TF-IDF cosine similarity over character shingles of the question's content
+words. This tolerates rewording ("Describe a challenge you overcame" /
+"Describe a challenge you have overcome") without calling the model. A close match is offered as a starting point; the user
+can still ask for a fresh answer.
+
+With a shared key-value store, each owner's answers are kept under
+`answers:<owner>` (with a TTL) instead of in this process, so every replica
+sees them. While the store is unreachable, answers are kept and looked up in
+this process instead, and the failures are counted.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from kv_store import pack, unpack
+from prefetch import input_key
+
+SHINGLE_SIZE = 3
+
+_WORD = re.compile(r"[a-z0-9']+")
+# Filler that nearly every application question shares; left in, it makes unrelated questions look alike
+_STOPWORDS = frozenset(
+    "a about an and are as at be can describe did do does for from have how i in is it me of on or "
+    "our please share tell that the this time to us was we what when where which who why will with "
+    "would you your".split()
+)
+
+
+def normalize_question(question, company_name=""):
+    """Lowercased content words, with the company's name replaced by a placeholder."""
+    text = (question or "").lower()
+    company = (company_name or "").strip().lower()
+    if company:
+        text = text.replace(company, " company ")
+    return " ".join(word for word in _WORD.findall(text) if word not in _STOPWORDS)
+
+
+def question_shingles(normalized):
+    """Character n-grams of each word, padded so short words still count."""
+    grams = Counter()
+    for word in normalized.split():
+        padded = f" {word} "
+        for i in range(max(1, len(padded) - SHINGLE_SIZE + 1)):
+            grams[padded[i:i + SHINGLE_SIZE]] += 1
+    return grams
+
+
+def answer_scope(company_name, role_title, resume_hash, question_notes=""):
+    """Key for the answers that are interchangeable: same company, role, resume and notes."""
+    return input_key(
+        " ".join((company_name or "").lower().split()),
+        " ".join((role_title or "").lower().split()),
+        resume_hash,
+        " ".join((question_notes or "").split()),
+    )
+
+
+class _Entry:
+    def __init__(self, question, normalized, answer, saved_at=None):
+        self.question = question
+        self.normalized = normalized
+        self.shingles = question_shingles(normalized)
+        self.answer = answer
+        self.saved_at = time.time() if saved_at is None else saved_at
+
+
+class AnswerCache:
+    """Per-owner answers with a small TF-IDF index over their questions."""
+
+    def __init__(self, threshold=0.7, max_per_owner=50, max_owners=2000, kv=None, ttl=86400):
+        self.threshold = threshold
+        self._max_per_owner = max_per_owner
+        self._max_owners = max_owners
+        self._kv = kv
+        self._ttl = ttl
+        self._owners = OrderedDict()  # owner -> list of (scope, _Entry), oldest first; with kv, only during outages
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "stored": 0, "shared_errors": 0}
+
+    def _local_entries(self, owner):
+        with self._lock:
+            return list(self._owners.get(owner, ()))
+
+    def _shared_entries(self, owner):
+        rows = unpack(self._kv.get(f"answers:{owner}")) or []
+        return [(scope, _Entry(question, normalized, answer, saved_at))
+                for scope, question, normalized, answer, saved_at in rows]
+
+    def _entries(self, owner):
+        if self._kv is None:
+            return self._local_entries(owner)
+        try:
+            return self._shared_entries(owner) + self._local_entries(owner)
+        except Exception:
+            with self._lock:
+                self.stats["shared_errors"] += 1
+            return self._local_entries(owner)
+
+    @staticmethod
+    def _weights(shingles, document_frequency, documents):
+        # Smoothed IDF, so a shingle that appears in every question still counts a little
+        weights = {
+            gram: count * (math.log((1 + documents) / (1 + document_frequency.get(gram, 0))) + 1)
+            for gram, count in shingles.items()
+        }
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return weights, norm
+
+    def lookup(self, owner, scope, question, company_name=""):
+        """Best earlier answer in `scope` as {"question", "answer", "score", "saved_at"}, or None."""
+        normalized = normalize_question(question, company_name)
+        with self._lock:
+            self.stats["lookups"] += 1
+        entries = self._entries(owner)
+        if not normalized or not entries:
+            return None
+
+        # IDF over all of the owner's questions, so their recurring phrasing carries less weight
+        document_frequency = Counter()
+        for _, entry in entries:
+            document_frequency.update(entry.shingles.keys())
+        documents = len(entries)
+        query, query_norm = self._weights(question_shingles(normalized), document_frequency, documents)
+
+        best, best_score = None, 0.0
+        for entry_scope, entry in entries:
+            if entry_scope != scope:
+                continue
+            if entry.normalized == normalized:
+                best, best_score = entry, 1.0
+                break
+            weights, norm = self._weights(entry.shingles, document_frequency, documents)
+            if not norm or not query_norm:
+                continue
+            dot = sum(weight * weights.get(gram, 0.0) for gram, weight in query.items())
+            score = dot / (norm * query_norm)
+            if score > best_score:
+                best, best_score = entry, score
+
+        if best is None or best_score < self.threshold:
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return {"question": best.question, "answer": best.answer, "score": best_score, "saved_at": best.saved_at}
+
+    def store(self, owner, scope, question, answer, company_name=""):
+        """Remember `answer`, replacing any earlier answer to the same normalized question."""
+        normalized = normalize_question(question, company_name)
+        if not normalized or not answer:
+            return
+        if self._kv is not None:
+            try:
+                # Read-modify-write; one owner rarely answers on two replicas at the same moment
+                entries = [(s, e) for s, e in self._shared_entries(owner) if not (s == scope and e.normalized == normalized)]
+                entries.append((scope, _Entry(question, normalized, answer)))
+                rows = [[s, e.question, e.normalized, e.answer, e.saved_at] for s, e in entries[-self._max_per_owner:]]
+                self._kv.set(f"answers:{owner}", pack(rows), ex=self._ttl)
+                with self._lock:
+                    self.stats["stored"] += 1
+                return
+            except Exception:
+                # Keep it in this process until the store is back
+                with self._lock:
+                    self.stats["shared_errors"] += 1
+        with self._lock:
+            entries = self._owners.setdefault(owner, [])
+            self._owners.move_to_end(owner)
+            entries[:] = [(s, e) for s, e in entries if not (s == scope and e.normalized == normalized)]
+            entries.append((scope, _Entry(question, normalized, answer)))
+            del entries[:-self._max_per_owner]
+            while len(self._owners) > self._max_owners:
+                self._owners.popitem(last=False)
+            self.stats["stored"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            if self._kv is not None:
+                return {**self.stats, "shared": True, "local_answers": sum(len(e) for e in self._owners.values())}
+            return {**self.stats, "owners": len(self._owners), "answers": sum(len(e) for e in self._owners.values())}
@@ -3,32 +3,565 @@ import streamlit as st
 # MUST be the first Streamlit command
 st.set_page_config(page_title="AI-Powered Application Assistant", page_icon="🤖", layout="wide")
 
+import functools
 import json
 import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from anthropic import Anthropic
 from dotenv import load_dotenv
-import PyPDF2
-from docx import Document
-from docx.shared import Pt, Inches
-from fpdf import FPDF
 import io
+import tempfile
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from hedging import HedgedCaller
+from prefetch import SpeculativePrefetcher, input_key
+from normalize import TextNormalizer
+from dedupe import apply_delta, lsh_bands, make_delta, minhash_signature, similarity
+from letter_parts import join_letter, paragraph_role, parse_letter
+from codec import decode_text, encode_text, is_encoded, plain_size
+from client_pool import ClientPool
+from session_store import SessionFootprints, TextMissing, TextStore, deep_sizeof
+from export_engine import ExportEngine
+from bulk_export import archive_name, write_history_zip
+from resume_parser import ResumeParseCache, compact_resume, rendering_complete, suggest_highlights, text_hash
+from resume_ranker import ensure_term_vector, rank_resumes
+from rerun_timing import RerunTimings
+from db_guard import CircuitBreaker, DatabaseUnavailable, DBGuard
+from storage import SQLiteStorage, SupabaseStorage
+from fair_share import FairScheduler, KVQuotaStore, MemoryQuotaStore, QuotaExceeded, SchedulerBusy, SQLiteQuotaStore
+from answer_cache import AnswerCache, answer_scope
+from prompts import cover_letter_request
+from letter_check import ValidationStats, body_word_range, check_letter, local_fixes
+from warmup import Warmer
+from kv_store import DurableState, connect as connect_kv
+
+# Start of this full script run (fragment reruns don't execute module level)
+RUN_STARTED = time.perf_counter()
 
 # Load environment variables
 load_dotenv()
 
+
+def get_setting(name, default=None):
+    """Read a setting from Streamlit secrets, falling back to the environment."""
+    return st.secrets.get(name, os.getenv(name, default))
+
+
+def setting_enabled(name, default="false"):
+    """Read a boolean setting (true/1/yes/on)."""
+    return str(get_setting(name, default)).strip().lower() in ("true", "1", "yes", "on")
+
+
+# Where app data lives: "supabase" (default) or "sqlite" for a local single-node database
+STORAGE_BACKEND = str(get_setting("STORAGE_BACKEND", "supabase")).strip().lower()
+
+# Deadline for one Supabase call; the HTTP timeout is looser so an abandoned call still frees its thread
+DB_TIMEOUT_SECONDS = float(get_setting("DB_TIMEOUT_SECONDS", "5"))
+
+
+# Shared state for running several replicas: a Redis-protocol URL, memory:// for the in-process stand-in, unset to keep it all in this process
+STATE_STORE_URL = get_setting("STATE_STORE_URL")
+
+# How long durable session fields, shared text, answers and quota windows live without use
+STATE_TTL_SECONDS = int(get_setting("STATE_TTL_SECONDS", "86400"))
+
+
+@st.cache_resource
+def init_kv():
+    """Connect to the shared key-value store, or None when STATE_STORE_URL isn't set."""
+    return connect_kv(STATE_STORE_URL) if STATE_STORE_URL else None
+
+
 # Initialize Supabase client
 @st.cache_resource
 def init_supabase():
     """Initialize Supabase client with credentials from secrets or env."""
     url = st.secrets.get("SUPABASE_URL", os.getenv("SUPABASE_URL"))
     key = st.secrets.get("SUPABASE_KEY", os.getenv("SUPABASE_KEY"))
-    return create_client(url, key)
+    return create_client(url, key, options=ClientOptions(postgrest_client_timeout=DB_TIMEOUT_SECONDS * 3))
 
 supabase: Client = init_supabase()
 
 
+@st.cache_resource
+def init_client_pool():
+    """Initialize the bounded pool of per-user authenticated Supabase clients."""
+    url = st.secrets.get("SUPABASE_URL", os.getenv("SUPABASE_URL"))
+    key = st.secrets.get("SUPABASE_KEY", os.getenv("SUPABASE_KEY"))
+
+    def factory():
+        # The pool refreshes tokens itself, so clients don't start refresh timers
+        return create_client(url, key, options=ClientOptions(
+            auto_refresh_token=False, persist_session=False, postgrest_client_timeout=DB_TIMEOUT_SECONDS * 3
+        ))
+
+    return ClientPool(
+        factory,
+        max_clients=int(get_setting("SUPABASE_POOL_SIZE", "200")),
+        idle_timeout=float(get_setting("SUPABASE_POOL_IDLE_SECONDS", "1800"))
+    )
+
+
+def get_db():
+    """Supabase client for this session: the user's pooled client, or the shared anonymous one."""
+    if "user" in st.session_state and "auth_tokens" in st.session_state:
+        client, tokens = init_client_pool().get(st.session_state["user"].id, st.session_state["auth_tokens"])
+        st.session_state["auth_tokens"] = tokens
+        return client
+    return supabase
+
+
+# Shared across sessions so every user sees the same breaker state
+@st.cache_resource
+def init_db_guard():
+    """Initialize the deadline, circuit breaker and degraded-mode cache for Supabase calls."""
+    return DBGuard(
+        timeout=DB_TIMEOUT_SECONDS,
+        breaker=CircuitBreaker(
+            slow_call=float(get_setting("DB_SLOW_CALL_SECONDS", "2")),
+            reset_timeout=float(get_setting("DB_BREAKER_RESET_SECONDS", "30"))
+        ),
+        cache_bytes=int(get_setting("DB_CACHE_MAX_MB", "64")) * 1024 * 1024,
+        queue_size=int(get_setting("DB_WRITE_QUEUE_SIZE", "500"))
+    )
+
+
+@st.cache_resource
+def init_sqlite_storage():
+    """Open the local SQLite database (STORAGE_BACKEND=sqlite), creating its schema."""
+    return SQLiteStorage(get_setting("SQLITE_PATH", "cover_letter_generator.db"))
+
+
+def get_storage():
+    """Storage for this session: the local SQLite database, or Supabase through get_db()."""
+    if STORAGE_BACKEND == "sqlite":
+        return init_sqlite_storage()
+    return SupabaseStorage(get_db())
+
+
+def guarded_read(key, query, default=None):
+    """Run `query(store)` under the DB guard. Returns (data, fresh).
+
+    While the database is failing or slow, returns the last data loaded for
+    `key` (or `default`). Storage is resolved here because the guard's
+    worker threads can't read session state.
+    """
+    guard = init_db_guard()
+    try:
+        store = get_storage()
+    except Exception:
+        return guard.stale(key, default)
+    return guard.read(key, lambda: query(store), default)
+
+
+def guarded_reads(reads):
+    """Run independent reads concurrently under the DB guard.
+
+    `reads` maps a name to (key, query, default) as guarded_read takes them;
+    returns name -> (data, fresh). Each query is timed into
+    init_sidebar_load_timings() under its name.
+    """
+    guard = init_db_guard()
+    try:
+        store = get_storage()
+    except Exception:
+        return {name: guard.stale(key, default) for name, (key, _, default) in reads.items()}
+    timings = init_sidebar_load_timings()
+
+    def timed(name, query):
+        def run():
+            with timings.measure(name):
+                return query(store)
+        return run
+
+    return guard.read_many({name: (key, timed(name, query), default) for name, (key, query, default) in reads.items()})
+
+
+def guarded_write(description, write):
+    """Run `write(store)` under the DB guard, queueing it while the database is unavailable.
+
+    Raises on errors from the database and on missed deadlines; returns True
+    once the write is saved or queued.
+    """
+    store = get_storage()
+    if init_db_guard().write(description, lambda: write(store)) == "queued":
+        st.toast(f"The database is unavailable, so your {description} was queued. It will be saved when the connection recovers.")
+    return True
+
+
+# Shared across sessions so latency samples, hedge budget and metrics are global
+@st.cache_resource
+def init_hedger():
+    """Initialize the hedged-request caller with settings from secrets or env."""
+    return HedgedCaller(
+        enabled=setting_enabled("HEDGE_ENABLED"),
+        percentile=float(get_setting("HEDGE_PERCENTILE", "95")),
+        budget_ratio=float(get_setting("HEDGE_BUDGET", "0.05")),
+        initial_deadline=float(get_setting("HEDGE_INITIAL_DEADLINE", "4.0"))
+    )
+
+
+# Keep-warm interval for pooled connections; WARM_INTERVAL_SECONDS=0 only warms once
+WARM_INTERVAL_SECONDS = float(get_setting("WARM_INTERVAL_SECONDS", "240"))
+
+
+# One client per process, so calls reuse pooled keep-alive connections instead of a new TLS handshake each
+@st.cache_resource
+def init_anthropic():
+    """Initialize the shared Anthropic client (the SDK is imported here, off the first render)."""
+    import anthropic
+    import httpx
+
+    return anthropic.Anthropic(
+        api_key=os.getenv("ANTHROPIC_API_KEY"),
+        http_client=anthropic.DefaultHttpxClient(limits=httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=20,
+            # Outlive the keep-warm interval, so the warm-up ping keeps the connection open
+            keepalive_expiry=WARM_INTERVAL_SECONDS + 60
+        ))
+    )
+
+
+def create_message(client, **request):
+    """Call messages.create, hedging slow first tokens when HEDGE_ENABLED is set."""
+    return init_hedger().create(client, **request)
+
+
+# Shared across sessions so quotas and the wait queue cover every user
+@st.cache_resource
+def init_llm_scheduler():
+    """Initialize the fair-share scheduler for interactive Claude calls.
+
+    Quota hits go to the shared store when STATE_STORE_URL is set, so every
+    replica counts against one quota. Otherwise they stay in memory unless
+    QUOTA_DB_PATH names a SQLite file shared by every app process on the host.
+    """
+    quota_path = get_setting("QUOTA_DB_PATH")
+    if init_kv() is not None:
+        quota_store = KVQuotaStore(init_kv())
+    else:
+        quota_store = SQLiteQuotaStore(quota_path) if quota_path else MemoryQuotaStore()
+    return FairScheduler(
+        max_concurrent=int(get_setting("LLM_MAX_CONCURRENT", "8")),
+        quota_store=quota_store,
+        timeout=float(get_setting("LLM_QUEUE_TIMEOUT_SECONDS", "120"))
+    )
+
+
+def request_owner():
+    """Quota owner for this session: the signed-in user, else the guest's IP.
+
+    Clients can set X-Forwarded-For freely, so only the entry appended by our
+    own proxies (TRUSTED_PROXY_HOPS from the right) is used. Guests whose IP
+    is unknown share one owner, so a new session never means a new quota.
+    """
+    if "user" in st.session_state:
+        return f"user:{st.session_state['user'].id}"
+    ip = getattr(st.context, "ip_address", None)
+    hops = int(get_setting("TRUSTED_PROXY_HOPS", "0"))
+    if hops > 0:
+        forwarded = st.context.headers.get("X-Forwarded-For", "") if st.context.headers else ""
+        entries = [entry.strip() for entry in forwarded.split(",") if entry.strip()]
+        if len(entries) >= hops:
+            ip = entries[-hops]
+    return f"guest:{ip or 'unknown'}"
+
+
+def quota_limit(owner):
+    """Generations `owner` may start per quota window."""
+    if owner.startswith("user:"):
+        return int(get_setting("QUOTA_USER_LIMIT", "60"))
+    return int(get_setting("QUOTA_GUEST_LIMIT", "15"))
+
+
+@contextmanager
+def llm_turn():
+    """Count one generation against this session's quota, then wait for a fair-share slot.
+
+    Shows the queue position while waiting. Raises QuotaExceeded or SchedulerBusy;
+    a request that never gets a slot has its quota hit refunded.
+    """
+    owner = request_owner()
+    scheduler = init_llm_scheduler()
+    receipt = scheduler.check_quota(owner, quota_limit(owner), float(get_setting("QUOTA_WINDOW_SECONDS", "3600")))
+    granted = False
+
+    status = st.empty()
+
+    def show_position(position, queued):
+        status.info(f"High demand right now: you're #{position + 1} in line ({queued} waiting). Your request will start automatically.")
+
+    try:
+        with scheduler.turn(owner, on_wait=show_position):
+            granted = True
+            status.empty()
+            yield
+    finally:
+        if not granted:
+            scheduler.refund_quota(owner, receipt)
+        status.empty()
+
+
+# ===== SESSION STATE =====
+
+# Oldest items are dropped from the application session beyond this many
+APPLICATION_SESSION_MAX_ITEMS = int(get_setting("APPLICATION_SESSION_MAX_ITEMS", "20"))
+
+
+@st.cache_resource
+def init_text_store():
+    """Initialize the process-wide deduplicated store for large session text (backed by the shared store if set)."""
+    return TextStore(
+        max_bytes=int(get_setting("TEXT_STORE_MAX_MB", "256")) * 1024 * 1024,
+        kv=init_kv(),
+        ttl=STATE_TTL_SECONDS
+    )
+
+
+@st.cache_resource
+def init_session_footprints():
+    """Initialize the registry of per-session state sizes."""
+    return SessionFootprints()
+
+
+def text_holder():
+    """This session's id, which keeps the text it uses from being evicted from the text store."""
+    return st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+
+def put_text(text):
+    """Store text in the shared text store for this session. Returns its reference."""
+    return init_text_store().put(text, holder=text_holder())
+
+
+def set_session_text(name, text):
+    """Keep large text in the shared text store; the session holds only a hash reference."""
+    st.session_state[f"{name}_ref"] = put_text(text)
+
+
+def get_session_text(name):
+    """Read text saved with set_session_text.
+
+    If the text is gone (evicted after the session sat idle), the reference
+    is dropped and the user is asked to enter it again.
+    """
+    try:
+        return init_text_store().get(st.session_state.get(f"{name}_ref"), holder=text_holder())
+    except TextMissing:
+        st.session_state.pop(f"{name}_ref", None)
+        st.warning(f"Your {name.replace('_text', '').replace('_', ' ')} is no longer available. Please enter it again.")
+        return ""
+
+
+def expand_generation_data(gen_data):
+    """Resolve the text references in last_generation_data into a plain dict.
+
+    Text that is gone is left out and its field listed under "missing_text".
+    """
+    expanded = {k: v for k, v in gen_data.items() if not k.endswith("_ref")}
+    missing = []
+    for key, ref in gen_data.items():
+        if key.endswith("_ref"):
+            try:
+                expanded[key[:-len("_ref")]] = init_text_store().get(ref, holder=text_holder())
+            except TextMissing:
+                missing.append(key[:-len("_ref")])
+    if missing:
+        expanded["missing_text"] = missing
+    return expanded
+
+
+# Session fields kept in the shared store (STATE_STORE_URL), so a restart or a move to
+# another replica doesn't lose the letter, answers or application session in progress
+DURABLE_FIELDS = (
+    "show_app", "guest_mode", "first_time_user",
+    "candidate_name", "candidate_address", "resume_text_ref",
+    "company_name_key", "role_title_key", "job_description_key", "additional_context_key", "resume_highlight_general",
+    "application_session", "last_cover_letter", "last_generation_data", "last_letter_issues",
+    "last_app_question", "last_app_answer", "last_app_request", "last_app_reused",
+)
+
+_GUEST_TOKEN = re.compile(r"^[0-9a-f]{32}$")
+
+# Cookie holding a guest's durable-state token
+GUEST_COOKIE = "guest_sid"
+
+
+@st.cache_resource
+def init_durable_state():
+    """Initialize durable session fields in the shared store, or None without STATE_STORE_URL."""
+    kv = init_kv()
+    return DurableState(kv, ttl=STATE_TTL_SECONDS) if kv is not None else None
+
+
+def remember_guest_token(token):
+    """Keep the guest's token in a first-party cookie (once per session), never in the URL.
+
+    Streamlit can read cookies but not set them, so a small script sets it
+    in the page. Later sessions in this browser, on any replica, send it
+    when they connect.
+    """
+    if st.session_state.get("guest_cookie") == token:
+        return
+    # window.parent is the app page both inline (st.html) and from the older iframe component
+    script = (
+        "<script>"
+        "const secure = window.parent.location.protocol === 'https:' ? '; Secure' : '';"
+        f"window.parent.document.cookie = '{GUEST_COOKIE}={token}; Max-Age={STATE_TTL_SECONDS}; Path=/; SameSite=Lax' + secure;"
+        "</script>"
+    )
+    try:
+        st.html(script, unsafe_allow_javascript=True)
+    except TypeError:
+        # Streamlit versions before st.html could run scripts
+        import streamlit.components.v1 as components
+
+        components.html(script, height=0)
+    st.session_state["guest_cookie"] = token
+
+
+def durable_owner():
+    """Whose durable state this session holds: the signed-in user, else the guest's token.
+
+    Sign-in lives in the session, so after a restart a user signs in again to
+    get their state back. A guest's token is kept in a cookie, which survives
+    reloads and reconnecting to another replica but isn't part of any link
+    the guest shares, and doubles as the guest's session id.
+    """
+    if "user" in st.session_state:
+        return f"user:{st.session_state['user'].id}"
+    token = (st.context.cookies or {}).get(GUEST_COOKIE, "")
+    if not _GUEST_TOKEN.match(token):
+        token = st.session_state.get("session_id", "")
+        if not _GUEST_TOKEN.match(token):
+            token = uuid.uuid4().hex
+        remember_guest_token(token)
+    st.session_state["session_id"] = token
+    return f"guest:{token}"
+
+
+def restore_durable_state():
+    """Fill a new session from the shared store, and again whenever the owner changes (sign-in/out)."""
+    durable = init_durable_state()
+    if durable is None:
+        return
+    owner = durable_owner()
+    previous = st.session_state.get("durable_owner")
+    if previous == owner:
+        return
+    if previous and previous.startswith("user:"):
+        # Signed out: the user's work must not be saved under the guest's token
+        for field in DURABLE_FIELDS:
+            st.session_state.pop(field, None)
+    try:
+        values, digests = durable.load(owner, DURABLE_FIELDS)
+    except Exception:
+        # Store unreachable: carry on with this process's state; the next save rewrites every field
+        values, digests = {}, {}
+    for field, value in values.items():
+        st.session_state.setdefault(field, value)
+    st.session_state["durable_owner"] = owner
+    st.session_state["durable_digests"] = digests
+    st.session_state["durable_touched"] = time.time()
+
+
+def save_durable_state():
+    """Write the durable fields that changed in this run (unchanged ones only get their TTL refreshed now and then)."""
+    durable = init_durable_state()
+    owner = st.session_state.get("durable_owner")
+    if durable is None or owner is None:
+        return
+    values = {field: st.session_state.get(field) for field in DURABLE_FIELDS}
+    try:
+        digests = durable.save(owner, values, st.session_state.get("durable_digests", {}))
+        st.session_state["durable_digests"] = digests
+        if time.time() - st.session_state.get("durable_touched", 0) > STATE_TTL_SECONDS / 4:
+            durable.touch(owner, list(digests))
+            st.session_state["durable_touched"] = time.time()
+    except Exception:
+        # The session still holds everything; the next run tries again
+        pass
+
+
+def set_cover_letter(letter):
+    """Make `letter` the current cover letter, including the one shown in the letter's text area."""
+    st.session_state["last_cover_letter"] = letter
+    # A keyed text area keeps its first value, so drop it to show the new letter
+    st.session_state.pop("generated_cl", None)
+
+
+def track_application_item(item_type, content):
+    """Add an item to the application session, evicting the oldest beyond the cap."""
+    items = st.session_state.setdefault("application_session", [])
+    items.append({
+        "type": item_type,
+        "content": content,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    })
+    del items[:-APPLICATION_SESSION_MAX_ITEMS]
+
+
+def record_session_footprint():
+    """Measure this session's state and report it to the shared registry. Returns bytes."""
+    session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    nbytes = deep_sizeof({key: st.session_state[key] for key in st.session_state.keys()})
+    init_session_footprints().record(session_id, nbytes)
+    return nbytes
+
+
+@st.cache_resource
+def init_rerun_timings():
+    """Rerun durations per scope (full app run or one page section), shared by all sessions."""
+    return RerunTimings()
+
+
+def page_section(name):
+    """Run a page section as a fragment and time each of its runs.
+
+    Widgets inside a fragment rerun only that fragment, so editing one section
+    doesn't rerun the sidebar's database reads or the other sections.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            with init_rerun_timings().measure(name):
+                result = func(*args, **kwargs)
+            # A full run saves once at its end; a rerun of just this section saves here
+            ctx = get_script_run_ctx()
+            if ctx and ctx.fragment_ids_this_run:
+                save_durable_state()
+            return result
+        return st.fragment(timed)
+    return decorate
+
+
+def rerun_section():
+    """Rerun only the current section (the whole app if this is a full run)."""
+    ctx = get_script_run_ctx()
+    st.rerun(scope="fragment" if ctx and ctx.fragment_ids_this_run else "app")
+
+
+def job_inputs():
+    """Current form values from session state, so each section sees the others' latest input."""
+    highlight = st.session_state.get("resume_highlight_general", "")
+    return {
+        "candidate_name": st.session_state.get("candidate_name", ""),
+        "candidate_address": st.session_state.get("candidate_address", ""),
+        "resume_text": get_session_text("resume_text"),
+        "company_name": st.session_state.get("company_name_key", ""),
+        "role_title": st.session_state.get("role_title_key", ""),
+        "job_description": st.session_state.get("job_description_key", ""),
+        "additional_context": st.session_state.get("additional_context_key", ""),
+        "resume_highlight": "\n".join([highlight] + st.session_state.get("suggested_highlights", [])).strip(),
+    }
+
+
 # ===== AUTHENTICATION FUNCTIONS =====
 
 def check_auth():
@@ -41,8 +574,10 @@ def check_auth():
 def login_user(email, password):
     """Login user with email and password."""
     try:
-        response = supabase.auth.sign_in_with_password({"email": email, "password": password})
-        st.session_state["user"] = response.user
+        # Each user signs in on their own pooled client so auth state is never shared
+        user, tokens = init_client_pool().sign_in(email, password)
+        st.session_state["user"] = user
+        st.session_state["auth_tokens"] = tokens
         return True, "Login successful!"
     except Exception as e:
         return False, str(e)
@@ -51,10 +586,11 @@ def login_user(email, password):
 def signup_user(email, password):
     """Sign up new user with email and password."""
     try:
-        response = supabase.auth.sign_up({"email": email, "password": password})
+        client = init_client_pool().new_client()
+        response = client.auth.sign_up({"email": email, "password": password})
         if response.user:
             # Create profile entry
-            supabase.table("profiles").insert({
+            client.table("profiles").insert({
                 "id": response.user.id,
                 "linkedin_url": "",
                 "github_url": "",
@@ -71,9 +607,10 @@ def signup_user(email, password):
 def logout_user():
     """Logout current user."""
     try:
-        supabase.auth.sign_out()
         if "user" in st.session_state:
+            init_client_pool().release(st.session_state["user"].id)
             del st.session_state["user"]
+        st.session_state.pop("auth_tokens", None)
         return True
     except:
         return False
@@ -143,124 +680,353 @@ def show_auth_page():
                 st.error("Please fill in all fields")
 
 
-# Files for data storage (legacy - keeping for now)
-RESUME_FILE = "resumes.json"
-COVER_LETTER_FILE = "cover_letters.json"
-RATINGS_FILE = "ratings.json"
-PROFILE_FILE = "profile.json"
-RESUME_FOLDER = "saved_resumes"
+# Cover letter search results shown per page in the sidebar
+HISTORY_PAGE_SIZE = 10
 
-# Create resume folder if it doesn't exist
-if not os.path.exists(RESUME_FOLDER):
-    os.makedirs(RESUME_FOLDER)
+# Estimated similarity above which saving a cover letter asks about duplicates
+DUPLICATE_THRESHOLD = float(get_setting("DUPLICATE_THRESHOLD", "0.8"))
 
 
 # ===== DATABASE FUNCTIONS =====
 
-def load_profile(user_id):
-    """Load user profile from Supabase."""
-    try:
-        response = supabase.table("profiles").select("*").eq("id", user_id).execute()
-        if response.data and len(response.data) > 0:
-            return response.data[0]
-        # Return default profile if none exists
-        return {
-            "linkedin_url": "",
-            "github_url": "",
-            "portfolio_url": "",
-            "candidate_name": "",
-            "candidate_address": "",
-            "default_length": "concise",
-            "default_tone": "conversational"
-        }
-    except:
-        return {
-            "linkedin_url": "",
-            "github_url": "",
-            "portfolio_url": "",
-            "candidate_name": "",
-            "candidate_address": "",
-            "default_length": "concise",
-            "default_tone": "conversational"
-        }
+# Columns read for cover letter history (skips search/signature columns)
+COVER_LETTER_COLUMNS = "id, user_id, company, role, cover_letter, date_created, reference_id, delta"
 
+# Columns read for the resume list (structured model only, no raw text)
+RESUME_LIST_COLUMNS = "id, resume_name, resume_address, date_saved, text_hash, structured"
 
-def save_profile(user_id, profile_data):
-    """Save user profile to Supabase."""
-    try:
-        # Check if profile exists
-        existing = supabase.table("profiles").select("id").eq("id", user_id).execute()
 
-        profile_data["id"] = user_id
+def compress_fields(data, *fields):
+    """Compress large text fields in place when STORAGE_COMPRESSION is gzip or zstd.
 
-        if existing.data and len(existing.data) > 0:
-            # Update existing profile
-            supabase.table("profiles").update(profile_data).eq("id", user_id).execute()
-        else:
-            # Insert new profile
-            supabase.table("profiles").insert(profile_data).execute()
-        return True
+    Returns the plain text of the fields that were compressed.
+    """
+    algorithm = str(get_setting("STORAGE_COMPRESSION", "off")).lower()
+    compressed = {}
+    if algorithm in ("gzip", "zstd"):
+        for field in fields:
+            value = data.get(field)
+            if value:
+                data[field] = encode_text(value, algorithm)
+                if data[field] is not value:
+                    compressed[field] = value
+    return compressed
+
+
+def row_text(row, field):
+    """Plain text of a stored field, decompressed on first access only."""
+    value = row.get(field)
+    if is_encoded(value):
+        value = decode_text(value)
+        row[field] = value
+    return value or ""
+
+
+@st.cache_resource
+def init_egress_stats():
+    """Per-table read egress counters shared by all sessions."""
+    return {}
+
+
+def record_egress(table, rows):
+    """Track bytes read from a table versus their uncompressed size."""
+    transferred = len(json.dumps(rows, default=str))
+    uncompressed = transferred
+    for row in rows:
+        for value in row.values():
+            if is_encoded(value):
+                uncompressed += plain_size(value) - len(value)
+    stats = init_egress_stats().setdefault(table, {"reads": 0, "bytes_transferred": 0, "bytes_uncompressed": 0})
+    stats["reads"] += 1
+    stats["bytes_transferred"] += transferred
+    stats["bytes_uncompressed"] += uncompressed
+    return rows
+
+# Profile used when none is saved (and for guests)
+DEFAULT_PROFILE = {
+    "linkedin_url": "",
+    "github_url": "",
+    "portfolio_url": "",
+    "candidate_name": "",
+    "candidate_address": "",
+    "default_length": "concise",
+    "default_tone": "conversational"
+}
+
+
+def profile_read(user_id):
+    return ("profile", user_id), lambda store: store.get_profile(user_id), None
+
+
+def load_profile(user_id, loaded=None):
+    """Load user profile from storage (or finish one `loaded` by load_sidebar_data)."""
+    profile, _ = loaded or guarded_read(*profile_read(user_id))
+    # A fresh dict (callers edit it before saving), with defaults for unset fields
+    return {**DEFAULT_PROFILE, **{key: value for key, value in (profile or {}).items() if value is not None}}
+
+
+def save_profile(user_id, profile_data):
+    """Save user profile to storage."""
+    try:
+        return guarded_write("profile", lambda store: store.save_profile(user_id, profile_data))
     except Exception as e:
         st.error(f"Error saving profile: {str(e)}")
         return False
 
 
-def load_resumes(user_id):
-    """Load all saved resumes from Supabase for this user."""
-    try:
-        response = supabase.table("resumes").select("*").eq("user_id", user_id).order("date_saved", desc=True).execute()
-        return response.data if response.data else []
-    except:
-        return []
+@st.cache_resource
+def init_resume_parser():
+    """Initialize the shared structured-resume cache (keyed by text hash)."""
+    return ResumeParseCache()
+
+
+def resumes_read(user_id, columns=RESUME_LIST_COLUMNS):
+    return ("resumes", user_id, columns), lambda store: store.list_resumes(user_id, columns), []
+
+
+def load_resumes(user_id, columns=RESUME_LIST_COLUMNS, loaded=None):
+    """Load all saved resumes for this user, newest first.
+
+    By default only the structured parts are read; use load_resume_text for
+    the raw text of a selected resume.
+    """
+    resumes, fresh = loaded or guarded_read(*resumes_read(user_id, columns))
+    if fresh and resumes:
+        parser = init_resume_parser()
+        for resume in resumes:
+            parser.prime(resume.get("text_hash"), resume.get("structured"))
+        record_egress("resumes", resumes)
+    return resumes or []
+
+
+def load_resume_text(user_id, resume_id):
+    """Load the raw text of one saved resume."""
+    resume, fresh = guarded_read(
+        ("resume_text", user_id, resume_id),
+        lambda store: store.get_resume(user_id, resume_id, "id, resume_text")
+    )
+    if fresh and resume:
+        record_egress("resumes", [resume])
+    return row_text(resume, "resume_text") if resume else ""
+
+
+def structure_resume(resume_text):
+    """Return (text_hash, structured) for resume text, parsing only new text."""
+    return init_resume_parser().get(resume_text or "")
+
+
+def suggest_resume(saved_resumes, resume_options):
+    """Preselect the saved resume that best matches the job description, once per job description.
+
+    The match (with the terms behind it) is kept in session state for the
+    sidebar to explain. Choosing another resume afterwards sticks until the
+    job description or the saved resumes change. A resume the user entered
+    themselves under "Enter new resume" is never replaced; the match is only
+    suggested.
+    """
+    if len(saved_resumes) < 2:
+        for key in ("resume_ranked_for", "resume_ranked_jd", "resume_match"):
+            st.session_state.pop(key, None)
+        return
+    job_description = st.session_state.get("job_description_key", "")
+    ranked_jd = input_key(job_description)
+    ranked_for = input_key(ranked_jd, *(str(resume["id"]) for resume in saved_resumes))
+    if st.session_state.get("resume_ranked_for") == ranked_for:
+        return
+    st.session_state["resume_ranked_for"] = ranked_for
+    st.session_state["resume_ranked_jd"] = ranked_jd
+    st.session_state.pop("resume_match", None)
+
+    ranked = rank_resumes([ensure_term_vector(resume.get("structured") or {}) for resume in saved_resumes], job_description)
+    if not ranked or ranked[0]["score"] <= 0:
+        return
+    best = ranked[0]
+    text_ref = st.session_state.get("resume_text_ref")
+    entered_own = (
+        st.session_state.get("resume_choice") == "Enter new resume"
+        and text_ref and text_ref != st.session_state.get("loaded_resume_ref")
+    )
+    st.session_state["resume_match"] = {
+        **best,
+        "label": resume_options[best["index"] + 1],
+        "runner_up": {**ranked[1], "label": resume_options[ranked[1]["index"] + 1]},
+        "suggested_only": bool(entered_own),
+    }
+    if not entered_own:
+        st.session_state["resume_choice"] = resume_options[best["index"] + 1]
 
 
 def save_resume(user_id, resume_data):
-    """Save a new resume to Supabase."""
+    """Save a new resume with its structured model."""
     try:
         resume_data["user_id"] = user_id
-        supabase.table("resumes").insert(resume_data).execute()
-        return True
+        resume_data["text_hash"], resume_data["structured"] = structure_resume(resume_data["resume_text"])
+        # Stored with the structure, so ranking against a job never re-reads the text
+        ensure_term_vector(resume_data["structured"])
+        compress_fields(resume_data, "resume_text")
+        return guarded_write("resume", lambda store: store.insert_resume(resume_data))
     except Exception as e:
         st.error(f"Error saving resume: {str(e)}")
         return False
 
 
-def load_cover_letters(user_id):
-    """Load all saved cover letters from Supabase for this user."""
+def rehydrate_cover_letters(cover_letters):
+    """Rebuild the text of letters stored as a reference plus delta (in place)."""
+    by_id = {cl["id"]: cl for cl in cover_letters}
+    for cl in cover_letters:
+        if cl.get("reference_id") and cl.get("delta") is not None:
+            reference = by_id.get(cl["reference_id"])
+            if reference is None:
+                store = get_storage()
+                reference = init_db_guard().call(
+                    lambda: store.get_cover_letter(cl["reference_id"], "id, cover_letter")
+                ) or {"cover_letter": ""}
+            cl["cover_letter"] = apply_delta(row_text(reference, "cover_letter"), cl["delta"])
+    return cover_letters
+
+
+def cover_letters_read(user_id):
+    return ("cover_letters", user_id), lambda store: store.list_cover_letters(user_id, COVER_LETTER_COLUMNS), []
+
+
+def load_cover_letters(user_id, loaded=None):
+    """Load all saved cover letters for this user, newest first."""
+    cover_letters, fresh = loaded or guarded_read(*cover_letters_read(user_id))
+    if not cover_letters:
+        return []
+    if fresh:
+        record_egress("cover_letters", cover_letters)
     try:
-        response = supabase.table("cover_letters").select("*").eq("user_id", user_id).order("date_created", desc=True).execute()
-        return response.data if response.data else []
-    except:
+        # Rehydrating is idempotent, so a cached list can be passed through again
+        return rehydrate_cover_letters(cover_letters)
+    except Exception:
         return []
 
 
-def save_cover_letter(user_id, cover_letter_data):
-    """Save a cover letter to Supabase."""
+def iter_cover_letters(user_id, page_size=50):
+    """Yield all of a user's cover letters one page at a time (keyset pagination on id)."""
+    store = get_storage()
+    last_id = None
+    while True:
+        rows = init_db_guard().call(
+            lambda: store.page_cover_letters(user_id, COVER_LETTER_COLUMNS, last_id, page_size)
+        )
+        if not rows:
+            return
+        yield from rehydrate_cover_letters(rows)
+        last_id = rows[-1]["id"]
+
+
+def find_similar_cover_letter(user_id, cover_letter_text):
+    """Find the user's most similar saved letter via LSH bands. Returns (row, similarity).
+
+    Only rows sharing a band key are fetched, so the lookup does not scan the
+    whole history. Candidates are limited to fully stored letters so deltas
+    never chain.
+    """
+    try:
+        signature = minhash_signature(cover_letter_text)
+        store = get_storage()
+        candidates = init_db_guard().call(lambda: store.similar_cover_letters(
+            user_id, lsh_bands(signature), "id, company, role, date_created, cover_letter, minhash"
+        ))
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            score = similarity(signature, candidate.get("minhash"))
+            if score > best_score:
+                best, best_score = candidate, score
+        return best, best_score
+    except Exception:
+        return None, 0.0
+
+
+def save_cover_letter(user_id, cover_letter_data, reference=None):
+    """Save a cover letter.
+
+    Stores its MinHash signature and LSH bands for near-duplicate lookup. When
+    `reference` (a saved letter row) is given, only a delta against it is stored.
+    """
     try:
         cover_letter_data["user_id"] = user_id
-        supabase.table("cover_letters").insert(cover_letter_data).execute()
-        return True
+        signature = minhash_signature(cover_letter_data["cover_letter"])
+        cover_letter_data["minhash"] = signature
+        cover_letter_data["lsh_bands"] = lsh_bands(signature)
+        if reference:
+            cover_letter_data["reference_id"] = reference["id"]
+            cover_letter_data["delta"] = make_delta(row_text(reference, "cover_letter"), cover_letter_data["cover_letter"])
+            # The stored body is empty, so the search index gets the full letter instead
+            cover_letter_data["search_text"] = cover_letter_data["cover_letter"]
+            cover_letter_data["cover_letter"] = ""
+        # Compressed bodies send their plain text once so the search index can use it
+        compressed = compress_fields(cover_letter_data, "cover_letter")
+        if compressed:
+            cover_letter_data["search_text"] = compressed["cover_letter"]
+        return guarded_write("cover letter", lambda store: store.insert_cover_letter(cover_letter_data))
     except Exception as e:
         st.error(f"Error saving cover letter: {str(e)}")
         return False
 
 
 def delete_cover_letter(user_id, cover_letter_id):
-    """Delete a cover letter from Supabase."""
+    """Delete a cover letter."""
+    def write(store):
+        # Letters stored as deltas against this one get their full text back first
+        dependents = store.dependent_cover_letters(user_id, cover_letter_id, COVER_LETTER_COLUMNS)
+        if dependents:
+            # Rebuilt here rather than with rehydrate_cover_letters, which reads session state
+            reference = store.get_cover_letter(cover_letter_id, "id, cover_letter")
+            for dependent in dependents:
+                text = apply_delta(row_text(reference, "cover_letter") if reference else "", dependent["delta"])
+                restored = {"cover_letter": text, "reference_id": None, "delta": None}
+                compress_fields(restored, "cover_letter")
+                restored["search_text"] = text
+                store.update_cover_letter(user_id, dependent["id"], restored)
+        store.delete_cover_letter(user_id, cover_letter_id)
+
     try:
-        supabase.table("cover_letters").delete().eq("id", cover_letter_id).eq("user_id", user_id).execute()
-        return True
+        return guarded_write("deletion", write)
     except Exception as e:
         st.error(f"Error deleting cover letter: {str(e)}")
         return False
 
 
+def search_cover_letters(user_id, query, page=0, page_size=10):
+    """Ranked full-text search over a user's cover letters. Returns (hits, total_count).
+
+    Runs in the database (the search_cover_letters RPC from migrations/001,
+    or SQLite FTS5), so only one page of snippets is transferred.
+    """
+    try:
+        store = get_storage()
+        hits = init_db_guard().call(lambda: store.search_cover_letters(user_id, query, page_size, page * page_size))
+        return hits, (hits[0]["total_count"] if hits else 0)
+    except DatabaseUnavailable:
+        st.warning("Search is unavailable while the database is not responding. Clear the search to see your saved letters.")
+        return [], 0
+    except Exception as e:
+        st.error(f"Error searching cover letters: {str(e)}")
+        return [], 0
+
+
+def load_cover_letter(user_id, cover_letter_id):
+    """Load a single cover letter by id."""
+    try:
+        cover_letter, _ = guarded_read(
+            ("cover_letter", user_id, cover_letter_id),
+            lambda store: store.get_cover_letter(cover_letter_id, COVER_LETTER_COLUMNS, user_id=user_id)
+        )
+        return rehydrate_cover_letters([cover_letter])[0] if cover_letter else None
+    except Exception as e:
+        st.error(f"Error loading cover letter: {str(e)}")
+        return None
+
+
 def save_rating(user_id, rating_data):
-    """Save a cover letter rating for ML training to Supabase."""
+    """Save a cover letter rating for ML training."""
     try:
         rating_data["user_id"] = user_id
-        supabase.table("ratings").insert(rating_data).execute()
-        return True
+        compress_fields(rating_data, "cover_letter", "resume_text", "job_description")
+        return guarded_write("rating", lambda store: store.insert_rating(rating_data))
     except Exception as e:
         st.error(f"Error saving rating: {str(e)}")
         return False
@@ -268,6 +1034,8 @@ def save_rating(user_id, rating_data):
 
 def extract_text_from_pdf(pdf_file):
     """Extract text from uploaded PDF file."""
+    import PyPDF2
+
     pdf_reader = PyPDF2.PdfReader(pdf_file)
     text = ""
     for page in pdf_reader.pages:
@@ -277,143 +1045,93 @@ def extract_text_from_pdf(pdf_file):
 
 def extract_text_from_docx(docx_file):
     """Extract text from uploaded DOCX file."""
+    from docx import Document
+
     doc = Document(docx_file)
     text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
     return text
 
 
+@st.cache_resource
+def init_sidebar_load_timings():
+    """Durations of the sidebar's reads (each query, and all of them together), shared by all sessions."""
+    return RerunTimings()
+
+
+def load_sidebar_data(user_id, with_history=True):
+    """Load the profile, resume list and (unless `with_history` is off) cover letter history at once.
+
+    The reads are independent, so they run concurrently and the sidebar waits
+    about as long as the slowest one instead of the sum of all three.
+    """
+    reads = {"profile": profile_read(user_id), "resumes": resumes_read(user_id)}
+    if with_history:
+        reads["cover_letters"] = cover_letters_read(user_id)
+    with init_sidebar_load_timings().measure("all"):
+        loaded = guarded_reads(reads)
+    data = {
+        "profile": load_profile(user_id, loaded["profile"]),
+        "resumes": load_resumes(user_id, loaded=loaded["resumes"]),
+    }
+    if with_history:
+        data["cover_letters"] = load_cover_letters(user_id, loaded["cover_letters"])
+    return data
+
+
 def get_latest_resume(user_id):
     """Get the most recently saved resume."""
-    resumes = load_resumes(user_id)
+    resumes = load_resumes(user_id, "*")
     if resumes:
         return resumes[0]  # Already sorted by date_saved desc in load_resumes
     return None
 
 
-def generate_cover_letter(resume_text, candidate_name, candidate_address, company_name, role_title, why_want_job, job_description="", additional_context="", resume_highlight="", length="concise", tone="conversational"):
-    """Generate a cover letter using Claude Haiku API."""
-
-    # Length instructions
-    length_instructions = {
-        "concise": "Keep the cover letter concise and focused, between 200-325 words. Be direct and impactful.",
-        "standard": "Write a standard-length cover letter, between 325-450 words. Provide more detail while staying focused."
-    }
-
-    # Tone instructions
-    tone_instructions = {
-        "conversational": "Use a warm, conversational tone that is professional but approachable. Write as if speaking to a colleague. Avoid overly formal language while maintaining respect.",
-        "professional": "Use a formal, traditional tone. Choose sophisticated vocabulary, avoid contractions, and maintain a serious, business-like demeanor throughout. This is for corporate, finance, law, or government roles.",
-        "enthusiastic": "Use an energetic, passionate tone that shows genuine excitement about the role and company. Express enthusiasm naturally without going overboard. Perfect for startups, creative roles, or mission-driven organizations.",
-        "confident": "Use a bold, direct tone that emphasizes your unique value proposition. Be assertive about your capabilities without arrogance. Focus on what you bring to the table. Ideal for competitive roles and leadership positions."
-    }
-
-    # Build prompt with XML tags for better structure and clarity
-    prompt = f"""<instructions>
-<length_requirement>
-{length_instructions.get(length, length_instructions["concise"])}
-</length_requirement>
-
-<tone_requirement>
-{tone_instructions.get(tone, tone_instructions["conversational"])}
-</tone_requirement>
-
-<additional_requirements>
-- Do not use emojis
-- Make the letter specific to this candidate and company
-- Use concrete examples from the resume
-- Do not include any XML tags, brackets, or meta-instructions in your output
-- Output only the final cover letter text
-</additional_requirements>
-</instructions>
-
-<resume>
-{resume_text}
-</resume>"""
-
-    # Add resume highlight if provided
-    if resume_highlight:
-        prompt += f"""
-
-<resume_highlight>
-The candidate specifically wants to EMPHASIZE these experiences/achievements from their resume:
-
-{resume_highlight}
-
-IMPORTANT: Make sure to feature and highlight these specific items in the cover letter when relevant.
-</resume_highlight>"""
-
-    prompt += f"""
-
-<job_description>
-{job_description if job_description else "No job description provided. Focus on general fit with the company and role."}
-</job_description>
-
-<candidate_motivation>
-{why_want_job}
-</candidate_motivation>
-
-<additional_context>
-{additional_context if additional_context else "No additional context provided."}
-</additional_context>
-
-<output_format>
-The cover letter must follow this exact structure:
-
-{datetime.now().strftime("%B %d, %Y")}
-
-{candidate_address}
-
-
-Hiring Manager
-{company_name}
-
-Dear Hiring Manager,
-
-[First paragraph: State why you are writing and include the exact title of the position: {role_title}. If applicable, mention any company connections.]
-
-[Second paragraph: Describe what the candidate offers based on their resume. Provide specific examples of how their qualifications match the job requirements. Use work, classroom, or organizational experiences. Expand on resume details without repeating them verbatim.]
-
-[Third paragraph: Establish synergy between the candidate and {company_name}. Include values, traits, corporate culture, or commitment to diversity that align with the candidate's profile.]
-
-[Final paragraph: Reiterate interest in the position and express interest in an interview. Thank the employer for their time and consideration.]
-
-Sincerely,
-
-
-{candidate_name}
-</output_format>
-
-Generate the complete cover letter now, following the output format exactly and applying all requirements. Replace all bracketed instructions with actual content."""
+@st.cache_resource
+def init_normalizer():
+    """Initialize the shared input normalizer (cached by input hash)."""
+    return TextNormalizer()
+
+
+def normalize_inputs(resume_text, job_description=""):
+    """Normalize resume and job description text before prompt assembly.
+
+    The resume is sent as written unless RESUME_PROMPT_FORMAT=structured,
+    which renders it from its structured model (parsed once per text) when
+    that rendering keeps the resume's content; otherwise the raw text is
+    used. Normalization collapses whitespace, repairs hyphenation, drops
+    repeated page headers and strips job-description boilerplate. Disabled
+    with NORMALIZE_INPUTS=false.
+    """
+    if str(get_setting("RESUME_PROMPT_FORMAT", "raw")).lower() == "structured" and resume_text:
+        _, structured = structure_resume(resume_text)
+        if rendering_complete(structured, resume_text):
+            resume_text = compact_resume(structured)
+    if not setting_enabled("NORMALIZE_INPUTS", "true"):
+        return resume_text, job_description
+    normalizer = init_normalizer()
+    return (
+        normalizer.normalize(resume_text, "resume").text,
+        normalizer.normalize(job_description, "job_description").text
+    )
 
-    # System message for role-setting
-    system_message = """You are an expert cover letter writer with 15 years of experience helping candidates land jobs at top companies across all industries. You excel at:
 
-- Identifying key resume highlights that match job requirements
-- Writing compelling narratives that showcase candidate strengths without exaggeration
-- Adapting tone and style precisely to company culture and industry norms
-- Maintaining appropriate length while maximizing impact and readability
-- Using specific examples and concrete achievements rather than generic statements
-- Crafting authentic, genuine language that sounds human and professional
+def generate_cover_letter(resume_text, candidate_name, candidate_address, company_name, role_title, why_want_job, job_description="", additional_context="", resume_highlight="", length="concise", tone="conversational"):
+    """Generate a cover letter using Claude Haiku API."""
+    resume_text, job_description = normalize_inputs(resume_text, job_description)
 
-You understand that cover letters should be concise, focused, and tailored to demonstrate clear value to the employer."""
+    client = init_anthropic()
 
-    # Initialize client inside function to avoid initialization issues
-    client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-
-    message = client.messages.create(
-        model="claude-3-haiku-20240307",
-        max_tokens=1500,
-        system=system_message,
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
-    )
+    message = create_message(client, **cover_letter_request(
+        resume_text, candidate_name, candidate_address, company_name, role_title, why_want_job,
+        job_description, additional_context, resume_highlight, length, tone
+    ))
 
     return message.content[0].text
 
 
 def generate_statement_of_interest(resume_text, company_name, role_title, job_description=""):
     """Generate a brief 'why I want this job' statement using Claude Haiku."""
+    resume_text, job_description = normalize_inputs(resume_text, job_description)
 
     prompt = f"""Based on the following information, write a brief 2-3 sentence statement explaining why the candidate wants this job. The statement should be honest, specific, and professional.
 
@@ -435,9 +1153,10 @@ Write a 2-3 sentence statement that:
 
 Output only the statement, no additional text or explanations."""
 
-    client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    client = init_anthropic()
 
-    message = client.messages.create(
+    message = create_message(
+        client,
         model="claude-3-haiku-20240307",
         max_tokens=300,
         messages=[
@@ -448,8 +1167,85 @@ Output only the statement, no additional text or explanations."""
     return message.content[0].text.strip()
 
 
+@st.cache_resource
+def init_statement_prefetcher():
+    """Initialize the background prefetcher for statements of interest.
+
+    A speculative call counts against the owner's quota and waits for a
+    fair-share slot like an interactive one; if the quota is used up or the
+    queue times out, there is simply no prefetched statement.
+    """
+    scheduler = init_llm_scheduler()
+    window = float(get_setting("QUOTA_WINDOW_SECONDS", "3600"))
+
+    def prefetch_statement(quota_owner, limit, resume_text, company_name, role_title, job_description):
+        receipt = scheduler.check_quota(quota_owner, limit, window)
+        try:
+            scheduler.acquire(quota_owner)
+        except BaseException:
+            scheduler.refund_quota(quota_owner, receipt)
+            raise
+        try:
+            return generate_statement_of_interest(resume_text, company_name, role_title, job_description)
+        finally:
+            scheduler.release()
+
+    return SpeculativePrefetcher(
+        prefetch_statement,
+        ttl=float(get_setting("PREFETCH_TTL_SECONDS", "300")),
+        max_per_owner=int(get_setting("PREFETCH_MAX_PER_HOUR", "10"))
+    )
+
+
+def schedule_statement_prefetch(owner, resume_text, company_name, role_title, job_description=""):
+    """Start generating the statement in the background once its inputs stop changing.
+
+    Inputs count as stable when they are unchanged across reruns for at least
+    PREFETCH_DEBOUNCE_SECONDS. Returns the input key used to collect the result.
+    """
+    key = input_key(resume_text, company_name, role_title, job_description)
+    seen_key, first_seen = st.session_state.get("statement_prefetch_seen", (None, 0.0))
+    if st.session_state.get("statement_prefetch_taken") == key:
+        # Already used for these inputs; don't pay for the same statement again
+        pass
+    elif seen_key != key:
+        st.session_state["statement_prefetch_seen"] = (key, time.time())
+    elif time.time() - first_seen >= float(get_setting("PREFETCH_DEBOUNCE_SECONDS", "2")):
+        quota_owner = request_owner()
+        init_statement_prefetcher().start(
+            owner, key, quota_owner, quota_limit(quota_owner), resume_text, company_name, role_title, job_description
+        )
+    return key
+
+
+def take_prefetched_statement(owner, key):
+    """The prefetched statement, waiting at most PREFETCH_WAIT_SECONDS if it's still in flight (else None)."""
+    statement = init_statement_prefetcher().take(owner, key, timeout=float(get_setting("PREFETCH_WAIT_SECONDS", "15")))
+    if statement:
+        st.session_state["statement_prefetch_taken"] = key
+    return statement
+
+
+@st.cache_resource
+def init_answer_cache():
+    """Initialize the cache of earlier answers to recurring application questions."""
+    return AnswerCache(threshold=float(get_setting("ANSWER_REUSE_THRESHOLD", "0.7")), kv=init_kv(), ttl=STATE_TTL_SECONDS)
+
+
+def answer_owner():
+    """Whose earlier answers may be reused: the signed-in user, else only this guest session.
+
+    Unlike quotas, this isn't keyed by IP, since guests behind one address
+    (a campus or office network) must not see each other's answers.
+    """
+    if "user" in st.session_state:
+        return f"user:{st.session_state['user'].id}"
+    return f"guest:{st.session_state.setdefault('session_id', uuid.uuid4().hex)}"
+
+
 def generate_application_answer(question, resume_text, company_name, role_title, job_description="", additional_context="", previous_responses="", question_notes="", resume_highlight=""):
     """Generate an answer to a random application question using Claude Haiku."""
+    resume_text, job_description = normalize_inputs(resume_text, job_description)
 
     prompt = f"""You are helping a job candidate answer an application question. Based on the candidate's background and the job details, provide a professional, authentic answer.
 
@@ -532,9 +1328,10 @@ Write a clear, concise answer (2-4 sentences) that:
 
 Output only the answer, no additional text or explanations."""
 
-    client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    client = init_anthropic()
 
-    message = client.messages.create(
+    message = create_message(
+        client,
         model="claude-3-haiku-20240307",
         max_tokens=400,
         messages=[
@@ -545,48 +1342,278 @@ Output only the answer, no additional text or explanations."""
     return message.content[0].text.strip()
 
 
+def regenerate_paragraph(cover_letter_text, paragraph_index, gen_data, change_request=""):
+    """Rewrite one body paragraph of a cover letter and splice it back in.
+
+    Sends only the neighbouring paragraphs and the context that paragraph
+    needs (resume for the qualifications paragraph, job description for the
+    fit paragraphs), and asks for a single paragraph back.
+    """
+    parts = parse_letter(cover_letter_text)
+    if parts is None or not 0 <= paragraph_index < len(parts["body"]):
+        raise ValueError("Could not find that paragraph in the cover letter.")
+
+    body = parts["body"]
+    role_instruction = paragraph_role(paragraph_index, len(body))
+    resume_text, job_description = normalize_inputs(gen_data.get("resume_text", ""), gen_data.get("job_description", ""))
+
+    prompt = f"""Rewrite one paragraph of a cover letter for the {gen_data.get("role", "")} position at {gen_data.get("company", "")}.
+
+<paragraph_purpose>
+{role_instruction}
+</paragraph_purpose>
+
+<current_paragraph>
+{body[paragraph_index]}
+</current_paragraph>"""
+
+    if paragraph_index > 0:
+        prompt += f"""
+
+<previous_paragraph>
+{body[paragraph_index - 1]}
+</previous_paragraph>"""
+
+    if paragraph_index < len(body) - 1:
+        prompt += f"""
+
+<next_paragraph>
+{body[paragraph_index + 1]}
+</next_paragraph>"""
+
+    # Only the middle paragraphs draw on the resume and job description
+    if 0 < paragraph_index < len(body) - 1:
+        prompt += f"""
+
+<resume>
+{resume_text}
+</resume>
+
+<job_description>
+{job_description if job_description else "Not provided"}
+</job_description>
+
+<candidate_motivation>
+{gen_data.get("why_want_job", "")}
+</candidate_motivation>"""
+
+    if change_request:
+        prompt += f"""
+
+<requested_change>
+{change_request}
+</requested_change>"""
+
+    prompt += f"""
+
+Write a replacement for the current paragraph that:
+- Fulfils the paragraph purpose above
+- Flows naturally from the previous paragraph into the next one
+- Keeps a {gen_data.get("tone", "conversational")} tone and roughly the same length
+- Applies the requested change, if any
+- Does not use emojis, XML tags, brackets or placeholders
+
+Output only the new paragraph, no additional text or explanations."""
+
+    client = init_anthropic()
+
+    message = create_message(
+        client,
+        model="claude-3-haiku-20240307",
+        max_tokens=400,
+        messages=[
+            {"role": "user", "content": prompt}
+        ]
+    )
+
+    body[paragraph_index] = message.content[0].text.strip()
+    return join_letter(parts)
+
+
+@st.cache_resource
+def init_letter_stats():
+    """Initialize the shared counters of letter validation outcomes and repairs."""
+    return ValidationStats()
+
+
+def resize_letter_body(cover_letter_text, gen_data, length, kind):
+    """Shorten (kind "too_long") or lengthen the body paragraphs into the requested word range.
+
+    Sends only the body paragraphs (plus the resume when lengthening); the
+    header, salutation and sign-off are kept as they are.
+    """
+    parts = parse_letter(cover_letter_text)
+    if parts is None:
+        raise ValueError("Could not find the body of the cover letter.")
+
+    body = parts["body"]
+    # The requested range covers the whole letter; the kept parts use some of it
+    low, high = body_word_range(parts, length)
+    target = (low + high) // 2
+    if kind == "too_long":
+        instruction = f"""Shorten these cover letter paragraphs to about {target} words in total (between {low} and {high}).
+Cut repetition and generic sentences first; keep the specific examples and achievements."""
+    else:
+        resume_text, _ = normalize_inputs(gen_data.get("resume_text", ""))
+        instruction = f"""Expand these cover letter paragraphs to about {target} words in total (between {low} and {high}).
+Add specific examples and achievements from the resume below; do not add generic filler.
+
+<resume>
+{resume_text}
+</resume>"""
+
+    paragraphs = "\n\n".join(body)
+    prompt = f"""{instruction}
+
+<paragraphs>
+{paragraphs}
+</paragraphs>
+
+Requirements:
+- Keep exactly {len(body)} paragraphs, in the same order and with the same purpose, separated by blank lines
+- Keep a {gen_data.get("tone", "conversational")} tone
+- Do not use emojis, XML tags, brackets or placeholders
+
+Output only the paragraphs, no additional text or explanations."""
+
+    client = init_anthropic()
+
+    message = create_message(
+        client,
+        model="claude-3-haiku-20240307",
+        max_tokens=1000,
+        messages=[
+            {"role": "user", "content": prompt}
+        ]
+    )
+
+    new_body = [p.strip() for p in message.content[0].text.strip().split("\n\n") if p.strip()]
+    if not new_body:
+        raise ValueError("The resized letter body was empty.")
+    parts["body"] = new_body
+    return join_letter(parts)
+
+
+def repair_cover_letter(cover_letter, gen_data, length, candidate_name):
+    """Validate a generated letter locally and repair only what fails. Returns (letter, issues left).
+
+    Local fixes (emoji, XML tags, placeholders the inputs answer, the name in
+    the sign-off) come first. Paragraphs still holding placeholders are then
+    rewritten one at a time with regenerate_paragraph, and a body outside the
+    word range gets one resize call: at most LETTER_REPAIR_MAX_CALLS model
+    calls in all. With LETTER_REPAIR=false letters are only checked and
+    fixed locally.
+    """
+    stats = init_letter_stats()
+    found = check_letter(cover_letter, length, candidate_name)
+    if not found:
+        stats.record([], "passed")
+        return cover_letter, []
+
+    cover_letter, _ = local_fixes(cover_letter, gen_data.get("company", ""), gen_data.get("role", ""), candidate_name)
+    issues = check_letter(cover_letter, length, candidate_name)
+    max_calls = int(get_setting("LETTER_REPAIR_MAX_CALLS", "2")) if setting_enabled("LETTER_REPAIR", "true") else 0
+    calls = failures = 0
+
+    for index in sorted({issue["section"] for issue in issues if isinstance(issue["section"], int)}):
+        if calls >= max_calls:
+            break
+        calls += 1
+        try:
+            cover_letter = regenerate_paragraph(
+                cover_letter, index, gen_data,
+                "Replace every bracketed placeholder or instruction with real, specific content."
+            )
+        except Exception:
+            failures += 1
+
+    issues = check_letter(cover_letter, length, candidate_name)
+    resize = next((issue for issue in issues if issue["kind"] in ("too_long", "too_short")), None)
+    if resize and calls < max_calls and parse_letter(cover_letter) is not None:
+        calls += 1
+        try:
+            cover_letter = resize_letter_body(cover_letter, gen_data, length, resize["kind"])
+        except Exception:
+            failures += 1
+        issues = check_letter(cover_letter, length, candidate_name)
+
+    outcome = "unresolved" if issues else ("repaired" if calls else "fixed_locally")
+    stats.record(found, outcome, calls, failures)
+    return cover_letter, issues
+
+
+@st.cache_resource
+def init_export_engine():
+    """Initialize the export engine (DOCX skeleton and PDF font load once per process)."""
+    return ExportEngine(font_path=get_setting("EXPORT_FONT_PATH"))
+
+
+# Reruns render the same letters again; only new text is exported
+@st.cache_data(max_entries=256, show_spinner=False)
 def export_to_docx(cover_letter_text):
     """Export cover letter to .docx format with proper formatting."""
-    doc = Document()
-
-    # Set up document margins (1 inch all around)
-    sections = doc.sections
-    for section in sections:
-        section.top_margin = Inches(1)
-        section.bottom_margin = Inches(1)
-        section.left_margin = Inches(1)
-        section.right_margin = Inches(1)
-
-    # Split cover letter into lines and add to document
-    lines = cover_letter_text.split('\n')
-    for line in lines:
-        paragraph = doc.add_paragraph(line)
-        # Set font size to 11pt
-        for run in paragraph.runs:
-            run.font.size = Pt(11)
-
-    # Save to bytes buffer
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return buffer.getvalue()
+    return init_export_engine().to_docx(cover_letter_text)
 
 
+@st.cache_data(max_entries=256, show_spinner=False)
 def export_to_pdf(cover_letter_text):
     """Export cover letter to .pdf format with proper formatting."""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font('Helvetica', '', 11)
+    return init_export_engine().to_pdf(cover_letter_text)
+
+
+WARMUP_SAMPLE = "Jane Smith\n123 Main Street\n\nDear Hiring Manager,\n\nWarm-up letter.\n\nSincerely,\nJane Smith"
+
 
-    # Add all text at once using multi_cell
-    pdf.multi_cell(0, 6, cover_letter_text)
+# Shared across sessions so the warm-up runs once per process
+@st.cache_resource
+def init_warmer():
+    """Start the background warm-up of Claude and database connections, imports and export templates.
+
+    Settings and storage are resolved here, on the script thread, since the
+    warm-up thread can't read secrets or session state. The Anthropic client
+    is built on the warm-up thread, so importing the SDK stays off the first
+    render. The state is
+    written to WARM_STATUS_PATH (served at /app/static/warm.json) for the
+    keep-alive workflow. Disabled with WARM_ON_START=false.
+    """
+    engine = init_export_engine()
+    storage = init_sqlite_storage() if STORAGE_BACKEND == "sqlite" else SupabaseStorage(supabase)
+
+    def warm_claude():
+        # Lists one model: no tokens billed, but it opens (or refreshes) a pooled connection
+        init_anthropic().models.list(limit=1)
+
+    def warm_database():
+        storage.get_profile("00000000-0000-0000-0000-000000000000")
+
+    def warm_exports():
+        engine.to_docx(WARMUP_SAMPLE)
+        pdf_bytes = engine.to_pdf(WARMUP_SAMPLE)
+        extract_text_from_pdf(io.BytesIO(pdf_bytes))
+        extract_text_from_docx(io.BytesIO(engine.to_docx(WARMUP_SAMPLE)))
+
+    tasks = {"claude": warm_claude, "database": warm_database, "exports": warm_exports}
+    kv = init_kv()
+    if kv is not None:
+        tasks["state_store"] = kv.ping
+    warmer = Warmer(
+        tasks,
+        keep_warm=("claude", "database", "state_store"),
+        interval=WARM_INTERVAL_SECONDS,
+        status_path=get_setting("WARM_STATUS_PATH", os.path.join("static", "warm.json"))
+    )
+    if setting_enabled("WARM_ON_START", "true"):
+        warmer.start()
+    return warmer
 
-    # Return PDF as bytes
-    return bytes(pdf.output())
+init_warmer()
 
 
 # ===== MAIN APP =====
 
+# Pick up this visitor's letter, answers and inputs from the shared store (STATE_STORE_URL)
+restore_durable_state()
+
 # Show home page FIRST (before auth)
 show_app = st.session_state.get("show_app", False)
 
@@ -687,16 +1714,17 @@ if st.session_state.get("first_time_user", True):
 if is_guest:
     st.info("You're using guest mode. Create an account to save your resumes, cover letters, and history!")
 
-# Load profile (only for logged-in users)
-profile = load_profile(user_id) if user_id else {
-    "linkedin_url": "",
-    "github_url": "",
-    "portfolio_url": "",
-    "candidate_name": "",
-    "candidate_address": "",
-    "default_length": "concise",
-    "default_tone": "conversational"
-}
+# Load the sidebar's data (only for logged-in users); history is skipped while a search is showing
+if user_id:
+    sidebar_data = load_sidebar_data(user_id, with_history=not st.session_state.get("history_search", "").strip())
+    profile = sidebar_data["profile"]
+else:
+    sidebar_data = {}
+    profile = dict(DEFAULT_PROFILE)
+
+# Degraded mode: Supabase calls are failing or too slow, so the breaker serves saved data
+if user_id and init_db_guard().degraded:
+    st.warning("We're having trouble reaching the database. You're seeing your most recently loaded resumes and history, and anything you save is queued until the connection recovers.")
 
 # Sidebar for profile and resume management
 with st.sidebar:
@@ -766,13 +1794,13 @@ with st.sidebar:
         else:
             st.info("No profile links saved yet.")
 
-        # Edit profile links
-        with st.expander("Edit Profile Links", expanded=False):
+        # Edit profile links (a form, so typing doesn't rerun the app until saved)
+        with st.expander("Edit Profile Links", expanded=False), st.form("profile_links_form", border=False):
             linkedin_url = st.text_input("LinkedIn URL:", value=profile.get("linkedin_url", ""))
             github_url = st.text_input("GitHub URL:", value=profile.get("github_url", ""))
             portfolio_url = st.text_input("Portfolio URL:", value=profile.get("portfolio_url", ""))
 
-            if st.button("Save Profile Links", use_container_width=True):
+            if st.form_submit_button("Save Profile Links", use_container_width=True):
                 profile["linkedin_url"] = linkedin_url
                 profile["github_url"] = github_url
                 profile["portfolio_url"] = portfolio_url
@@ -786,17 +1814,20 @@ with st.sidebar:
     if not is_guest:
         st.subheader("Resume Management")
 
-        # Load existing resumes
-        saved_resumes = load_resumes(user_id)
+        # Loaded with the profile above
+        saved_resumes = sidebar_data["resumes"]
     else:
         saved_resumes = []
 
     if saved_resumes:
         # Quick action: Use Latest Resume
         latest_resume = saved_resumes[0]  # First item (newest) since sorted desc
+        resume_options = ["Enter new resume"] + [f"{r['resume_name']} - {r['date_saved']}" for r in saved_resumes]
         st.info(f"Latest: {latest_resume['resume_name']}")
         if st.button("Use Latest Resume", use_container_width=True):
-            st.session_state["resume_text"] = latest_resume["resume_text"]
+            # Replaces a preselected best match in the selector below
+            st.session_state["resume_choice"] = resume_options[1]
+            set_session_text("resume_text", load_resume_text(user_id, latest_resume["id"]))
             st.session_state["candidate_name"] = latest_resume["resume_name"]
             st.session_state["candidate_address"] = latest_resume.get("resume_address", "")
             st.success("Latest resume loaded!")
@@ -805,177 +1836,357 @@ with st.sidebar:
         st.divider()
 
         # Full resume selector
-        resume_options = ["Enter new resume"] + [f"{r['resume_name']} - {r['date_saved']}" for r in saved_resumes]
-        selected_resume = st.selectbox("Or select any resume:", resume_options)
+        suggest_resume(saved_resumes, resume_options)
+        selected_resume = st.selectbox("Or select any resume:", resume_options, key="resume_choice")
+        resume_match = st.session_state.get("resume_match")
+        if resume_match:
+            explanation = (
+                f"Best match for this job: **{resume_match['label']}**, with {resume_match['covered']} of "
+                f"{resume_match['job_terms']} job terms (strongest: {', '.join(resume_match['matched'])})."
+            )
+            if resume_match["missing"]:
+                explanation += f" Not in it: {', '.join(resume_match['missing'])}."
+            runner_up = resume_match["runner_up"]
+            explanation += f" Score {resume_match['score']:.2f} vs. {runner_up['score']:.2f} for {runner_up['label']}."
+            if resume_match.get("suggested_only") and selected_resume == "Enter new resume":
+                explanation += " Select it above to use it instead of the resume you entered."
+            st.caption(explanation)
 
         if selected_resume != "Enter new resume":
             resume_index = resume_options.index(selected_resume) - 1
             selected_resume_data = saved_resumes[resume_index]
-            st.session_state["resume_text"] = selected_resume_data["resume_text"]
+            # Fetch the raw text once per selection; the list only has the structure
+            loaded_ref = st.session_state.get("loaded_resume_ref")
+            try:
+                loaded = bool(init_text_store().get(loaded_ref, holder=text_holder()))
+            except TextMissing:
+                loaded = False
+            if st.session_state.get("loaded_resume_id") != selected_resume_data["id"] or not loaded:
+                st.session_state["loaded_resume_id"] = selected_resume_data["id"]
+                st.session_state["loaded_resume_ref"] = put_text(load_resume_text(user_id, selected_resume_data["id"]))
+            st.session_state["resume_text_ref"] = st.session_state["loaded_resume_ref"]
             st.session_state["candidate_name"] = selected_resume_data["resume_name"]
             st.session_state["candidate_address"] = selected_resume_data.get("resume_address", "")
     else:
         st.info("No saved resumes yet. Add your first resume below.")
 
-    # Add/Update Resume section
-    with st.expander("Add New Resume", expanded=False):
-        upload_option = st.radio("How would you like to provide your resume?", ["Paste text", "Upload file"], horizontal=True)
+    # Add/Update Resume section (a fragment: pasting or uploading doesn't rerun the app)
+    @page_section("add_resume")
+    def add_resume_panel():
+        candidate_name = st.session_state.get("candidate_name", "")
+        candidate_address = st.session_state.get("candidate_address", "")
+        with st.expander("Add New Resume", expanded=False):
+            upload_option = st.radio("How would you like to provide your resume?", ["Paste text", "Upload file"], horizontal=True)
+
+            if upload_option == "Upload file":
+                uploaded_file = st.file_uploader("Upload your resume (PDF or DOCX)", type=["pdf", "docx"])
+                if uploaded_file is not None:
+                    try:
+                        if uploaded_file.name.endswith('.pdf'):
+                            resume_text = extract_text_from_pdf(uploaded_file)
+                        elif uploaded_file.name.endswith('.docx'):
+                            resume_text = extract_text_from_docx(uploaded_file)
+                        st.success("Resume uploaded successfully!")
+                        # Keep only the extracted text and file name, not the upload itself
+                        set_session_text("resume_text", resume_text)
+                        st.session_state["uploaded_file_name"] = uploaded_file.name
+                    except Exception as e:
+                        st.error(f"Error reading file: {str(e)}")
+                        resume_text = ""
+                else:
+                    resume_text = get_session_text("resume_text")
+            else:
+                resume_text = st.text_area(
+                    "Your Resume (paste full resume text):",
+                    value=get_session_text("resume_text"),
+                    height=150
+                )
 
-        if upload_option == "Upload file":
-            uploaded_file = st.file_uploader("Upload your resume (PDF or DOCX)", type=["pdf", "docx"])
-            if uploaded_file is not None:
-                try:
-                    if uploaded_file.name.endswith('.pdf'):
-                        resume_text = extract_text_from_pdf(uploaded_file)
-                    elif uploaded_file.name.endswith('.docx'):
-                        resume_text = extract_text_from_docx(uploaded_file)
-                    st.success("Resume uploaded successfully!")
-                    st.session_state["resume_text"] = resume_text
-                    st.session_state["uploaded_file"] = uploaded_file
-                    st.session_state["uploaded_file_name"] = uploaded_file.name
-                except Exception as e:
-                    st.error(f"Error reading file: {str(e)}")
-                    resume_text = ""
+            # Save resume button (only for logged-in users)
+            if is_guest:
+                st.info("Create an account to save resumes for later use.")
             else:
-                resume_text = st.session_state.get("resume_text", "")
-        else:
-            resume_text = st.text_area(
-                "Your Resume (paste full resume text):",
-                value=st.session_state.get("resume_text", ""),
-                height=150
-            )
-            # Clear uploaded file from session if pasting text
-            if "uploaded_file" in st.session_state:
-                del st.session_state["uploaded_file"]
+                if st.button("Save Resume", use_container_width=True):
+                    if not all([candidate_name, candidate_address, resume_text]):
+                        st.error("Please fill in name, address, and resume text to save.")
+                    else:
+                        resume_data = {
+                            "resume_name": candidate_name,
+                            "resume_address": candidate_address,
+                            "resume_text": resume_text
+                        }
+
+                        save_resume(user_id, resume_data)
+                        st.success(f"Resume saved! You now have {len(load_resumes(user_id))} saved resume(s).")
+
+    add_resume_panel()
+
+    # Cover letter history (a fragment: searching and paging rerun only this panel)
+    @page_section("history")
+    def cover_letter_history():
+        # Loaded with the profile on a full run; a rerun of just this panel loads it again
+        loaded_history = sidebar_data.pop("cover_letters", None)
+        if not is_guest:
+            st.divider()
 
-        # Save resume button (only for logged-in users)
-        if is_guest:
-            st.info("Create an account to save resumes for later use.")
+            # Section 4: Cover Letter History
+            st.subheader("Cover Letter History")
+            history_query = st.text_input(
+                "Search your cover letters:",
+                key="history_search",
+                placeholder="e.g., fintech data engineer"
+            ).strip()
+            # Searching runs server-side, so skip downloading the full history
+            if history_query:
+                saved_cover_letters = []
+            else:
+                saved_cover_letters = loaded_history if loaded_history is not None else load_cover_letters(user_id)
         else:
-            if st.button("Save Resume", use_container_width=True):
-                if not all([candidate_name, candidate_address, resume_text]):
-                    st.error("Please fill in name, address, and resume text to save.")
-                else:
-                    resume_data = {
-                        "resume_name": candidate_name,
-                        "resume_address": candidate_address,
-                        "resume_text": resume_text
-                    }
-
-                    save_resume(user_id, resume_data)
-                    st.success(f"Resume saved! You now have {len(load_resumes(user_id))} saved resume(s).")
-
-    if not is_guest:
-        st.divider()
-
-        # Section 4: Cover Letter History
-        st.subheader("Cover Letter History")
-        saved_cover_letters = load_cover_letters(user_id)
-    else:
-        saved_cover_letters = []
-    if saved_cover_letters:
-        st.caption(f"Total saved: {len(saved_cover_letters)}")
-        for i, cl in enumerate(reversed(saved_cover_letters[-5:])):
-            with st.expander(f"{cl['company']} - {cl['role']}", expanded=False):
-                st.text(cl['cover_letter'][:200] + "...")
-                st.caption(f"Created: {cl['date_created']}")
-
-                # Download buttons in columns
-                hist_col1, hist_col2, hist_col3 = st.columns(3)
-
-                with hist_col1:
-                    st.download_button(
-                        label=".txt",
-                        data=cl['cover_letter'],
-                        file_name=f"cover_letter_{cl['company'].replace(' ', '_')}.txt",
-                        mime="text/plain",
-                        key=f"download_txt_{i}_{cl['date_created']}",
-                        use_container_width=True
+            history_query = ""
+            saved_cover_letters = []
+        if history_query:
+            # Start from the first page whenever the query changes
+            if st.session_state.get("history_search_last") != history_query:
+                st.session_state["history_search_last"] = history_query
+                st.session_state["history_search_page"] = 0
+            search_page = st.session_state.get("history_search_page", 0)
+            hits, total_hits = search_cover_letters(user_id, history_query, search_page, HISTORY_PAGE_SIZE)
+
+            if hits:
+                total_pages = (total_hits + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+                st.caption(f"{total_hits} match(es) - page {search_page + 1} of {total_pages}")
+                for hit in hits:
+                    with st.expander(f"{hit['company']} - {hit['role']}", expanded=False):
+                        st.markdown(hit["snippet"])
+                        st.caption(f"Created: {hit['date_created']}")
+                        if st.session_state.get("history_open_id") == hit["id"]:
+                            full_letter = load_cover_letter(user_id, hit["id"])
+                            if full_letter:
+                                st.text(row_text(full_letter, "cover_letter"))
+                                st.download_button(
+                                    label=".txt",
+                                    data=row_text(full_letter, "cover_letter"),
+                                    file_name=f"cover_letter_{hit['company'].replace(' ', '_')}.txt",
+                                    mime="text/plain",
+                                    key=f"download_hit_{hit['id']}",
+                                    use_container_width=True
+                                )
+                        elif st.button("Show full letter", key=f"open_hit_{hit['id']}", use_container_width=True):
+                            st.session_state["history_open_id"] = hit["id"]
+                            rerun_section()
+
+                page_col1, page_col2 = st.columns(2)
+                with page_col1:
+                    if search_page > 0 and st.button("Previous", use_container_width=True):
+                        st.session_state["history_search_page"] = search_page - 1
+                        rerun_section()
+                with page_col2:
+                    if search_page + 1 < total_pages and st.button("Next", use_container_width=True):
+                        st.session_state["history_search_page"] = search_page + 1
+                        rerun_section()
+            else:
+                st.info("No cover letters match your search.")
+        elif saved_cover_letters:
+            st.caption(f"Total saved: {len(saved_cover_letters)}")
+
+            # Download every saved letter in all three formats as one ZIP
+            if st.button("Download All (.zip)", use_container_width=True, help="Every saved cover letter as .txt, .docx and .pdf"):
+                total_letters = len(saved_cover_letters)
+                zip_progress = st.progress(0.0, text="Preparing your archive...")
+                previous_zip = st.session_state.pop("history_zip", None)
+                if previous_zip is not None:
+                    previous_zip.close()
+                # An anonymous temporary file is removed when it is closed or garbage
+                # collected, so archives of abandoned sessions don't pile up on disk
+                zip_file = tempfile.TemporaryFile(suffix=".zip")
+                try:
+                    write_history_zip(
+                        ((archive_name(cl), row_text(cl, "cover_letter")) for cl in iter_cover_letters(user_id)),
+                        zip_file,
+                        total=total_letters,
+                        font_path=get_setting("EXPORT_FONT_PATH"),
+                        workers=int(get_setting("BULK_EXPORT_WORKERS", "2")),
+                        progress=lambda done, total: zip_progress.progress(
+                            min(1.0, done / total), text=f"Rendered {done} of {total} letters"
+                        )
                     )
+                    st.session_state["history_zip"] = zip_file
+                except Exception as e:
+                    zip_file.close()
+                    st.error(f"Error building archive: {str(e)}")
+
+            history_zip = st.session_state.get("history_zip")
+            if history_zip is not None and history_zip.closed:
+                # Already served once
+                st.session_state.pop("history_zip")
+            elif history_zip is not None:
+                def serve_zip(zip_file=history_zip):
+                    # Read only when the download is requested, then let the file go
+                    zip_file.seek(0)
+                    data = zip_file.read()
+                    zip_file.close()
+                    return data
 
-                with hist_col2:
-                    docx_data = export_to_docx(cl['cover_letter'])
+                try:
                     st.download_button(
-                        label=".docx",
-                        data=docx_data,
-                        file_name=f"cover_letter_{cl['company'].replace(' ', '_')}.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                        key=f"download_docx_{i}_{cl['date_created']}",
+                        label="Save ZIP",
+                        data=serve_zip,
+                        file_name="cover_letters.zip",
+                        mime="application/zip",
+                        on_click="ignore",
                         use_container_width=True
                     )
-
-                with hist_col3:
-                    pdf_data = export_to_pdf(cl['cover_letter'])
+                except (TypeError, StreamlitAPIException):
+                    # Streamlit versions without deferred downloads need the bytes on every run
+                    history_zip.seek(0)
                     st.download_button(
-                        label=".pdf",
-                        data=pdf_data,
-                        file_name=f"cover_letter_{cl['company'].replace(' ', '_')}.pdf",
-                        mime="application/pdf",
-                        key=f"download_pdf_{i}_{cl['date_created']}",
+                        label="Save ZIP",
+                        data=history_zip.read(),
+                        file_name="cover_letters.zip",
+                        mime="application/zip",
                         use_container_width=True
                     )
-    else:
-        st.info("No saved cover letters yet.")
+            for i, cl in enumerate(reversed(saved_cover_letters[-5:])):
+                with st.expander(f"{cl['company']} - {cl['role']}", expanded=False):
+                    # Bodies are decompressed only for the letters actually shown
+                    letter_text = row_text(cl, "cover_letter")
+                    st.text(letter_text[:200] + "...")
+                    st.caption(f"Created: {cl['date_created']}")
+
+                    # Download buttons in columns
+                    hist_col1, hist_col2, hist_col3 = st.columns(3)
+
+                    with hist_col1:
+                        st.download_button(
+                            label=".txt",
+                            data=letter_text,
+                            file_name=f"cover_letter_{cl['company'].replace(' ', '_')}.txt",
+                            mime="text/plain",
+                            key=f"download_txt_{i}_{cl['date_created']}",
+                            use_container_width=True
+                        )
+
+                    with hist_col2:
+                        docx_data = export_to_docx(letter_text)
+                        st.download_button(
+                            label=".docx",
+                            data=docx_data,
+                            file_name=f"cover_letter_{cl['company'].replace(' ', '_')}.docx",
+                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                            key=f"download_docx_{i}_{cl['date_created']}",
+                            use_container_width=True
+                        )
+
+                    with hist_col3:
+                        pdf_data = export_to_pdf(letter_text)
+                        st.download_button(
+                            label=".pdf",
+                            data=pdf_data,
+                            file_name=f"cover_letter_{cl['company'].replace(' ', '_')}.pdf",
+                            mime="application/pdf",
+                            key=f"download_pdf_{i}_{cl['date_created']}",
+                            use_container_width=True
+                        )
+        else:
+            st.info("No saved cover letters yet.")
+
+    cover_letter_history()
+
+    # Operator diagnostics (hidden unless SHOW_DIAGNOSTICS is set)
+    if setting_enabled("SHOW_DIAGNOSTICS"):
+        st.divider()
+        with st.expander("Diagnostics", expanded=False):
+            hedger = init_hedger()
+            st.markdown(f"**Request hedging:** {'on' if hedger.enabled else 'off'} (deadline {hedger.deadline():.2f}s)")
+            st.json(hedger.metrics.snapshot())
+            st.markdown("**Statement prefetch:**")
+            st.json(init_statement_prefetcher().stats)
+            st.markdown("**Input normalization (characters / tokens saved):**")
+            st.json(init_normalizer().stats)
+            st.markdown("**Structured resumes (parsed vs. reused):**")
+            st.json(init_resume_parser().stats)
+            st.markdown("**Read egress (bytes transferred vs. uncompressed):**")
+            st.json(init_egress_stats())
+            st.markdown(f"**Supabase client pool:** {init_client_pool().size()} client(s)")
+            st.json(init_client_pool().stats)
+            st.markdown("**Claude fair-share scheduler (slots, queue, quota denials):**")
+            st.json(init_llm_scheduler().snapshot())
+            st.markdown("**Cover letter validation (outcomes, issues, repair calls):**")
+            st.json(init_letter_stats().snapshot())
+            st.markdown("**Application answer reuse (lookups, hits):**")
+            st.json(init_answer_cache().snapshot())
+            warm_status = init_warmer().snapshot()
+            st.markdown(f"**Warm-up:** {warm_status['state']}")
+            st.json(warm_status)
+            db_guard_stats = init_db_guard().snapshot()
+            st.markdown(f"**Database circuit breaker:** {db_guard_stats['state']} ({db_guard_stats['trips']} trip(s), deadline {DB_TIMEOUT_SECONDS:g}s)")
+            st.json(db_guard_stats)
+            if init_durable_state() is not None:
+                st.markdown(f"**Shared state store:** {type(init_kv()).__name__}, TTL {STATE_TTL_SECONDS:,}s")
+                st.json(init_durable_state().snapshot())
+            st.markdown(f"**Session state:** {st.session_state.get('session_footprint_bytes', 0):,} bytes (this session)")
+            st.json({**init_session_footprints().summary(), "text_store": init_text_store().summary()})
+            st.markdown("**Rerun time (full app vs. single section):**")
+            st.json(init_rerun_timings().summary())
+            st.markdown("**Sidebar loads (each read, and all of them at once):**")
+            st.json(init_sidebar_load_timings().summary())
 
 # Main area - Job Details and Cover Letter Generation
 
 # ===== SECTION 0: ENTER YOUR INFO =====
-st.header("Step 1: Enter Your Info")
-st.caption("Provide your profile information and resume")
-
-# Create three columns for Name, Address, Resume
-info_col1, info_col2, info_col3 = st.columns([1, 1, 2])
-
-with info_col1:
-    candidate_name = st.text_input(
-        "Your Full Name:",
-        value=st.session_state.get("candidate_name", ""),
-        key="candidate_name_input",
-        placeholder="e.g., Jane Smith"
-    )
-    st.session_state["candidate_name"] = candidate_name
+@page_section("your_info")
+def your_info_section():
+    st.header("Step 1: Enter Your Info")
+    st.caption("Provide your profile information and resume")
+
+    # Create three columns for Name, Address, Resume
+    info_col1, info_col2, info_col3 = st.columns([1, 1, 2])
+
+    with info_col1:
+        candidate_name = st.text_input(
+            "Your Full Name:",
+            value=st.session_state.get("candidate_name", ""),
+            key="candidate_name_input",
+            placeholder="e.g., Jane Smith"
+        )
+        st.session_state["candidate_name"] = candidate_name
+
+    with info_col2:
+        candidate_address = st.text_area(
+            "Your Address:",
+            value=st.session_state.get("candidate_address", ""),
+            height=80,
+            help="Auto-filled from saved resumes but you can edit it.",
+            key="candidate_address_input",
+            placeholder="123 Main St\nBoston, MA 02101"
+        )
+        st.session_state["candidate_address"] = candidate_address
+
+    with info_col3:
+        resume_text = st.text_area(
+            "Your Resume:",
+            value=get_session_text("resume_text"),
+            height=80,
+            help="Paste your resume text here, or use Resume Management in sidebar to save resumes for quick access.",
+            key="resume_text_input",
+            placeholder="Paste your resume text here..."
+        )
+        set_session_text("resume_text", resume_text)
 
-with info_col2:
-    candidate_address = st.text_area(
-        "Your Address:",
-        value=st.session_state.get("candidate_address", ""),
-        height=80,
-        help="Auto-filled from saved resumes but you can edit it.",
-        key="candidate_address_input",
-        placeholder="123 Main St\nBoston, MA 02101"
-    )
-    st.session_state["candidate_address"] = candidate_address
+    # Show status
+    if resume_text and candidate_name:
+        st.success(f"Ready to generate cover letters for {candidate_name}")
+    elif not resume_text:
+        st.info("Tip: If you have an account, use the Resume Management section in the sidebar to save and reuse resumes.")
 
-with info_col3:
-    resume_text = st.text_area(
-        "Your Resume:",
-        value=st.session_state.get("resume_text", ""),
-        height=80,
-        help="Paste your resume text here, or use Resume Management in sidebar to save resumes for quick access.",
-        key="resume_text_input",
-        placeholder="Paste your resume text here..."
-    )
-    st.session_state["resume_text"] = resume_text
 
-# Show status
-if resume_text and candidate_name:
-    st.success(f"Ready to generate cover letters for {candidate_name}")
-elif not resume_text:
-    st.info("Tip: If you have an account, use the Resume Management section in the sidebar to save and reuse resumes.")
+your_info_section()
 
 st.divider()
 
 # ===== SECTION 1: JOB DETAILS =====
-st.header("Step 2: Enter Job Details")
-st.caption("Provide information about the job you're applying for")
-
-# Action buttons
-action_col1, action_col2 = st.columns([1, 1])
-with action_col1:
-    if st.button("Use Sample Data", help="Fill in sample data to see how the app works"):
-        st.session_state["candidate_name"] = "Jane Smith"
-        st.session_state["candidate_address"] = "123 Main Street\nBoston, MA 02101"
-        st.session_state["resume_text"] = """Jane Smith
+# Filled in by "Use Sample Data"
+SAMPLE_RESUME = """Jane Smith
 123 Main Street, Boston, MA 02101
 jane.smith@email.com | (555) 123-4567
 
@@ -995,382 +2206,599 @@ Research Assistant, BU Computer Science Department - 2021-2023
 
 SKILLS
 Python, JavaScript, React, SQL, Git, AWS"""
-        st.session_state["company_name_sample"] = "Anthropic"
-        st.session_state["role_title_sample"] = "Software Engineer"
-        st.session_state["job_description_sample"] = """We're looking for a software engineer to join our team working on AI safety and research. You'll be building tools that help make AI systems more helpful, harmless, and honest.
+
+SAMPLE_JOB_DESCRIPTION = """We're looking for a software engineer to join our team working on AI safety and research. You'll be building tools that help make AI systems more helpful, harmless, and honest.
 
 Requirements:
 - Strong programming skills in Python
 - Experience with modern web frameworks
 - Passion for AI safety and alignment
 - Excellent communication skills"""
-        st.session_state["why_want_job_input"] = "I'm passionate about AI safety and want to contribute to building more reliable and beneficial AI systems. My experience in machine learning research and software development would allow me to make meaningful contributions to Anthropic's mission."
-        st.success("Sample data loaded! Check the sidebar and form fields.")
-        st.rerun()
 
-with action_col2:
-    if st.button("Clear Form", help="Clear all fields and start fresh"):
-        # Clear all session state keys related to the form
-        keys_to_clear = [
-            "company_name_sample", "role_title_sample", "job_description_sample",
-            "resume_text", "candidate_name", "candidate_address",
-            "company_name_key", "role_title_key", "job_description_key",
-            "additional_context_key", "resume_highlight_general", "why_want_job_input"
-        ]
-        for key in keys_to_clear:
-            if key in st.session_state:
-                del st.session_state[key]
-        st.success("Form cleared!")
+
+@page_section("job_details")
+def job_details_section():
+    resume_text = get_session_text("resume_text")
+
+    st.header("Step 2: Enter Job Details")
+    st.caption("Provide information about the job you're applying for")
+
+    # Action buttons
+    action_col1, action_col2 = st.columns([1, 1])
+    with action_col1:
+        if st.button("Use Sample Data", help="Fill in sample data to see how the app works"):
+            st.session_state["candidate_name"] = "Jane Smith"
+            st.session_state["candidate_address"] = "123 Main Street\nBoston, MA 02101"
+            set_session_text("resume_text", SAMPLE_RESUME)
+            # The profile widgets already rendered this run, so drop their state and let them
+            # pick the values above up on the rerun; the job fields below haven't rendered yet
+            for key in ("candidate_name_input", "candidate_address_input", "resume_text_input"):
+                st.session_state.pop(key, None)
+            st.session_state["company_name_key"] = "Anthropic"
+            st.session_state["role_title_key"] = "Software Engineer"
+            st.session_state["job_description_key"] = SAMPLE_JOB_DESCRIPTION
+            st.session_state["why_want_job_input"] = "I'm passionate about AI safety and want to contribute to building more reliable and beneficial AI systems. My experience in machine learning research and software development would allow me to make meaningful contributions to Anthropic's mission."
+            st.success("Sample data loaded! Check the sidebar and form fields.")
+            st.rerun()
+
+    with action_col2:
+        if st.button("Clear Form", help="Clear all fields and start fresh"):
+            # Clear all session state keys related to the form
+            keys_to_clear = [
+                "resume_text_ref", "candidate_name", "candidate_address",
+                "candidate_name_input", "candidate_address_input", "resume_text_input",
+                "company_name_key", "role_title_key", "job_description_key",
+                "additional_context_key", "resume_highlight_general", "suggested_highlights",
+                "why_want_job_input", "loaded_resume_id", "loaded_resume_ref",
+                "resume_ranked_for", "resume_ranked_jd", "resume_match"
+            ]
+            for key in keys_to_clear:
+                if key in st.session_state:
+                    del st.session_state[key]
+            st.success("Form cleared!")
+            st.rerun()
+
+    st.divider()
+
+    company_name = st.text_input(
+        "Company Name:",
+        key="company_name_key"
+    )
+    role_title = st.text_input(
+        "Role/Position Title:",
+        key="role_title_key"
+    )
+
+    job_description = st.text_area(
+        "Job Description (optional but recommended):",
+        height=150,
+        help="Paste the job description here for better-tailored cover letters.",
+        key="job_description_key"
+    )
+    # Saved resumes are ranked against the job description in the sidebar, which only a full run updates
+    ranked_jd = st.session_state.get("resume_ranked_jd")
+    if ranked_jd is not None and ranked_jd != input_key(job_description):
         st.rerun()
 
-st.divider()
+    additional_context = st.text_area(
+        "Additional Context (optional):",
+        height=100,
+        help='Any extra context for the AI. e.g., "This is a general application, not for a specific role" or "I\'m currently working at X and looking to transition to Y"',
+        placeholder='e.g., "This is a general application to the company, not a specific job posting."',
+        key="additional_context_key"
+    )
 
-company_name = st.text_input(
-    "Company Name:",
-    value=st.session_state.get("company_name_sample", ""),
-    key="company_name_key"
-)
-role_title = st.text_input(
-    "Role/Position Title:",
-    value=st.session_state.get("role_title_sample", ""),
-    key="role_title_key"
-)
+    st.text_area(
+        "Want to highlight anything specific from your resume? (optional):",
+        height=80,
+        placeholder='e.g., "My internship at X where I did Y" or "The data pipeline project that reduced processing time by 60%"',
+        help="Specify particular experiences, projects, or achievements from your resume that you want emphasized in cover letters and answers.",
+        key="resume_highlight_general"
+    )
 
-job_description = st.text_area(
-    "Job Description (optional but recommended):",
-    value=st.session_state.get("job_description_sample", ""),
-    height=150,
-    help="Paste the job description here for better-tailored cover letters.",
-    key="job_description_key"
-)
+    # Suggest resume bullets that overlap the job description (structured resume, parsed once)
+    if resume_text and job_description:
+        highlight_suggestions = suggest_highlights(structure_resume(resume_text)[1], job_description)
+        if highlight_suggestions:
+            # Combined with the typed highlights by job_inputs()
+            st.multiselect(
+                "Suggested highlights (from your resume, ranked by relevance to the job):",
+                highlight_suggestions,
+                key="suggested_highlights",
+                help="Selected items are added to the highlights above."
+            )
 
-additional_context = st.text_area(
-    "Additional Context (optional):",
-    height=100,
-    help='Any extra context for the AI. e.g., "This is a general application, not for a specific role" or "I\'m currently working at X and looking to transition to Y"',
-    placeholder='e.g., "This is a general application to the company, not a specific job posting."',
-    key="additional_context_key"
-)
 
-resume_highlight = st.text_area(
-    "Want to highlight anything specific from your resume? (optional):",
-    height=80,
-    placeholder='e.g., "My internship at X where I did Y" or "The data pipeline project that reduced processing time by 60%"',
-    help="Specify particular experiences, projects, or achievements from your resume that you want emphasized in cover letters and answers.",
-    key="resume_highlight_general"
-)
+job_details_section()
 
 st.divider()
 
 # ===== SECTION 2: GENERATE COVER LETTER =====
-st.header("Step 3: Generate Cover Letter")
-st.caption("Configure preferences and generate a tailored cover letter")
+@page_section("cover_letter")
+def cover_letter_section():
+    inputs = job_inputs()
+    candidate_name, candidate_address = inputs["candidate_name"], inputs["candidate_address"]
+    resume_text, company_name, role_title = inputs["resume_text"], inputs["company_name"], inputs["role_title"]
+    job_description, additional_context = inputs["job_description"], inputs["additional_context"]
+    resume_highlight = inputs["resume_highlight"]
 
-# Preferences
-st.subheader("Preferences")
+    st.header("Step 3: Generate Cover Letter")
+    st.caption("Configure preferences and generate a tailored cover letter")
 
-col1, col2 = st.columns(2)
+    # Preferences
+    st.subheader("Preferences")
 
-with col1:
-    length_option = st.radio(
-        "Letter Length:",
-        ["Concise (200-325 words)", "Standard (325-450 words)"],
-        index=0,
-        help="Concise is recommended for most applications"
-    )
+    col1, col2 = st.columns(2)
 
-with col2:
-    tone_option = st.selectbox(
-        "Tone:",
-        [
-            "Conversational - Warm but professional",
-            "Professional - Formal and traditional",
-            "Enthusiastic - Energetic and passionate",
-            "Confident - Bold and direct"
-        ],
-        index=0,
-        help="Match the tone to the company culture"
-    )
+    with col1:
+        length_option = st.radio(
+            "Letter Length:",
+            ["Concise (200-325 words)", "Standard (325-450 words)"],
+            index=0,
+            help="Concise is recommended for most applications"
+        )
 
-st.subheader("Statement of Interest")
+    with col2:
+        tone_option = st.selectbox(
+            "Tone:",
+            [
+                "Conversational - Warm but professional",
+                "Professional - Formal and traditional",
+                "Enthusiastic - Energetic and passionate",
+                "Confident - Bold and direct"
+            ],
+            index=0,
+            help="Match the tone to the company culture"
+        )
 
-# Generate statement button (placed before text area so generated content shows up)
-if st.button("Generate Statement", help="Auto-generate a 'why I want this job' statement based on your resume and the job details"):
-    if not all([resume_text, company_name, role_title]):
-        st.error("Please fill in your resume, company name, and role title to generate a statement.")
-    else:
-        with st.spinner("Generating statement..."):
-            try:
-                statement = generate_statement_of_interest(
-                    resume_text,
-                    company_name,
-                    role_title,
-                    job_description
-                )
-                st.session_state["why_want_job_input"] = statement
-                st.success("Statement generated!")
-                st.rerun()
-            except Exception as e:
-                st.error(f"Error generating statement: {str(e)}")
-
-why_want_job = st.text_area(
-    "Why do you want this job? (rough notes are fine):",
-    value=st.session_state.get("why_want_job_input", ""),
-    height=150,
-    help="Be honest and specific. This will be refined into professional cover letter language.",
-    key="why_want_job_input"
-)
+    st.subheader("Statement of Interest")
+
+    # Speculatively generate the statement in the background once the inputs settle
+    statement_key = None
+    prefetch_owner = None
+    if setting_enabled("PREFETCH_ENABLED") and all([resume_text, company_name, role_title]):
+        prefetch_owner = user_id or st.session_state.setdefault("session_id", uuid.uuid4().hex)
+        statement_key = schedule_statement_prefetch(prefetch_owner, resume_text, company_name, role_title, job_description)
+        if init_statement_prefetcher().ready(prefetch_owner, statement_key):
+            st.caption("A suggested statement is ready. Click 'Generate Statement' to use it.")
+
+    # Generate statement button (placed before text area so generated content shows up)
+    if st.button("Generate Statement", help="Auto-generate a 'why I want this job' statement based on your resume and the job details"):
+        if not all([resume_text, company_name, role_title]):
+            st.error("Please fill in your resume, company name, and role title to generate a statement.")
+        else:
+            with st.spinner("Generating statement..."):
+                try:
+                    # Use the prefetched statement (waiting if still in flight) before calling the API
+                    statement = take_prefetched_statement(prefetch_owner, statement_key) if statement_key else None
+                    if not statement:
+                        with llm_turn():
+                            statement = generate_statement_of_interest(
+                                resume_text,
+                                company_name,
+                                role_title,
+                                job_description
+                            )
+                    st.session_state["why_want_job_input"] = statement
+                    st.success("Statement generated!")
+                    rerun_section()
+                except (QuotaExceeded, SchedulerBusy) as e:
+                    st.warning(str(e))
+                except Exception as e:
+                    st.error(f"Error generating statement: {str(e)}")
 
-# Generate button
-if st.button("Generate Cover Letter", type="primary"):
-    if not all([candidate_name, candidate_address, resume_text, company_name, role_title, why_want_job]):
-        st.error("Please fill in all required fields.")
-    else:
-        with st.spinner("Generating your cover letter..."):
-            try:
-                # Parse preferences
-                length = "concise" if "Concise" in length_option else "standard"
-                tone = tone_option.split(" - ")[0].lower()
-
-                # Generate cover letter
-                cover_letter = generate_cover_letter(
-                    resume_text,
-                    candidate_name,
-                    candidate_address,
-                    company_name,
-                    role_title,
-                    why_want_job,
-                    job_description,
-                    additional_context,
-                    resume_highlight,
-                    length,
-                    tone
-                )
+    why_want_job = st.text_area(
+        "Why do you want this job? (rough notes are fine):",
+        height=150,
+        help="Be honest and specific. This will be refined into professional cover letter language.",
+        key="why_want_job_input"
+    )
 
-                # Store in session state for rating
-                st.session_state["last_cover_letter"] = cover_letter
-                st.session_state["last_generation_data"] = {
-                    "company": company_name,
-                    "role": role_title,
-                    "resume_text": resume_text,
-                    "job_description": job_description,
-                    "why_want_job": why_want_job
-                }
-                st.session_state["just_generated"] = True
-
-                # Track for application session (to avoid repetition)
-                if "application_session" not in st.session_state:
-                    st.session_state["application_session"] = []
-                st.session_state["application_session"].append({
-                    "type": "cover_letter",
-                    "content": cover_letter,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-
-            except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
-                st.info("Make sure your ANTHROPIC_API_KEY is set in the .env file.")
-
-# Display cover letter if it exists in session state
-if "last_cover_letter" in st.session_state and st.session_state["last_cover_letter"]:
-    cover_letter = st.session_state["last_cover_letter"]
-    gen_data = st.session_state.get("last_generation_data", {})
-
-    # Show success message
-    if st.session_state.get("just_generated", False):
-        st.success("Cover letter generated!")
-        st.session_state["just_generated"] = False
-    elif st.session_state.get("cover_letter_saved", False):
-        st.success("Cover letter saved!")
-        st.session_state["cover_letter_saved"] = False
-
-    # Display the cover letter
-    st.subheader("Your Cover Letter")
-    st.text_area("", value=cover_letter, height=500, key="generated_cl")
-
-    # Download buttons
-    st.subheader("Download")
-    download_col1, download_col2, download_col3 = st.columns(3)
-
-    with download_col1:
-        st.download_button(
-            label="Download as .txt",
-            data=cover_letter,
-            file_name=f"cover_letter_{gen_data.get('company', 'company').replace(' ', '_')}.txt",
-            mime="text/plain",
-            use_container_width=True
-        )
+    # Generate button
+    if st.button("Generate Cover Letter", type="primary"):
+        # An empty motivation falls back to the prefetched statement of interest
+        if not why_want_job and statement_key:
+            why_want_job = take_prefetched_statement(prefetch_owner, statement_key) or ""
+        if not all([candidate_name, candidate_address, resume_text, company_name, role_title, why_want_job]):
+            st.error("Please fill in all required fields.")
+        else:
+            with st.spinner("Generating your cover letter..."):
+                try:
+                    # Parse preferences
+                    length = "concise" if "Concise" in length_option else "standard"
+                    tone = tone_option.split(" - ")[0].lower()
+
+                    # Generate cover letter
+                    with llm_turn():
+                        cover_letter = generate_cover_letter(
+                            resume_text,
+                            candidate_name,
+                            candidate_address,
+                            company_name,
+                            role_title,
+                            why_want_job,
+                            job_description,
+                            additional_context,
+                            resume_highlight,
+                            length,
+                            tone
+                        )
+                        # Check the letter against what was asked for, repairing only the parts that miss
+                        cover_letter, letter_issues = repair_cover_letter(cover_letter, {
+                            "company": company_name,
+                            "role": role_title,
+                            "resume_text": resume_text,
+                            "job_description": job_description,
+                            "why_want_job": why_want_job,
+                            "tone": tone
+                        }, length, candidate_name)
+
+                    # Store in session state for rating
+                    set_cover_letter(cover_letter)
+                    st.session_state["last_generation_data"] = {
+                        "company": company_name,
+                        "role": role_title,
+                        "resume_text_ref": put_text(resume_text),
+                        "job_description_ref": put_text(job_description),
+                        "why_want_job": why_want_job,
+                        "tone": tone
+                    }
+                    st.session_state["just_generated"] = True
+                    st.session_state["last_letter_issues"] = [issue["detail"] for issue in letter_issues]
 
-    with download_col2:
-        docx_data = export_to_docx(cover_letter)
-        st.download_button(
-            label="Download as .docx",
-            data=docx_data,
-            file_name=f"cover_letter_{gen_data.get('company', 'company').replace(' ', '_')}.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            use_container_width=True
-        )
+                    # Track for application session (to avoid repetition)
+                    track_application_item("cover_letter", cover_letter)
 
-    with download_col3:
-        pdf_data = export_to_pdf(cover_letter)
-        st.download_button(
-            label="Download as .pdf",
-            data=pdf_data,
-            file_name=f"cover_letter_{gen_data.get('company', 'company').replace(' ', '_')}.pdf",
-            mime="application/pdf",
-            use_container_width=True
-        )
+                except (QuotaExceeded, SchedulerBusy) as e:
+                    st.warning(str(e))
+                except Exception as e:
+                    st.error(f"An error occurred: {str(e)}")
+                    st.info("Make sure your ANTHROPIC_API_KEY is set in the .env file.")
+
+    # Display cover letter if it exists in session state
+    if "last_cover_letter" in st.session_state and st.session_state["last_cover_letter"]:
+        cover_letter = st.session_state["last_cover_letter"]
+        gen_data = expand_generation_data(st.session_state.get("last_generation_data", {}))
+        # Regenerating a paragraph or rating needs the inputs the letter was written from
+        inputs_gone = gen_data.get("missing_text")
+
+        # Show success message
+        if st.session_state.get("just_generated", False):
+            st.success("Cover letter generated!")
+            st.session_state["just_generated"] = False
+        elif st.session_state.get("cover_letter_saved", False):
+            st.success("Cover letter saved!")
+            st.session_state["cover_letter_saved"] = False
+
+        # Display the cover letter
+        st.subheader("Your Cover Letter")
+        if st.session_state.get("last_letter_issues"):
+            st.caption("Worth a look before sending: " + "; ".join(st.session_state["last_letter_issues"]))
+        st.text_area("Cover letter", value=cover_letter, height=500, key="generated_cl", label_visibility="collapsed")
+        if inputs_gone:
+            st.warning(
+                f"The {' and '.join(field.replace('_', ' ') for field in inputs_gone)} this letter was written from "
+                "is no longer available, so paragraphs can't be regenerated and the letter can't be rated. "
+                "Generate the letter again to do either."
+            )
 
-    # Save button (only for logged-in users)
-    st.divider()
-    if is_guest:
-        st.info("Create an account to save cover letters to your history!")
-    else:
-        if st.button("Save Cover Letter", use_container_width=True):
-            cover_letter_data = {
-                "company": gen_data.get("company", ""),
-                "role": gen_data.get("role", ""),
-                "cover_letter": cover_letter,
-                "date_created": datetime.now().strftime("%Y-%m-%d %H:%M")
-            }
-            save_cover_letter(user_id, cover_letter_data)
-            st.session_state["cover_letter_saved"] = True
-            st.rerun()
+        # Rewrite a single paragraph instead of regenerating the whole letter
+        letter_parts = parse_letter(cover_letter)
+        if letter_parts and not inputs_gone:
+            with st.expander("Regenerate a paragraph", expanded=False):
+                paragraph_labels = [
+                    f"Paragraph {idx + 1}: {paragraph[:60]}..." if len(paragraph) > 60 else f"Paragraph {idx + 1}: {paragraph}"
+                    for idx, paragraph in enumerate(letter_parts["body"])
+                ]
+                # A form, so choosing a paragraph and typing the request don't rerun anything
+                with st.form("regenerate_paragraph_form", border=False):
+                    selected_paragraph = st.selectbox("Paragraph to rewrite:", paragraph_labels, key="regen_paragraph_choice")
+                    change_request = st.text_input(
+                        "What should change? (optional):",
+                        placeholder='e.g., "Mention my research publication" or "Make it shorter"',
+                        key="regen_paragraph_request"
+                    )
+                    if st.form_submit_button("Regenerate Paragraph", use_container_width=True):
+                        with st.spinner("Rewriting paragraph..."):
+                            try:
+                                with llm_turn():
+                                    set_cover_letter(regenerate_paragraph(
+                                        cover_letter,
+                                        paragraph_labels.index(selected_paragraph),
+                                        gen_data,
+                                        change_request
+                                    ))
+                                st.session_state.pop("last_letter_issues", None)
+                                rerun_section()
+                            except (QuotaExceeded, SchedulerBusy) as e:
+                                st.warning(str(e))
+                            except Exception as e:
+                                st.error(f"Error regenerating paragraph: {str(e)}")
+
+        # Download buttons
+        st.subheader("Download")
+        download_col1, download_col2, download_col3 = st.columns(3)
+
+        with download_col1:
+            st.download_button(
+                label="Download as .txt",
+                data=cover_letter,
+                file_name=f"cover_letter_{gen_data.get('company', 'company').replace(' ', '_')}.txt",
+                mime="text/plain",
+                use_container_width=True
+            )
 
-    # Rating system (optional save for guests)
-    if not is_guest:
+        with download_col2:
+            docx_data = export_to_docx(cover_letter)
+            st.download_button(
+                label="Download as .docx",
+                data=docx_data,
+                file_name=f"cover_letter_{gen_data.get('company', 'company').replace(' ', '_')}.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                use_container_width=True
+            )
+
+        with download_col3:
+            pdf_data = export_to_pdf(cover_letter)
+            st.download_button(
+                label="Download as .pdf",
+                data=pdf_data,
+                file_name=f"cover_letter_{gen_data.get('company', 'company').replace(' ', '_')}.pdf",
+                mime="application/pdf",
+                use_container_width=True
+            )
+
+        # Save button (only for logged-in users)
         st.divider()
-        st.subheader("Rate this cover letter")
-        st.caption("Help improve future generations by rating this output")
-
-        rating_col1, rating_col2 = st.columns(2)
-
-        with rating_col1:
-            if st.button("Good", use_container_width=True):
-                rating_data = {
-                    "rating": "good",
-                    "cover_letter": cover_letter,
-                    "resume_text": gen_data.get("resume_text", ""),
-                    "job_description": gen_data.get("job_description", ""),
-                    "why_want_job": gen_data.get("why_want_job", ""),
-                    "company": gen_data.get("company", ""),
-                    "role": gen_data.get("role", ""),
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                save_rating(user_id, rating_data)
-                st.success("Thanks for your feedback!")
-
-        with rating_col2:
-            if st.button("Bad", use_container_width=True):
-                rating_data = {
-                    "rating": "bad",
-                    "cover_letter": cover_letter,
-                    "resume_text": gen_data.get("resume_text", ""),
-                    "job_description": gen_data.get("job_description", ""),
-                    "why_want_job": gen_data.get("why_want_job", ""),
-                    "company": gen_data.get("company", ""),
-                    "role": gen_data.get("role", ""),
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                save_rating(user_id, rating_data)
-                st.info("Thanks for your feedback. We'll use this to improve!")
+        if is_guest:
+            st.info("Create an account to save cover letters to your history!")
+        else:
+            if st.button("Save Cover Letter", use_container_width=True):
+                similar_letter, similar_score = find_similar_cover_letter(user_id, cover_letter)
+                if similar_letter and similar_score >= DUPLICATE_THRESHOLD:
+                    # Ask before saving a near-duplicate
+                    st.session_state["pending_duplicate"] = {"letter": similar_letter, "score": similar_score}
+                else:
+                    save_cover_letter(user_id, {
+                        "company": gen_data.get("company", ""),
+                        "role": gen_data.get("role", ""),
+                        "cover_letter": cover_letter,
+                        "date_created": datetime.now().strftime("%Y-%m-%d %H:%M")
+                    })
+                    st.session_state["cover_letter_saved"] = True
+                    # Full rerun so the sidebar history shows the new letter
+                    st.rerun()
+
+            pending_duplicate = st.session_state.get("pending_duplicate")
+            if pending_duplicate:
+                similar_letter = pending_duplicate["letter"]
+                st.warning(f"This is {pending_duplicate['score']:.0%} similar to your letter for {similar_letter['company']} - {similar_letter['role']} ({similar_letter['date_created']}).")
+                dup_col1, dup_col2, dup_col3 = st.columns(3)
+                dup_choice = None
+                with dup_col1:
+                    if st.button("Save changes only", use_container_width=True, help="Store this letter as a reference to the similar one plus the differences"):
+                        dup_choice = "delta"
+                with dup_col2:
+                    if st.button("Save full copy", use_container_width=True):
+                        dup_choice = "full"
+                with dup_col3:
+                    if st.button("Cancel", use_container_width=True):
+                        del st.session_state["pending_duplicate"]
+                        rerun_section()
+                if dup_choice:
+                    save_cover_letter(user_id, {
+                        "company": gen_data.get("company", ""),
+                        "role": gen_data.get("role", ""),
+                        "cover_letter": cover_letter,
+                        "date_created": datetime.now().strftime("%Y-%m-%d %H:%M")
+                    }, reference=similar_letter if dup_choice == "delta" else None)
+                    del st.session_state["pending_duplicate"]
+                    st.session_state["cover_letter_saved"] = True
+                    # Full rerun so the sidebar history shows the new letter
+                    st.rerun()
+
+        # Rating system (optional save for guests)
+        if not is_guest and not inputs_gone:
+            st.divider()
+            st.subheader("Rate this cover letter")
+            st.caption("Help improve future generations by rating this output")
+
+            rating_col1, rating_col2 = st.columns(2)
+
+            with rating_col1:
+                if st.button("Good", use_container_width=True):
+                    rating_data = {
+                        "rating": "good",
+                        "cover_letter": cover_letter,
+                        "resume_text": gen_data.get("resume_text", ""),
+                        "job_description": gen_data.get("job_description", ""),
+                        "why_want_job": gen_data.get("why_want_job", ""),
+                        "company": gen_data.get("company", ""),
+                        "role": gen_data.get("role", ""),
+                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    }
+                    save_rating(user_id, rating_data)
+                    st.success("Thanks for your feedback!")
+
+            with rating_col2:
+                if st.button("Bad", use_container_width=True):
+                    rating_data = {
+                        "rating": "bad",
+                        "cover_letter": cover_letter,
+                        "resume_text": gen_data.get("resume_text", ""),
+                        "job_description": gen_data.get("job_description", ""),
+                        "why_want_job": gen_data.get("why_want_job", ""),
+                        "company": gen_data.get("company", ""),
+                        "role": gen_data.get("role", ""),
+                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    }
+                    save_rating(user_id, rating_data)
+                    st.info("Thanks for your feedback. We'll use this to improve!")
+
+
+cover_letter_section()
 
 # Answer Application Question Section
 st.divider()
 
-# Header with Clear Session button
-col1, col2 = st.columns([3, 1])
-with col1:
-    st.header("Step 4: Answer Application Question (Optional)")
-    st.caption("Got a random question on the application? Generate a tailored answer based on your resume and job details.")
-with col2:
-    if st.button("Clear Session", help="Start fresh for a new application. Clears tracked responses to avoid repetition."):
-        st.session_state["application_session"] = []
-        st.success("Session cleared!")
-        st.rerun()
+@page_section("application_question")
+def application_question_section():
+    inputs = job_inputs()
+    resume_text, company_name, role_title = inputs["resume_text"], inputs["company_name"], inputs["role_title"]
+    job_description, additional_context = inputs["job_description"], inputs["additional_context"]
+    resume_highlight = inputs["resume_highlight"]
 
-# Show session info if exists
-if "application_session" in st.session_state and st.session_state["application_session"]:
-    with st.expander(f"Already written for this application ({len(st.session_state['application_session'])} item(s))", expanded=False):
-        for idx, item in enumerate(st.session_state["application_session"]):
-            st.markdown(f"**{idx + 1}. {item['type'].replace('_', ' ').title()}** ({item['timestamp']})")
-            st.text(item['content'][:150] + "..." if len(item['content']) > 150 else item['content'])
-            st.divider()
+    # Header with Clear Session button
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.header("Step 4: Answer Application Question (Optional)")
+        st.caption("Got a random question on the application? Generate a tailored answer based on your resume and job details.")
+    with col2:
+        if st.button("Clear Session", help="Start fresh for a new application. Clears tracked responses to avoid repetition."):
+            st.session_state["application_session"] = []
+            st.success("Session cleared!")
+            rerun_section()
+
+    # Show session info if exists
+    if "application_session" in st.session_state and st.session_state["application_session"]:
+        with st.expander(f"Already written for this application ({len(st.session_state['application_session'])} item(s))", expanded=False):
+            for idx, item in enumerate(st.session_state["application_session"]):
+                st.markdown(f"**{idx + 1}. {item['type'].replace('_', ' ').title()}** ({item['timestamp']})")
+                st.text(item['content'][:150] + "..." if len(item['content']) > 150 else item['content'])
+                st.divider()
+
+    # The question inputs are a form: nothing reruns until "Generate Answer" is pressed
+    with st.form("application_question_form", border=False):
+        application_question = st.text_area(
+            "Paste your application question here:",
+            height=100,
+            placeholder='e.g., "Why are you interested in working at [Company]?" or "Describe a time you overcame a challenge."',
+            key="app_question_input"
+        )
 
-application_question = st.text_area(
-    "Paste your application question here:",
-    height=100,
-    placeholder='e.g., "Why are you interested in working at [Company]?" or "Describe a time you overcame a challenge."',
-    key="app_question_input"
-)
+        question_notes = st.text_area(
+            "Your notes / draft response (optional but recommended):",
+            height=120,
+            placeholder='e.g., "I\'ve been using this app for months and love it" or "I led a similar project at my previous company where..."',
+            help="Add specific context, personal experiences, or rough notes related to this question. This helps the AI craft a more authentic, detailed answer.",
+            key="question_notes_input"
+        )
 
-question_notes = st.text_area(
-    "Your notes / draft response (optional but recommended):",
-    height=120,
-    placeholder='e.g., "I\'ve been using this app for months and love it" or "I led a similar project at my previous company where..."',
-    help="Add specific context, personal experiences, or rough notes related to this question. This helps the AI craft a more authentic, detailed answer.",
-    key="question_notes_input"
-)
+        # Checkbox to avoid repetition
+        avoid_repetition = st.checkbox(
+            "Avoid repeating previous responses",
+            value=True,
+            help="When checked, the AI will avoid repeating experiences/skills from your cover letter or previous answers."
+        )
 
-# Checkbox to avoid repetition
-avoid_repetition = st.checkbox(
-    "Avoid repeating previous responses",
-    value=True,
-    help="When checked, the AI will avoid repeating experiences/skills from your cover letter or previous answers."
-)
+        fresh_answer = st.checkbox(
+            "Always write a fresh answer",
+            value=False,
+            help="By default, if you've already answered a very similar question for this company and role, that answer is shown instantly as a starting point."
+        )
 
-if st.button("Generate Answer", type="secondary"):
-    if not application_question.strip():
-        st.error("Please enter a question.")
-    elif not all([resume_text, company_name, role_title]):
-        st.error("Please make sure you have a resume loaded and company/role information filled in.")
-    else:
-        with st.spinner("Generating answer..."):
-            try:
-                # Build previous responses string if checkbox is checked
-                previous_responses_text = ""
-                if avoid_repetition and "application_session" in st.session_state and st.session_state["application_session"]:
-                    previous_items = []
-                    for item in st.session_state["application_session"]:
-                        previous_items.append(f"--- {item['type'].replace('_', ' ').title()} ---\n{item['content']}\n")
-                    previous_responses_text = "\n".join(previous_items)
-
-                answer = generate_application_answer(
-                    application_question,
-                    resume_text,
-                    company_name,
-                    role_title,
-                    job_description,
-                    additional_context,
-                    previous_responses_text,
-                    question_notes,
-                    resume_highlight
-                )
+        answer_requested = st.form_submit_button("Generate Answer", type="secondary")
+
+    def write_answer(request):
+        """Generate an answer for `request` and remember it for similar questions. Returns True on success."""
+        try:
+            with st.spinner("Generating answer..."):
+                with llm_turn():
+                    answer = generate_application_answer(
+                        request["question"],
+                        resume_text,
+                        company_name,
+                        role_title,
+                        job_description,
+                        additional_context,
+                        request["previous_responses"],
+                        request["question_notes"],
+                        resume_highlight
+                    )
+        except (QuotaExceeded, SchedulerBusy) as e:
+            st.warning(str(e))
+            return False
+        except Exception as e:
+            st.error(f"Error generating answer: {str(e)}")
+            return False
+
+        init_answer_cache().store(answer_owner(), request["scope"], request["question"], answer, company_name)
+        reused = st.session_state.get("last_app_reused")
+        if reused:
+            # The fresh answer replaces the reused one in this application's history
+            reused_item = f"Q: {st.session_state['last_app_question']}\nA: {reused['answer']}"
+            items = st.session_state.get("application_session", [])
+            items[:] = [item for item in items if item["content"] != reused_item]
+        st.session_state["last_app_answer"] = answer
+        st.session_state["last_app_question"] = request["question"]
+        st.session_state["last_app_reused"] = None
+
+        # Track this answer in application session
+        track_application_item("application_question", f"Q: {request['question']}\nA: {answer}")
+        return True
+
+    if answer_requested:
+        if not application_question.strip():
+            st.error("Please enter a question.")
+        elif not all([resume_text, company_name, role_title]):
+            st.error("Please make sure you have a resume loaded and company/role information filled in.")
+        else:
+            # Build previous responses string if checkbox is checked
+            previous_responses_text = ""
+            if avoid_repetition and "application_session" in st.session_state and st.session_state["application_session"]:
+                previous_items = []
+                for item in st.session_state["application_session"]:
+                    previous_items.append(f"--- {item['type'].replace('_', ' ').title()} ---\n{item['content']}\n")
+                previous_responses_text = "\n".join(previous_items)
+
+            request = {
+                "question": application_question,
+                "question_notes": question_notes,
+                "previous_responses": previous_responses_text,
+                "scope": answer_scope(company_name, role_title, text_hash(resume_text), question_notes),
+            }
+            st.session_state["last_app_request"] = request
 
-                st.session_state["last_app_answer"] = answer
+            earlier = None if fresh_answer else init_answer_cache().lookup(
+                answer_owner(), request["scope"], application_question, company_name
+            )
+            if earlier:
+                st.session_state["last_app_answer"] = earlier["answer"]
                 st.session_state["last_app_question"] = application_question
+                st.session_state["last_app_reused"] = earlier
+                track_application_item("application_question", f"Q: {application_question}\nA: {earlier['answer']}")
+            else:
+                write_answer(request)
+
+    # Display generated answer if it exists
+    if "last_app_answer" in st.session_state and st.session_state["last_app_answer"]:
+        st.subheader("Generated Answer")
+        reused = st.session_state.get("last_app_reused")
+        if reused:
+            st.info(
+                f"Reused your answer from {datetime.fromtimestamp(reused['saved_at']).strftime('%H:%M')} "
+                f"to a similar question ({reused['score']:.0%} match): \"{reused['question']}\""
+            )
+            if st.button("Write a fresh answer instead", key="fresh_app_answer") and write_answer(st.session_state["last_app_request"]):
+                rerun_section()
+        st.text_area(
+            "Answer", value=st.session_state["last_app_answer"], height=150, key="generated_answer_display",
+            label_visibility="collapsed",
+        )
 
-                # Track this answer in application session
-                if "application_session" not in st.session_state:
-                    st.session_state["application_session"] = []
-                st.session_state["application_session"].append({
-                    "type": "application_question",
-                    "content": f"Q: {application_question}\nA: {answer}",
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-
-            except Exception as e:
-                st.error(f"Error generating answer: {str(e)}")
-
-# Display generated answer if it exists
-if "last_app_answer" in st.session_state and st.session_state["last_app_answer"]:
-    st.subheader("Generated Answer")
-    st.text_area("", value=st.session_state["last_app_answer"], height=150, key="generated_answer_display")
-
-    # Download button
-    st.download_button(
-        label="Download Answer",
-        data=st.session_state["last_app_answer"],
-        file_name=f"application_answer_{company_name.replace(' ', '_') if company_name else 'answer'}.txt",
-        mime="text/plain"
-    )
+        # Download button
+        st.download_button(
+            label="Download Answer",
+            data=st.session_state["last_app_answer"],
+            file_name=f"application_answer_{company_name.replace(' ', '_') if company_name else 'answer'}.txt",
+            mime="text/plain"
+        )
+
+
+application_question_section()
+
+save_durable_state()
+
+# Measure this session's state and this full run for the Diagnostics panel
+st.session_state["session_footprint_bytes"] = record_session_footprint()
+init_rerun_timings().record("app", time.perf_counter() - RUN_STARTED)
@@ -0,0 +1,72 @@
+"""Bulk ZIP export of a user's whole cover letter history.
+
+Letters are rendered to .txt/.docx/.pdf in a process pool and written to the
+archive as each one finishes. Only a small window of letters is in flight at
+any time, so memory stays bounded regardless of history size.
+"""
+
+import multiprocessing
+import re
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from export_engine import ExportEngine
+
+_engine = None
+
+
+def _init_worker(font_path):
+    """Load the export skeletons and font once per worker process."""
+    global _engine
+    _engine = ExportEngine(font_path=font_path)
+
+
+def _render(letter):
+    """Render one letter in a worker. Returns (base_name, {extension: bytes})."""
+    base_name, text = letter
+    return base_name, {
+        "txt": text.encode("utf-8"),
+        "docx": _engine.to_docx(text),
+        "pdf": _engine.to_pdf(text),
+    }
+
+
+def archive_name(cover_letter):
+    """File name (without extension) for a saved letter inside the archive."""
+    def safe(value):
+        return re.sub(r"[^A-Za-z0-9]+", "_", value or "").strip("_")[:40] or "untitled"
+    date = safe(str(cover_letter.get("date_created", ""))[:10])
+    return f"{date}_{safe(cover_letter.get('company'))}_{safe(cover_letter.get('role'))}_{cover_letter['id']}"
+
+
+def write_history_zip(letters, out_file, total=None, font_path=None, workers=2, progress=None):
+    """Stream (base_name, text) pairs into a ZIP written to `out_file`.
+
+    `progress(done, total)` is called after each letter is added. Returns the
+    number of letters written.
+    """
+    # spawn: forking the multi-threaded Streamlit server is not safe
+    context = multiprocessing.get_context("spawn")
+    window = max(1, workers * 2)
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(font_path,)) as pool, \
+            zipfile.ZipFile(out_file, "w", zipfile.ZIP_DEFLATED) as archive:
+        in_flight = deque()
+        letters = iter(letters)
+        while True:
+            while len(in_flight) < window:
+                letter = next(letters, None)
+                if letter is None:
+                    break
+                in_flight.append(pool.submit(_render, letter))
+            if not in_flight:
+                return done
+
+            base_name, files = in_flight.popleft().result()
+            for extension, data in files.items():
+                archive.writestr(f"{base_name}.{extension}", data)
+            done += 1
+            if progress:
+                progress(done, total)
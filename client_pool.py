@@ -0,0 +1,119 @@
+"""Pool of per-user authenticated Supabase clients.
+
+Each signed-in user gets their own client, so auth state never leaks between
+users and one user's requests don't queue behind another's. The pool is
+bounded: least-recently-used and idle clients are evicted, and an evicted
+user's client is rebuilt from the tokens kept in their session. Access tokens
+are refreshed centrally, shortly before they expire.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def session_tokens(session):
+    """Plain dict of the token fields we keep for a gotrue Session."""
+    return {
+        "access_token": session.access_token,
+        "refresh_token": session.refresh_token,
+        "expires_at": session.expires_at or int(time.time()) + (session.expires_in or 3600),
+    }
+
+
+class _Entry:
+    def __init__(self, client, tokens):
+        self.client = client
+        self.tokens = tokens
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class ClientPool:
+    """Bounded LRU pool of Supabase clients keyed by user id."""
+
+    def __init__(self, factory, max_clients=200, idle_timeout=1800, refresh_margin=120):
+        self._factory = factory
+        self._max_clients = max_clients
+        self._idle_timeout = idle_timeout
+        self._refresh_margin = refresh_margin
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0, "evicted": 0, "refreshed": 0, "updated": 0}
+
+    def new_client(self):
+        """A fresh, unpooled client (used for sign-up and sign-in)."""
+        return self._factory()
+
+    def sign_in(self, email, password):
+        """Sign in on a dedicated client and pool it. Returns (user, tokens)."""
+        client = self._factory()
+        response = client.auth.sign_in_with_password({"email": email, "password": password})
+        tokens = session_tokens(response.session)
+        self._store(response.user.id, _Entry(client, tokens))
+        return response.user, tokens
+
+    def get(self, user_id, tokens):
+        """Return (client, tokens) for a user, recreating or refreshing as needed.
+
+        `tokens` are the caller's last known tokens; the returned tokens may be
+        newer after a refresh and should be saved back by the caller. When the
+        caller holds newer tokens than the pooled client (the user signed in
+        again, or another replica refreshed them), the pooled client's session
+        is updated in place rather than keeping the stale one.
+        """
+        self._evict_idle()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                self.stats["reused"] += 1
+
+        if entry is None:
+            client = self._factory()
+            client.auth.set_session(tokens["access_token"], tokens["refresh_token"])
+            entry = _Entry(client, dict(tokens))
+            self._store(user_id, entry)
+
+        with entry.lock:
+            entry.last_used = time.monotonic()
+            if tokens["expires_at"] > entry.tokens["expires_at"] and tokens["access_token"] != entry.tokens["access_token"]:
+                response = entry.client.auth.set_session(tokens["access_token"], tokens["refresh_token"])
+                entry.tokens = session_tokens(response.session) if response.session else dict(tokens)
+                self.stats["updated"] += 1
+            if entry.tokens["expires_at"] - time.time() < self._refresh_margin:
+                response = entry.client.auth.refresh_session(entry.tokens["refresh_token"])
+                entry.tokens = session_tokens(response.session)
+                self.stats["refreshed"] += 1
+            return entry.client, dict(entry.tokens)
+
+    def release(self, user_id):
+        """Sign a user's client out and drop it from the pool."""
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            try:
+                entry.client.auth.sign_out()
+            except Exception:
+                pass
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _store(self, user_id, entry):
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            self.stats["created"] += 1
+            while len(self._entries) > self._max_clients:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self._idle_timeout
+        with self._lock:
+            idle = [user_id for user_id, entry in self._entries.items() if entry.last_used < cutoff]
+            for user_id in idle:
+                del self._entries[user_id]
+                self.stats["evicted"] += 1
@@ -0,0 +1,74 @@
+"""Client-side compression codec for large text columns.
+
+Large values are stored as `~cz~` + base64(header + compressed bytes), which
+fits in existing Postgres text columns. The header's first byte is a format
+version (1 = gzip, 2 = zstd), followed by the original UTF-8 length as 4
+big-endian bytes so sizes can be reported without decompressing. Values
+without the prefix are plain text and pass through untouched, so compressed
+and uncompressed rows can coexist.
+"""
+
+import base64
+import gzip
+import struct
+
+PREFIX = "~cz~"
+VERSION_GZIP = 1
+VERSION_ZSTD = 2
+
+# Below this many bytes compression isn't worth the base64 overhead
+DEFAULT_MIN_BYTES = 1024
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def is_encoded(value):
+    """True if `value` was produced by encode_text."""
+    return isinstance(value, str) and value.startswith(PREFIX)
+
+
+def encode_text(text, algorithm="zstd", min_bytes=DEFAULT_MIN_BYTES):
+    """Compress `text` for storage if it is large enough to benefit."""
+    if not text or is_encoded(text):
+        return text
+    raw = text.encode("utf-8")
+    if len(raw) < min_bytes:
+        return text
+
+    if algorithm == "zstd" and zstandard is not None:
+        version, body = VERSION_ZSTD, zstandard.ZstdCompressor(level=9).compress(raw)
+    else:
+        version, body = VERSION_GZIP, gzip.compress(raw, compresslevel=9, mtime=0)
+
+    encoded = PREFIX + base64.b64encode(struct.pack(">BI", version, len(raw)) + body).decode("ascii")
+    # Keep the plain text if compression didn't actually save space
+    return encoded if len(encoded) < len(text) else text
+
+
+def decode_text(value):
+    """Return the plain text for a stored value (compressed or not)."""
+    if not is_encoded(value):
+        return value
+    payload = base64.b64decode(value[len(PREFIX):])
+    version, _ = struct.unpack(">BI", payload[:5])
+    body = payload[5:]
+    if version == VERSION_GZIP:
+        return gzip.decompress(body).decode("utf-8")
+    if version == VERSION_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("This text is zstd-compressed; install the zstandard package to read it.")
+        return zstandard.ZstdDecompressor().decompress(body).decode("utf-8")
+    raise ValueError(f"Unknown text codec version {version}")
+
+
+def plain_size(value):
+    """UTF-8 size of the plain text behind a stored value, without decompressing it."""
+    if not value:
+        return 0
+    if not is_encoded(value):
+        return len(value.encode("utf-8"))
+    header = base64.b64decode(value[len(PREFIX):len(PREFIX) + 8])
+    return struct.unpack(">BI", header[:5])[1]
@@ -0,0 +1,311 @@
+"""Deadlines, a circuit breaker and degraded mode for Supabase calls.
+
+Every database call runs on a worker thread and is abandoned once its
+deadline passes, so a slow Supabase can't stall a rerun for longer than the
+deadline. Failures and slow calls feed a circuit breaker; once it trips,
+calls are not attempted at all until a cool-down passes and a single probe
+succeeds. While the breaker is open, reads are served from the last data
+that loaded successfully and writes wait in a bounded queue that is
+replayed in the background when the database recovers.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from session_store import deep_sizeof
+
+
+class DatabaseUnavailable(Exception):
+    """The call was not attempted (breaker open) or missed its deadline."""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a rolling window of call outcomes.
+
+    A call counts as bad if it failed or took longer than `slow_call`
+    seconds. The breaker opens when at least `min_calls` outcomes are in the
+    window and the bad fraction reaches `failure_ratio`. After
+    `reset_timeout` seconds one probe call is let through (half-open); its
+    outcome closes the breaker or opens it again.
+    """
+
+    def __init__(self, window=20, min_calls=5, failure_ratio=0.5, slow_call=2.0, reset_timeout=30.0):
+        self.slow_call = slow_call
+        self._min_calls = min_calls
+        self._failure_ratio = failure_ratio
+        self._reset_timeout = reset_timeout
+        self._outcomes = deque(maxlen=window)
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats = {"trips": 0, "rejected": 0, "failures": 0, "slow": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self._reset_timeout:
+                return "half_open"
+            return self._state
+
+    def allow(self):
+        """True if a call may be attempted now (claims the probe when half-open)."""
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if not self._probing and time.monotonic() - self._opened_at >= self._reset_timeout:
+                self._probing = True
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record(self, ok, seconds):
+        """Record one attempted call. Returns True if this closed the breaker."""
+        slow = seconds > self.slow_call
+        with self._lock:
+            if not ok:
+                self.stats["failures"] += 1
+            elif slow:
+                self.stats["slow"] += 1
+            good = ok and not slow
+
+            if self._state == "open":
+                self._probing = False
+                if good:
+                    self._state = "closed"
+                    self._outcomes.clear()
+                    return True
+                self._opened_at = time.monotonic()
+                return False
+
+            self._outcomes.append(good)
+            bad = self._outcomes.count(False)
+            if len(self._outcomes) >= self._min_calls and bad / len(self._outcomes) >= self._failure_ratio:
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self.stats["trips"] += 1
+            return False
+
+
+class LastKnownGood:
+    """LRU of the most recent successful result per read key, bounded by count and bytes.
+
+    Read results can be whole cover-letter histories, so the entry count
+    alone doesn't bound memory; the approximate size of each result is
+    tracked and the least recently used are evicted beyond `max_bytes`.
+    """
+
+    def __init__(self, max_entries=2000, max_bytes=64 * 1024 * 1024):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, key, value):
+        nbytes = deep_sizeof(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (value, time.time(), nbytes)
+            self._bytes += nbytes
+            while len(self._entries) > 1 and (len(self._entries) > self._max_entries or self._bytes > self._max_bytes):
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def get(self, key):
+        """Return (value, saved_at), or (None, None) if nothing was ever loaded."""
+        with self._lock:
+            value, saved_at, _ = self._entries.get(key, (None, None, 0))
+            return value, saved_at
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return self._bytes
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class DBGuard:
+    """Runs database calls under a deadline and a shared circuit breaker."""
+
+    def __init__(self, timeout=5.0, breaker=None, cache_entries=2000, cache_bytes=64 * 1024 * 1024,
+                 queue_size=500, max_workers=8):
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = LastKnownGood(cache_entries, cache_bytes)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self._writes = deque()
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._flushing = False
+        self.stats = {"calls": 0, "timeouts": 0, "stale_reads": 0, "queued": 0, "replayed": 0, "dropped": 0,
+                      "in_doubt": 0}
+
+    def _incr(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    @property
+    def degraded(self):
+        """True while the breaker is not closed or queued writes are waiting."""
+        return self.breaker.state != "closed" or self.pending_writes > 0
+
+    @property
+    def pending_writes(self):
+        with self._lock:
+            return len(self._writes)
+
+    def call(self, fn):
+        """Run `fn()` under the deadline. Raises DatabaseUnavailable or fn's own error.
+
+        A call that misses its deadline keeps running on its worker thread,
+        but its result is ignored.
+        """
+        if not self.breaker.allow():
+            raise DatabaseUnavailable("database circuit is open")
+        return self._run(fn)
+
+    def _run(self, fn):
+        return self._wait(*self._submit(fn))
+
+    def _submit(self, fn):
+        self._incr("calls")
+        start = time.monotonic()
+        future = self._executor.submit(fn)
+        # Stamped when the call finishes, so waiting on other calls first doesn't make it look slow
+        future.add_done_callback(lambda done: setattr(done, "finished_at", time.monotonic()))
+        return start, future
+
+    def _wait(self, start, future):
+        try:
+            result = future.result(timeout=max(0.0, self.timeout - (time.monotonic() - start)))
+        except FutureTimeout:
+            self._incr("timeouts")
+            self.breaker.record(False, time.monotonic() - start)
+            raise DatabaseUnavailable(f"database call exceeded {self.timeout:g}s")
+        except Exception:
+            self.breaker.record(False, getattr(future, "finished_at", time.monotonic()) - start)
+            raise
+        if self.breaker.record(True, getattr(future, "finished_at", time.monotonic()) - start) or self.pending_writes:
+            self._start_flush()
+        return result
+
+    def read(self, key, fn, default=None):
+        """Return (value, fresh). Falls back to the last good value for `key`, then `default`."""
+        try:
+            value = self.call(fn)
+        except Exception:
+            return self.stale(key, default)
+        self.cache.put(key, value)
+        return value, True
+
+    def read_many(self, reads):
+        """Run independent reads at the same time. `reads` maps name -> (key, fn, default).
+
+        Returns name -> (value, fresh), as `read` would for each. Every call
+        gets its own deadline and breaker outcome, so waiting on all of them
+        takes about as long as the slowest one.
+        """
+        started = {}
+        results = {}
+        for name, (key, fn, default) in reads.items():
+            if self.breaker.allow():
+                started[name] = self._submit(fn)
+            else:
+                results[name] = self.stale(key, default)
+        for name, (start, future) in started.items():
+            key, _, default = reads[name]
+            try:
+                value = self._wait(start, future)
+            except Exception:
+                results[name] = self.stale(key, default)
+                continue
+            self.cache.put(key, value)
+            results[name] = (value, True)
+        return results
+
+    def stale(self, key, default=None):
+        """Return (last good value for `key` or `default`, False) without calling the database."""
+        value, saved_at = self.cache.get(key)
+        if saved_at is None:
+            return default, False
+        self._incr("stale_reads")
+        return value, False
+
+    def write(self, description, fn):
+        """Run a write, or queue it while the breaker is open. Returns "saved" or "queued".
+
+        Only writes that were never attempted are queued. A write that missed
+        its deadline may still land, so it raises DatabaseUnavailable rather
+        than risk being applied twice.
+        """
+        # Writes queue behind earlier ones so a replay never overwrites newer data
+        if not self.pending_writes and self.breaker.allow():
+            self._run(fn)
+            return "saved"
+        with self._lock:
+            if len(self._writes) >= self._queue_size:
+                self._writes.popleft()
+                self.stats["dropped"] += 1
+            self._writes.append((description, fn))
+            self.stats["queued"] += 1
+        if self.breaker.state == "closed":
+            self._start_flush()
+        return "queued"
+
+    def _start_flush(self):
+        with self._lock:
+            if self._flushing or not self._writes:
+                return
+            self._flushing = True
+        threading.Thread(target=self._flush, daemon=True, name="db-flush").start()
+
+    def _flush(self):
+        """Replay queued writes in order, stopping once the breaker opens again.
+
+        A replay that misses its deadline is dropped and counted as in doubt
+        rather than retried, as `write` does for a first attempt.
+        """
+        try:
+            while True:
+                with self._lock:
+                    if not self._writes:
+                        return
+                    description, fn = self._writes[0]
+                if not self.breaker.allow():
+                    # Not attempted: it stays queued for the next flush
+                    return
+                try:
+                    self._run(fn)
+                except DatabaseUnavailable:
+                    # Missed its deadline but may still land, so it is never replayed again
+                    self._incr("in_doubt")
+                except Exception:
+                    # Rejected by the database itself; replaying it again won't help
+                    self._incr("dropped")
+                else:
+                    self._incr("replayed")
+                with self._lock:
+                    if self._writes and self._writes[0][1] is fn:
+                        self._writes.popleft()
+        finally:
+            with self._lock:
+                self._flushing = False
+
+    def snapshot(self):
+        """Breaker state and counters for the Diagnostics panel."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending_writes"] = [description for description, _ in self._writes]
+        stats["state"] = self.breaker.state
+        stats.update(self.breaker.stats)
+        stats["cached_reads"] = len(self.cache)
+        stats["cached_bytes"] = self.cache.nbytes
+        return stats
@@ -0,0 +1,95 @@
+"""Near-duplicate detection for saved cover letters.
+
+Letters are reduced to word-shingle MinHash signatures. Signatures are split
+into LSH bands that are stored with each row in an indexed array column, so
+similar letters can be found with one indexed overlap query instead of
+comparing against the whole history. A near-duplicate can then be stored as a
+reference to the original plus a compact line delta.
+"""
+
+import difflib
+import hashlib
+import random
+import re
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD = re.compile(r"[a-z0-9']+")
+
+# Fixed seed: signatures must be comparable across processes and backfills
+_rng = random.Random(1729)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of hashed word n-grams for `text`."""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        words = words + [""] * (size - len(words))
+    grams = (" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big") for g in grams}
+
+
+def minhash_signature(text):
+    """MinHash signature (list of 32-bit ints) for `text`."""
+    hashed = shingles(text)
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashed)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def lsh_bands(signature):
+    """Band keys for LSH lookup; two letters sharing any key are candidates."""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(repr(rows).encode("ascii"), digest_size=6).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity between two signatures (0.0 - 1.0)."""
+    if not signature_a or not signature_b:
+        return 0.0
+    matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return matches / len(signature_a)
+
+
+def make_delta(reference_text, text):
+    """Line-level delta that rebuilds `text` from `reference_text`.
+
+    Encoded as a list of ["=", start, end] (copy reference lines) and
+    ["+", lines] (insert new lines) operations.
+    """
+    ref_lines = reference_text.split("\n")
+    new_lines = text.split("\n")
+    ops = []
+    matcher = difflib.SequenceMatcher(None, ref_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i1, i2])
+        elif j2 > j1:
+            ops.append(["+", new_lines[j1:j2]])
+    return ops
+
+
+def apply_delta(reference_text, delta):
+    """Rebuild a letter from its reference text and delta."""
+    ref_lines = reference_text.split("\n")
+    lines = []
+    for op in delta:
+        if op[0] == "=":
+            lines.extend(ref_lines[op[1]:op[2]])
+        else:
+            lines.extend(op[1])
+    return "\n".join(lines)
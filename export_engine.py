@@ -0,0 +1,162 @@
+"""Template-based DOCX/PDF export with per-process cached skeletons and fonts.
+
+The DOCX skeleton (1" margins, 11pt Normal style) is built once. Its package
+parts are kept in memory, and each export only writes a new
+word/document.xml body in a single pass. The PDF skeleton has a Unicode TTF
+font loaded once and is deep-copied per export, so names and addresses
+outside Latin-1 render correctly. fpdf2 subsets the font in place when
+writing, so each export needs a font of its own to subset. When the skeleton
+is built, the font is also cut down once to the common Latin, Greek,
+Cyrillic and punctuation glyphs (glyph names kept), and exports whose
+glyphs are all in that base parse it (about a sixth of the full font) rather
+than the full font.
+
+python-docx, fpdf2 and fontTools are imported when a skeleton is first
+built rather than at import time, so loading this module doesn't slow the
+app's first render; the warm-up thread builds both skeletons in the
+background.
+"""
+
+import copy
+import io
+import os
+import re
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+
+# Searched in order when EXPORT_FONT_PATH isn't set
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+# Unicode ranges kept in the PDF base font: Basic Latin, Latin-1 and Latin Extended-A/B,
+# Greek, Cyrillic, general punctuation, currency and letterlike symbols
+BASE_FONT_RANGES = [
+    (0x20, 0x7E), (0xA0, 0x24F), (0x370, 0x4FF), (0x2000, 0x206F), (0x20A0, 0x20CF), (0x2100, 0x214F),
+]
+
+# Characters that are not allowed in XML 1.0 documents
+_XML_INVALID = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def find_font(font_path=None):
+    """Return a usable TTF path, or None to fall back to core Helvetica."""
+    for candidate in [font_path] + FONT_CANDIDATES:
+        if candidate and os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _paragraph_xml(line):
+    if not line:
+        return "<w:p/>"
+    return f'<w:p><w:r><w:t xml:space="preserve">{escape(_XML_INVALID.sub("", line))}</w:t></w:r></w:p>'
+
+
+class ExportEngine:
+    """Renders cover letters to DOCX and PDF from prebuilt skeletons."""
+
+    def __init__(self, font_path=None):
+        self._lock = threading.Lock()
+        self._docx_parts = None
+        self._docx_head = self._docx_tail = None
+        self._pdf_skeleton = None
+        self._font_data = None
+        self._base_font_data = None
+        self._base_glyphs = frozenset()
+        self.font_path = find_font(font_path)
+
+    def _docx_template(self):
+        with self._lock:
+            if self._docx_parts is None:
+                from docx import Document
+                from docx.shared import Inches, Pt
+
+                doc = Document()
+                for section in doc.sections:
+                    section.top_margin = Inches(1)
+                    section.bottom_margin = Inches(1)
+                    section.left_margin = Inches(1)
+                    section.right_margin = Inches(1)
+                # Font size lives on the style, not on every run
+                doc.styles["Normal"].font.size = Pt(11)
+                buffer = io.BytesIO()
+                doc.save(buffer)
+
+                with zipfile.ZipFile(buffer) as package:
+                    parts = [(info, package.read(info.filename)) for info in package.infolist()]
+                document_xml = dict((info.filename, data) for info, data in parts)["word/document.xml"].decode("utf-8")
+                split_at = document_xml.rindex("<w:sectPr")
+                self._docx_head, self._docx_tail = document_xml[:split_at], document_xml[split_at:]
+                self._docx_parts = parts
+        return self._docx_parts
+
+    def _pdf_template(self):
+        with self._lock:
+            if self._pdf_skeleton is None:
+                from fpdf import FPDF
+
+                pdf = FPDF()
+                if self.font_path:
+                    with open(self.font_path, "rb") as font_file:
+                        self._font_data = font_file.read()
+                    self._build_base_font()
+                    pdf.add_font("Body", "", self.font_path)
+                    pdf.set_font("Body", "", 11)
+                else:
+                    pdf.set_font("Helvetica", "", 11)
+                self._pdf_skeleton = pdf
+        return self._pdf_skeleton
+
+    def _build_base_font(self):
+        # Caller holds the lock. Same names as the full font, so fpdf2's glyph lists apply to both
+        from fontTools import subset, ttLib
+
+        font = ttLib.TTFont(io.BytesIO(self._font_data), recalcTimestamp=False)
+        options = subset.Options(glyph_names=True, notdef_outline=True, recommended_glyphs=True)
+        # Layout tables are dropped by fpdf2's own subsetting anyway
+        options.drop_tables += ["FFTM", "GDEF", "GPOS", "GSUB", "MATH", "hdmx", "meta"]
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=[code for low, high in BASE_FONT_RANGES for code in range(low, high + 1)])
+        subsetter.subset(font)
+        buffer = io.BytesIO()
+        font.save(buffer)
+        self._base_font_data = buffer.getvalue()
+        self._base_glyphs = frozenset(font.getGlyphOrder())
+
+    def to_docx(self, text):
+        """Render `text` (one paragraph per line) as .docx bytes."""
+        parts = self._docx_template()
+        body = "".join(_paragraph_xml(line) for line in text.split("\n"))
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as package:
+            for info, data in parts:
+                if info.filename == "word/document.xml":
+                    data = (self._docx_head + body + self._docx_tail).encode("utf-8")
+                package.writestr(info, data)
+        return buffer.getvalue()
+
+    def to_pdf(self, text):
+        """Render `text` as .pdf bytes."""
+        from fontTools import ttLib
+
+        pdf = copy.deepcopy(self._pdf_template())
+        if not self.font_path:
+            # Core fonts are Latin-1 only
+            text = text.encode("latin-1", "replace").decode("latin-1")
+        pdf.add_page()
+        pdf.multi_cell(0, 6, text)
+        for font in pdf.fonts.values():
+            if hasattr(font, "ttfont"):
+                # Layout uses the metrics read when the skeleton was built; the font itself is
+                # only read to subset it, which happens in place, so each export parses its own
+                covered = self._base_glyphs.issuperset(font.subset.get_all_glyph_names())
+                data = self._base_font_data if covered else self._font_data
+                font.ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, lazy=True)
+        return bytes(pdf.output())
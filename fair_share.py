@@ -0,0 +1,313 @@
+"""Per-owner quotas and fair-share scheduling for Claude calls.
+
+Every interactive generation belongs to an owner: a signed-in user, or a
+guest identified by IP. Each owner gets a sliding-window quota (a request
+that never gets a slot is refunded), and at most `max_concurrent` generations run at once.
+Requests beyond that wait in per-owner queues that are served round-robin,
+so one owner firing many requests can't push everyone else to the back of a
+single FIFO line. Waiters can poll their position to show it to the user.
+
+Quota hits are kept in memory by default. `SQLiteQuotaStore` shares them
+between processes on one host, and `KVQuotaStore` between replicas on any
+number of hosts through a Redis-protocol store.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+class QuotaExceeded(Exception):
+    """The owner used up their quota for the current window."""
+
+    def __init__(self, limit, window, retry_after):
+        self.limit = limit
+        self.window = window
+        self.retry_after = retry_after
+        minutes = max(1, round(retry_after / 60))
+        super().__init__(
+            f"You've reached the limit of {limit} generations per {window / 3600:g} hour(s). "
+            f"Please try again in about {minutes} minute(s)."
+        )
+
+
+class SchedulerBusy(Exception):
+    """A queued request waited longer than the scheduler's timeout."""
+
+
+class MemoryQuotaStore:
+    """Sliding-window hit timestamps per owner, in this process only."""
+
+    def __init__(self, max_owners=10000):
+        self._max_owners = max_owners
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, owner, limit, window, now=None):
+        """Record a hit if under `limit` in the last `window` seconds. Returns (allowed, retry_after)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            hits = self._hits.setdefault(owner, deque())
+            self._hits.move_to_end(owner)
+            while hits and now - hits[0] >= window:
+                hits.popleft()
+            if len(hits) >= limit:
+                return False, window - (now - hits[0]) if hits else window
+            hits.append(now)
+            while len(self._hits) > self._max_owners:
+                self._hits.popitem(last=False)
+            return True, 0.0
+
+    def refund(self, owner, hit_at):
+        """Take back the hit recorded at `hit_at`."""
+        with self._lock:
+            hits = self._hits.get(owner)
+            if hits and hit_at in hits:
+                hits.remove(hit_at)
+
+    def used(self, owner, window, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            return sum(1 for t in self._hits.get(owner, ()) if now - t < window)
+
+
+class SQLiteQuotaStore:
+    """Sliding-window hits in a SQLite file, shared by every process that opens it."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("create table if not exists quota_hits (owner text not null, hit_at real not null)")
+            conn.execute("create index if not exists quota_hits_owner_idx on quota_hits (owner, hit_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit, so "begin immediate" below controls the transaction
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("pragma journal_mode = wal")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, owner, limit, window, now=None):
+        now = time.time() if now is None else now
+        conn = self._conn()
+        # A write lock for the check-and-insert, so concurrent processes can't both slip under the limit
+        conn.execute("begin immediate")
+        try:
+            conn.execute("delete from quota_hits where owner = ? and hit_at <= ?", (owner, now - window))
+            count, oldest = conn.execute(
+                "select count(*), min(hit_at) from quota_hits where owner = ?", (owner,)
+            ).fetchone()
+            if count >= limit:
+                conn.execute("commit")
+                return False, window - (now - oldest) if oldest is not None else window
+            conn.execute("insert into quota_hits (owner, hit_at) values (?, ?)", (owner, now))
+            conn.execute("commit")
+            return True, 0.0
+        except Exception:
+            conn.execute("rollback")
+            raise
+
+    def refund(self, owner, hit_at):
+        self._conn().execute(
+            "delete from quota_hits where rowid = (select rowid from quota_hits where owner = ? and hit_at = ? limit 1)",
+            (owner, hit_at)
+        )
+
+    def used(self, owner, window, now=None):
+        now = time.time() if now is None else now
+        return self._conn().execute(
+            "select count(*) from quota_hits where owner = ? and hit_at > ?", (owner, now - window)
+        ).fetchone()[0]
+
+
+class KVQuotaStore:
+    """Sliding-window hits as a sorted set per owner (`quota:<owner>`) in a shared key-value store."""
+
+    def __init__(self, kv, prefix="quota"):
+        self.kv = kv
+        self.prefix = prefix
+
+    def hit(self, owner, limit, window, now=None):
+        now = time.time() if now is None else now
+        key = f"{self.prefix}:{owner}"
+        member = f"{now:.6f}:{uuid.uuid4().hex[:8]}"
+        # Add first and count in the same transaction, then take the hit back if it went over;
+        # concurrent replicas can't both slip under the limit
+        pipe = self.kv.pipeline(transaction=True)
+        pipe.zremrangebyscore(key, 0, now - window)
+        pipe.zadd(key, {member: now})
+        pipe.zcard(key)
+        pipe.zrange(key, 0, 0, withscores=True)
+        pipe.expire(key, math.ceil(window))
+        _, _, count, oldest, _ = pipe.execute()
+        if count > limit:
+            self.kv.zrem(key, member)
+            return False, window - (now - oldest[0][1]) if oldest else window
+        return True, 0.0
+
+    def refund(self, owner, hit_at):
+        self.kv.zremrangebyscore(f"{self.prefix}:{owner}", hit_at, hit_at)
+
+    def used(self, owner, window, now=None):
+        now = time.time() if now is None else now
+        return self.kv.zcount(f"{self.prefix}:{owner}", now - window, "+inf")
+
+
+class _Ticket:
+    def __init__(self, owner):
+        self.owner = owner
+        self.granted = False
+
+
+class FairScheduler:
+    """Quota check plus a concurrency limit with round-robin queues per owner."""
+
+    def __init__(self, max_concurrent=8, quota_store=None, timeout=120.0):
+        self.max_concurrent = max_concurrent
+        self.quota_store = quota_store or MemoryQuotaStore()
+        # Counts hits in this process while a shared quota store is unreachable
+        self._fallback_quota = MemoryQuotaStore()
+        self.timeout = timeout
+        self._running = 0
+        self._queues = OrderedDict()  # owner -> deque of tickets; order is the round-robin ring
+        self._cond = threading.Condition()
+        self.stats = {"granted": 0, "waited": 0, "quota_denied": 0, "timed_out": 0, "max_queue": 0,
+                      "quota_store_errors": 0, "quota_refunded": 0}
+
+    def check_quota(self, owner, limit, window):
+        """Count one request against the owner's quota, raising QuotaExceeded if it's used up.
+
+        Returns a receipt for `refund_quota`.
+        """
+        now = time.time()
+        store = self.quota_store
+        try:
+            allowed, retry_after = store.hit(owner, limit, window, now)
+        except Exception:
+            with self._cond:
+                self.stats["quota_store_errors"] += 1
+            store = self._fallback_quota
+            allowed, retry_after = store.hit(owner, limit, window, now)
+        if not allowed:
+            with self._cond:
+                self.stats["quota_denied"] += 1
+            raise QuotaExceeded(limit, window, retry_after)
+        return store, now
+
+    def refund_quota(self, owner, receipt):
+        """Give back a hit from `check_quota` for a request that never ran."""
+        store, hit_at = receipt
+        try:
+            store.refund(owner, hit_at)
+        except Exception:
+            with self._cond:
+                self.stats["quota_store_errors"] += 1
+            return
+        with self._cond:
+            self.stats["quota_refunded"] += 1
+
+    def _dispatch(self):
+        # Grant free slots one owner at a time, rotating each served owner to the end of the ring
+        while self._running < self.max_concurrent and self._queues:
+            owner, tickets = next(iter(self._queues.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                self._queues.move_to_end(owner)
+            else:
+                del self._queues[owner]
+            ticket.granted = True
+            self._running += 1
+            self.stats["granted"] += 1
+        self._cond.notify_all()
+
+    def _position(self, ticket):
+        """Requests that will be served before `ticket` if nobody else arrives (0 = next)."""
+        tickets = self._queues.get(ticket.owner)
+        if tickets is None:
+            return 0
+        index = tickets.index(ticket)
+        ahead = index
+        before_me = True
+        for owner, queue in self._queues.items():
+            if owner == ticket.owner:
+                before_me = False
+                continue
+            # Owners earlier in the ring get one more turn in my round
+            ahead += min(len(queue), index + 1 if before_me else index)
+        return ahead
+
+    def _withdraw(self, ticket):
+        # Caller holds the lock. Gives back a granted slot, or drops the ticket from its queue
+        if ticket.granted:
+            self._running -= 1
+            self._dispatch()
+            return
+        tickets = self._queues.get(ticket.owner)
+        if tickets is not None and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del self._queues[ticket.owner]
+
+    def acquire(self, owner, on_wait=None, poll=0.5):
+        """Wait for a slot. `on_wait(position, queued)` is called while queued.
+
+        If waiting ends with an exception (a timeout, or `on_wait` raising,
+        e.g. when Streamlit stops the script), the ticket is withdrawn, so no
+        slot is left granted to a caller that will never release it.
+        """
+        ticket = _Ticket(owner)
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self._queues.setdefault(owner, deque()).append(ticket)
+            self._dispatch()
+            if not ticket.granted:
+                self.stats["waited"] += 1
+            self.stats["max_queue"] = max(self.stats["max_queue"], self.queued())
+            try:
+                while not ticket.granted:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats["timed_out"] += 1
+                        raise SchedulerBusy("The service is very busy right now. Please try again in a minute.")
+                    position, queued = self._position(ticket), self.queued()
+                    if on_wait is not None:
+                        # Called without the lock so UI updates can't block other requests
+                        self._cond.release()
+                        try:
+                            on_wait(position, queued)
+                        finally:
+                            self._cond.acquire()
+                        if ticket.granted:
+                            break
+                    self._cond.wait(min(poll, remaining))
+            except BaseException:
+                self._withdraw(ticket)
+                raise
+
+    def release(self):
+        with self._cond:
+            self._running -= 1
+            self._dispatch()
+
+    def queued(self):
+        return sum(len(tickets) for tickets in self._queues.values())
+
+    @contextmanager
+    def turn(self, owner, on_wait=None):
+        """Hold one of the slots for `owner` for the duration of the block."""
+        self.acquire(owner, on_wait)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self):
+        with self._cond:
+            return {**self.stats, "running": self._running, "queued": self.queued(), "owners_waiting": len(self._queues)}
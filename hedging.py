@@ -0,0 +1,213 @@
+"""Hedged Claude requests to cut tail latency on generation calls.
+
+If the first token of a streamed response has not arrived within a
+percentile-based deadline, a duplicate request is issued. Whichever attempt
+streams first wins and the other is cancelled. A global budget caps how many
+extra requests hedging may add.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+
+class LatencyTracker:
+    """Rolling window of time-to-first-token samples (seconds)."""
+
+    def __init__(self, window=200, min_samples=20):
+        self._samples = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        """Return the pct-th percentile, or None until enough samples exist."""
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """Token bucket limiting hedges to a fraction of all requests.
+
+    Every request deposits `ratio` tokens and every hedge spends one, so over
+    time hedges never exceed `ratio` of the traffic (plus a small burst).
+    """
+
+    def __init__(self, ratio=0.05, burst=1.0):
+        self.ratio = ratio
+        self._capacity = max(1.0, burst)
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self._capacity, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class HedgeMetrics:
+    """Thread-safe counters describing how hedging behaves."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {
+            "requests": 0,
+            "hedges_fired": 0,
+            "hedges_won": 0,
+            "budget_denied": 0,
+            "errors": 0,
+        }
+
+    def incr(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        requests = counts["requests"] or 1
+        counts["hedge_rate"] = counts["hedges_fired"] / requests
+        counts["hedge_win_rate"] = counts["hedges_won"] / (counts["hedges_fired"] or 1)
+        return counts
+
+
+class _Attempt:
+    """One streamed request running on a background thread."""
+
+    def __init__(self, client, request, events, label):
+        self.label = label
+        self.message = None
+        self.error = None
+        self.first_token_latency = None
+        self._client = client
+        self._request = request
+        self._events = events
+        self._stream = None
+        self._cancelled = threading.Event()
+        self.started = time.monotonic()
+        self.done = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        try:
+            with self._client.messages.stream(**self._request) as stream:
+                self._stream = stream
+                for event in stream:
+                    if self._cancelled.is_set():
+                        return
+                    if self.first_token_latency is None and event.type == "content_block_delta":
+                        self.first_token_latency = time.monotonic() - self.started
+                        self._events.put(("first_token", self))
+                self.message = stream.get_final_message()
+        except Exception as e:
+            if not self._cancelled.is_set():
+                self.error = e
+        finally:
+            self.done.set()
+            self._events.put(("done", self))
+
+    def cancel(self):
+        """Stop reading and close the underlying HTTP response."""
+        self._cancelled.set()
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+
+
+class HedgedCaller:
+    """Drop-in replacement for `client.messages.create` with optional hedging."""
+
+    def __init__(self, enabled=False, percentile=95, budget_ratio=0.05,
+                 initial_deadline=4.0, min_deadline=0.5, max_deadline=15.0):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.initial_deadline = initial_deadline
+        self.min_deadline = min_deadline
+        self.max_deadline = max_deadline
+        self.latency = LatencyTracker()
+        self.budget = HedgeBudget(budget_ratio)
+        self.metrics = HedgeMetrics()
+
+    def deadline(self):
+        """Seconds to wait for a first token before hedging."""
+        observed = self.latency.percentile(self.percentile)
+        if observed is None:
+            return self.initial_deadline
+        return min(self.max_deadline, max(self.min_deadline, observed))
+
+    def _record_primary(self, primary, winner):
+        """Record the primary attempt's time to first token.
+
+        The deadline is a percentile of how long primaries take. When a hedge
+        wins first, the primary's latency is only known to be at least the
+        time it had run so far, and that censored value is recorded. Recording
+        the hedge's own latency instead would pull the deadline down and make
+        hedges fire more and more often.
+        """
+        if primary.first_token_latency is not None:
+            self.latency.record(primary.first_token_latency)
+        elif winner is not primary and primary.error is None:
+            self.latency.record(time.monotonic() - primary.started)
+
+    def create(self, client, **request):
+        """Return a complete Message, hedging the request if it starts slowly."""
+        if not self.enabled:
+            return client.messages.create(**request)
+
+        self.metrics.incr("requests")
+        self.budget.deposit()
+
+        events = queue.Queue()
+        attempts = [_Attempt(client, request, events, "primary")]
+        hedge_at = time.monotonic() + self.deadline()
+        hedge_considered = False
+        winner = None
+
+        while winner is None:
+            timeout = None if hedge_considered else max(0.0, hedge_at - time.monotonic())
+            try:
+                kind, attempt = events.get(timeout=timeout)
+            except queue.Empty:
+                hedge_considered = True
+                if self.budget.try_spend():
+                    self.metrics.incr("hedges_fired")
+                    attempts.append(_Attempt(client, request, events, "hedge"))
+                else:
+                    self.metrics.incr("budget_denied")
+                continue
+
+            if kind == "first_token" or attempt.error is None:
+                winner = attempt
+            elif all(a.done.is_set() for a in attempts):
+                self.metrics.incr("errors")
+                raise attempt.error
+
+        self._record_primary(attempts[0], winner)
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.cancel()
+
+        winner.done.wait()
+        if winner.error is not None:
+            self.metrics.incr("errors")
+            raise winner.error
+
+        if winner.label == "hedge":
+            self.metrics.incr("hedges_won")
+        return winner.message
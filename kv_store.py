@@ -0,0 +1,282 @@
+"""Shared key-value state, so several app replicas can serve the same users.
+
+`connect` opens a Redis-protocol store (Redis, Valkey, KeyDB, Dragonfly,
+Upstash) from a URL, or `MemoryKV` for `memory://`. MemoryKV is an
+in-process stand-in with the same command subset: strings with TTLs, sorted
+sets and pipelines. Tests and single-process deployments can use the
+shared-state code paths without a server.
+
+`DurableState` keeps one key per session field
+(`state:<owner>:<field>`), so a rerun writes only the fields that changed.
+Values are packed as compact JSON, zlib-compressed once they are large
+enough to gain from it. Every key carries a TTL, so abandoned sessions
+expire on their own.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import zlib
+
+# Values at least this large are compressed (when that makes them smaller)
+COMPRESS_MIN_BYTES = 512
+
+_JSON = b"j"
+_ZLIB = b"z"
+
+
+def pack(value):
+    """Compact bytes for a JSON-serializable value."""
+    raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(raw, 6)
+        if len(compressed) < len(raw):
+            return _ZLIB + compressed
+    return _JSON + raw
+
+
+def unpack(data):
+    """The value behind bytes from `pack` (None for a missing key)."""
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    kind, body = data[:1], data[1:]
+    if kind == _ZLIB:
+        body = zlib.decompress(body)
+    elif kind != _JSON:
+        raise ValueError(f"Unknown packed value format {kind!r}")
+    return json.loads(body.decode("utf-8"))
+
+
+class _MemoryPipeline:
+    """Queues commands and runs them together under the store's lock, like MULTI/EXEC."""
+
+    def __init__(self, kv):
+        self._kv = kv
+        self._commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._commands = []
+
+    def execute(self):
+        with self._kv._lock:
+            results = [getattr(self._kv, name)(*args, **kwargs) for name, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+
+class MemoryKV:
+    """In-process stand-in for the Redis commands the app uses.
+
+    Values are bytes and keys expire lazily when read. Sorted sets are
+    dicts of member -> score.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+
+    def _live(self, name):
+        expires = self._expires.get(name)
+        if expires is not None and expires <= time.time():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return self._data.get(name)
+
+    @staticmethod
+    def _bytes(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode("utf-8")
+
+    def ping(self):
+        return True
+
+    def get(self, name):
+        with self._lock:
+            value = self._live(name)
+            return value if isinstance(value, bytes) else None
+
+    def mget(self, keys):
+        with self._lock:
+            return [self.get(name) for name in keys]
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return None
+            self._data[name] = self._bytes(value)
+            if ex:
+                self._expires[name] = time.time() + ex
+            else:
+                self._expires.pop(name, None)
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            deleted = 0
+            for name in names:
+                if self._live(name) is not None:
+                    deleted += 1
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+            return deleted
+
+    def expire(self, name, time_seconds):
+        with self._lock:
+            if self._live(name) is None:
+                return False
+            self._expires[name] = time.time() + time_seconds
+            return True
+
+    def ttl(self, name):
+        with self._lock:
+            if self._live(name) is None:
+                return -2
+            expires = self._expires.get(name)
+            return -1 if expires is None else max(0, round(expires - time.time()))
+
+    def _zset(self, name, create=False):
+        zset = self._live(name)
+        if zset is None and create:
+            zset = self._data[name] = {}
+        return zset if isinstance(zset, dict) else None
+
+    def zadd(self, name, mapping):
+        with self._lock:
+            zset = self._zset(name, create=True)
+            added = sum(1 for member in mapping if member not in zset)
+            zset.update({member: float(score) for member, score in mapping.items()})
+            return added
+
+    def zrem(self, name, *members):
+        with self._lock:
+            zset = self._zset(name) or {}
+            return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def zremrangebyscore(self, name, min_score, max_score):
+        with self._lock:
+            zset = self._zset(name) or {}
+            doomed = [member for member, score in zset.items() if float(min_score) <= score <= float(max_score)]
+            for member in doomed:
+                del zset[member]
+            return len(doomed)
+
+    def zcard(self, name):
+        with self._lock:
+            return len(self._zset(name) or {})
+
+    def zcount(self, name, min_score, max_score):
+        low = float("-inf") if min_score == "-inf" else float(min_score)
+        high = float("inf") if max_score == "+inf" else float(max_score)
+        with self._lock:
+            return sum(1 for score in (self._zset(name) or {}).values() if low <= score <= high)
+
+    def zrange(self, name, start, end, withscores=False):
+        with self._lock:
+            items = sorted((self._zset(name) or {}).items(), key=lambda item: (item[1], item[0]))
+        items = items[start:] if end == -1 else items[start:end + 1]
+        return [(member.encode("utf-8"), score) if withscores else member.encode("utf-8") for member, score in items]
+
+    def pipeline(self, transaction=True):
+        return _MemoryPipeline(self)
+
+
+_memory_stores = {}
+_memory_lock = threading.Lock()
+
+
+def connect(url, timeout=2.0):
+    """Open the store at `url`: memory://[name] (one per name per process) or redis://, rediss://, unix://."""
+    if url.startswith("memory://"):
+        with _memory_lock:
+            return _memory_stores.setdefault(url, MemoryKV())
+    try:
+        import redis
+    except ImportError as e:
+        raise RuntimeError("STATE_STORE_URL needs the redis package: pip install redis") from e
+    return redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout, health_check_interval=30)
+
+
+class DurableState:
+    """Session fields kept in the shared store, one key per field, written only when changed."""
+
+    def __init__(self, kv, ttl=86400, prefix="state"):
+        self.kv = kv
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "restored_fields": 0, "writes": 0, "deletes": 0, "unchanged": 0, "bytes_written": 0}
+
+    def _key(self, owner, field):
+        return f"{self.prefix}:{owner}:{field}"
+
+    def _count(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self.stats[name] += value
+
+    def load(self, owner, fields):
+        """Return ({field: value} for the fields stored for `owner`, {field: digest})."""
+        raw = self.kv.mget([self._key(owner, field) for field in fields])
+        values, digests = {}, {}
+        for field, data in zip(fields, raw):
+            if data is not None:
+                values[field] = unpack(data)
+                digests[field] = hashlib.blake2b(bytes(data), digest_size=8).hexdigest()
+        self._count(loads=1, restored_fields=len(values))
+        return values, digests
+
+    def save(self, owner, values, digests):
+        """Write the fields whose packed value changed; delete fields that are gone.
+
+        `values` maps field -> value (None removes the field) and `digests`
+        holds what was last written for `owner`. Returns the new digests.
+        """
+        digests = dict(digests)
+        pipe = self.kv.pipeline(transaction=False)
+        writes = deletes = unchanged = written = 0
+        for field, value in values.items():
+            key = self._key(owner, field)
+            if value is None:
+                if field in digests:
+                    pipe.delete(key)
+                    del digests[field]
+                    deletes += 1
+                continue
+            data = pack(value)
+            digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+            if digests.get(field) == digest:
+                unchanged += 1
+                continue
+            pipe.set(key, data, ex=self.ttl)
+            digests[field] = digest
+            writes += 1
+            written += len(data)
+        if writes or deletes:
+            pipe.execute()
+        self._count(writes=writes, deletes=deletes, unchanged=unchanged, bytes_written=written)
+        return digests
+
+    def touch(self, owner, fields):
+        """Restart the TTL of `owner`'s stored fields (unchanged fields aren't rewritten)."""
+        pipe = self.kv.pipeline(transaction=False)
+        for field in fields:
+            pipe.expire(self._key(owner, field), self.ttl)
+        pipe.execute()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,223 @@
+"""Local checks for generated cover letters, and the fixes that need no model.
+
+`check_letter` compares a letter with what `cover_letter_request` asked for:
+a letter within the word range for the chosen length (counted over the whole
+letter, as the prompt states it), the header /
+salutation / paragraphs / sign-off layout, and no leftover bracketed
+placeholders, XML tags or emoji. Each issue names the section it is in, so
+the app can repair just that paragraph (or trim the body) with a small model
+call instead of regenerating the whole letter. `local_fixes` handles what
+can be fixed deterministically first.
+"""
+
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+
+from letter_parts import join_letter, parse_letter
+from prompts import LETTER_WORDS
+
+# Fraction outside the requested word range that is still accepted
+LENGTH_SLACK = 0.1
+
+# Replaces a salutation whose recipient is still a placeholder
+GENERIC_SALUTATION = "Dear Hiring Manager,"
+
+_WORD = re.compile(r"[\w'’-]+")
+_NAME_TOKEN = re.compile(r"[^\W\d_]+")
+_PLACEHOLDER = re.compile(r"\[[^\[\]\n]{1,120}\]")
+_XML_TAG = re.compile(r"</?[A-Za-z_][\w.-]*(\s[^<>\n]*)?/?>")
+_EMOJI = re.compile(
+    "[\U0001F000-\U0001FAFF\U0001FC00-\U0001FFFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D]"
+)
+_SPACE_BEFORE_PUNCT = re.compile(r"[ \t]+([,.;:!?])")
+_EXTRA_SPACES = re.compile(r"[ \t]{2,}")
+_BLANK_LINES = re.compile(r"\n{4,}")
+
+# Placeholder text the app can fill from the inputs, lowercased without punctuation
+_PLACEHOLDER_FIELDS = {
+    "company": "company", "company name": "company", "name of company": "company",
+    "employer": "company", "organization": "company", "organization name": "company",
+    "position": "role", "role": "role", "job title": "role", "position title": "role",
+    "role title": "role", "title": "role", "position name": "role",
+    "your name": "name", "candidate name": "name", "name": "name", "full name": "name",
+    "date": "date", "todays date": "date", "current date": "date",
+}
+
+
+def word_count(text):
+    return len(_WORD.findall(text or ""))
+
+
+def body_word_range(parts, length="concise"):
+    """The (low, high) word range for the body paragraphs, given the letter's other parts.
+
+    The requested range is for the whole letter, so the words of the
+    header, salutation and sign-off are taken off it.
+    """
+    low, high = LETTER_WORDS.get(length, LETTER_WORDS["concise"])
+    fixed = sum(word_count(parts[section]) for section in ("header", "salutation", "signoff"))
+    return max(low - fixed, 0), max(high - fixed, 1)
+
+
+def has_name(text, name):
+    """Whether `text` contains `name`, matched on name tokens rather than the exact string.
+
+    Initials and hyphenation may differ ("Jane Doe" matches "Jane Q. Doe"
+    and "Jane Doe-Smith"); at least two of the name's words (or its only
+    word) must appear.
+    """
+    tokens = [token for token in _NAME_TOKEN.findall(name.casefold()) if len(token) > 1]
+    if not tokens:
+        return True
+    present = set(_NAME_TOKEN.findall((text or "").casefold()))
+    return sum(token in present for token in tokens) >= min(2, len(tokens))
+
+
+def _issue(kind, detail, section=None):
+    return {"kind": kind, "detail": detail, "section": section}
+
+
+def _content_issues(text, section):
+    issues = []
+    placeholders = _PLACEHOLDER.findall(text)
+    if placeholders:
+        issues.append(_issue("placeholder", ", ".join(placeholders[:3]), section))
+    tags = [match.group(0) for match in _XML_TAG.finditer(text)]
+    if tags:
+        issues.append(_issue("xml", ", ".join(tags[:3]), section))
+    if _EMOJI.search(text):
+        issues.append(_issue("emoji", "emoji in the text", section))
+    return issues
+
+
+def check_letter(text, length="concise", candidate_name=""):
+    """Return a list of issues ({"kind", "detail", "section"}); empty if the letter is fine.
+
+    `section` is "header", "salutation", "signoff", a body paragraph index, or None when
+    the issue isn't tied to one part (or the layout wasn't recognized).
+    """
+    low, high = LETTER_WORDS.get(length, LETTER_WORDS["concise"])
+    parts = parse_letter(text or "")
+    if parts is None:
+        issues = [_issue("structure", "salutation or sign-off not found")]
+        issues += _content_issues(text or "", None)
+    else:
+        issues = []
+        if candidate_name and not has_name(parts["signoff"], candidate_name):
+            issues.append(_issue("structure", "sign-off doesn't include the candidate's name", "signoff"))
+        issues += _content_issues(parts["header"], "header")
+        issues += _content_issues(parts["salutation"], "salutation")
+        for index, paragraph in enumerate(parts["body"]):
+            issues += _content_issues(paragraph, index)
+        issues += _content_issues(parts["signoff"], "signoff")
+    words = word_count(text)
+
+    if words > high * (1 + LENGTH_SLACK):
+        issues.append(_issue("too_long", f"{words} words (asked for {low}-{high})"))
+    elif words < low * (1 - LENGTH_SLACK):
+        issues.append(_issue("too_short", f"{words} words (asked for {low}-{high})"))
+    return issues
+
+
+def _fill_placeholders(text, fields):
+    def replace(match):
+        key = re.sub(r"[^a-z ]", "", match.group(0)[1:-1].lower()).strip()
+        value = fields.get(_PLACEHOLDER_FIELDS.get(key, ""), "")
+        return value or match.group(0)
+    return _PLACEHOLDER.sub(replace, text)
+
+
+def _tidy(text):
+    text = _SPACE_BEFORE_PUNCT.sub(r"\1", text)
+    text = _EXTRA_SPACES.sub(" ", text)
+    return _BLANK_LINES.sub("\n\n\n", text).strip("\n")
+
+
+def local_fixes(text, company_name="", role_title="", candidate_name=""):
+    """Apply the fixes that need no model call. Returns (text, names of the fixes applied).
+
+    Strips emoji and XML tags, fills placeholders the inputs can answer
+    ([Company Name], [Position], [Your Name], [Date]), drops header and
+    sign-off lines that are only a placeholder, replaces a salutation with a
+    placeholder name ("Dear [Hiring Manager Name],") by "Dear Hiring
+    Manager,", and adds a missing name to the sign-off.
+    """
+    fixes = []
+    fields = {
+        "company": company_name,
+        "role": role_title,
+        "name": candidate_name,
+        "date": datetime.now().strftime("%B %d, %Y"),
+    }
+
+    if _EMOJI.search(text):
+        text = _EMOJI.sub("", text)
+        fixes.append("emoji")
+    if _XML_TAG.search(text):
+        text = _XML_TAG.sub("", text)
+        fixes.append("xml")
+    filled = _fill_placeholders(text, fields)
+    if filled != text:
+        text = filled
+        fixes.append("placeholder")
+    text = _tidy(text)
+
+    parts = parse_letter(text)
+    if parts is not None:
+        changed = False
+        for section in ("header", "signoff"):
+            lines = parts[section].split("\n")
+            kept = [line for line in lines if not _PLACEHOLDER.fullmatch(line.strip())]
+            if len(kept) != len(lines):
+                parts[section] = "\n".join(kept).strip("\n")
+                changed = True
+                fixes.append(f"{section}_placeholder")
+        if _PLACEHOLDER.search(parts["salutation"]):
+            parts["salutation"] = GENERIC_SALUTATION
+            changed = True
+            fixes.append("salutation_placeholder")
+        if candidate_name and not has_name(parts["signoff"], candidate_name):
+            parts["signoff"] = f"{parts['signoff']}\n\n\n{candidate_name.strip()}"
+            changed = True
+            fixes.append("signoff_name")
+        if changed:
+            text = join_letter(parts)
+    return text, fixes
+
+
+class ValidationStats:
+    """Counts of validation outcomes, issue kinds and repair calls for the Diagnostics panel.
+
+    Outcomes: "passed" (no issues), "fixed_locally", "repaired" (after one or
+    more repair calls) and "unresolved" (issues left after repairs).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._outcomes = Counter()
+        self._issues = Counter()
+        self._repair_calls = 0
+        self._repair_failures = 0
+
+    def record(self, issues, outcome, repair_calls=0, repair_failures=0):
+        with self._lock:
+            self._outcomes[outcome] += 1
+            self._issues.update(issue["kind"] for issue in issues)
+            self._repair_calls += repair_calls
+            self._repair_failures += repair_failures
+
+    def snapshot(self):
+        with self._lock:
+            checked = sum(self._outcomes.values())
+            needed_repair = checked - self._outcomes["passed"]
+            return {
+                "checked": checked,
+                "outcomes": dict(self._outcomes),
+                "issues": dict(self._issues),
+                "repair_calls": self._repair_calls,
+                "repair_failures": self._repair_failures,
+                "issue_rate": round(needed_repair / checked, 3) if checked else 0.0,
+                "repair_call_rate": round(self._repair_calls / checked, 3) if checked else 0.0,
+            }
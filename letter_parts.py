@@ -0,0 +1,63 @@
+"""Split a generated cover letter into its structural parts and join it back.
+
+Matches the layout requested by `generate_cover_letter`'s output format:
+header (date, address, recipient), salutation, body paragraphs, sign-off.
+"""
+
+import re
+
+_SALUTATION = re.compile(r"^dear\b", re.IGNORECASE)
+_SIGN_OFF = re.compile(
+    r"^(sincerely|best regards|kind regards|warm regards|regards|respectfully|best|thank you)[,.]?$",
+    re.IGNORECASE
+)
+
+# What each body paragraph is for, in the order the prompt asks for them
+PARAGRAPH_ROLES = [
+    "State why the candidate is writing and include the exact title of the position. Mention any company connections if applicable.",
+    "Describe what the candidate offers based on their resume, with specific examples of how their qualifications match the job requirements.",
+    "Establish synergy between the candidate and the company: values, traits, corporate culture or commitment to diversity that align with the candidate's profile.",
+    "Reiterate interest in the position and express interest in an interview. Thank the employer for their time and consideration.",
+]
+
+
+def parse_letter(text):
+    """Return {"header", "salutation", "body", "signoff"} or None if the layout isn't recognized."""
+    lines = text.strip("\n").split("\n")
+    salutation_index = next((i for i, line in enumerate(lines) if _SALUTATION.match(line.strip())), None)
+    if salutation_index is None:
+        return None
+    signoff_index = next(
+        (i for i in range(len(lines) - 1, salutation_index, -1) if _SIGN_OFF.match(lines[i].strip())),
+        None
+    )
+    if signoff_index is None:
+        return None
+
+    body_text = "\n".join(lines[salutation_index + 1:signoff_index]).strip()
+    body = [p.strip() for p in re.split(r"\n\s*\n", body_text) if p.strip()]
+    if not body:
+        return None
+    return {
+        "header": "\n".join(lines[:salutation_index]).rstrip(),
+        "salutation": lines[salutation_index].strip(),
+        "body": body,
+        "signoff": "\n".join(lines[signoff_index:]).strip(),
+    }
+
+
+def join_letter(parts):
+    """Reassemble a letter from parts produced by parse_letter."""
+    sections = [parts["header"], parts["salutation"]] + parts["body"] + [parts["signoff"]]
+    return "\n\n".join(section for section in sections if section)
+
+
+def paragraph_role(index, count):
+    """Purpose of body paragraph `index` in a letter with `count` body paragraphs."""
+    if index == 0:
+        return PARAGRAPH_ROLES[0]
+    if index == count - 1:
+        return PARAGRAPH_ROLES[-1]
+    if count == len(PARAGRAPH_ROLES):
+        return PARAGRAPH_ROLES[index]
+    return "Support the candidate's fit for the role with specific, concrete evidence."
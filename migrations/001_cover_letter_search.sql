@@ -0,0 +1,54 @@
+-- Full-text search over cover letter history.
+-- Run in the Supabase SQL editor (Database -> SQL Editor).
+
+-- Weighted search document: company and role rank above the letter body
+alter table cover_letters
+  add column if not exists search_vector tsvector
+  generated always as (
+    setweight(to_tsvector('english', coalesce(company, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(role, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(cover_letter, '')), 'B')
+  ) stored;
+
+create index if not exists cover_letters_search_idx
+  on cover_letters using gin (search_vector);
+
+create index if not exists cover_letters_user_date_idx
+  on cover_letters (user_id, date_created desc);
+
+-- Ranked, paginated hits for one user. Returns a snippet instead of the full
+-- letter so the sidebar never downloads the whole history.
+create or replace function search_cover_letters(
+  p_user_id uuid,
+  p_query text,
+  p_limit int default 10,
+  p_offset int default 0
+)
+returns table (
+  id cover_letters.id%type,
+  company text,
+  role text,
+  date_created text,
+  snippet text,
+  rank real,
+  total_count bigint
+)
+language sql
+stable
+security invoker
+as $$
+  select
+    c.id,
+    c.company,
+    c.role,
+    c.date_created::text,
+    ts_headline('english', c.cover_letter, q, 'MaxWords=35, MinWords=15, StartSel=**, StopSel=**'),
+    ts_rank(c.search_vector, q),
+    count(*) over ()
+  from cover_letters c, websearch_to_tsquery('english', p_query) q
+  where c.user_id = p_user_id
+    and c.search_vector @@ q
+  order by ts_rank(c.search_vector, q) desc, c.date_created desc
+  limit p_limit
+  offset p_offset;
+$$;
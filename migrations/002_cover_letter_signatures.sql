@@ -0,0 +1,20 @@
+-- Near-duplicate detection for cover letters.
+-- Run in the Supabase SQL editor after 001, then backfill existing rows with:
+--   python -m scripts.backfill_signatures
+
+alter table cover_letters
+  add column if not exists minhash bigint[],
+  add column if not exists lsh_bands text[],
+  -- Near-duplicates may be stored as a reference to another letter plus a delta.
+  -- reference_id must match the type of cover_letters.id (bigint identity by
+  -- default; change to uuid if the table uses uuid keys).
+  add column if not exists reference_id bigint references cover_letters (id),
+  add column if not exists delta jsonb;
+
+-- Band lookup: candidates are rows sharing any band key (&& overlap)
+create index if not exists cover_letters_lsh_bands_idx
+  on cover_letters using gin (lsh_bands);
+
+create index if not exists cover_letters_reference_idx
+  on cover_letters (reference_id)
+  where reference_id is not null;
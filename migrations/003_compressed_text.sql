@@ -0,0 +1,85 @@
+-- Support client-side compressed text (STORAGE_COMPRESSION).
+-- Run in the Supabase SQL editor after 002, before enabling compression.
+--
+-- Compressed bodies ("~cz~..." values) can't be indexed by Postgres, so the
+-- search vector becomes a trigger-maintained column. When the app writes a
+-- compressed letter it also sends the plain text once in search_text; the
+-- trigger indexes it and clears it so it is never stored or read back.
+
+alter table cover_letters add column if not exists search_text text;
+
+drop index if exists cover_letters_search_idx;
+alter table cover_letters drop column if exists search_vector;
+alter table cover_letters add column search_vector tsvector;
+
+create or replace function cover_letters_search_vector()
+returns trigger
+language plpgsql
+as $$
+begin
+  -- Updates keep the existing vector unless new plain text is supplied
+  if tg_op = 'INSERT' or new.search_text is not null then
+    new.search_vector :=
+      setweight(to_tsvector('english', coalesce(new.company, '')), 'A') ||
+      setweight(to_tsvector('english', coalesce(new.role, '')), 'A') ||
+      setweight(to_tsvector('english', coalesce(
+        new.search_text,
+        case when new.cover_letter like '~cz~%' then null else new.cover_letter end,
+        ''
+      )), 'B');
+  end if;
+  new.search_text := null;
+  return new;
+end;
+$$;
+
+drop trigger if exists cover_letters_search_vector_trigger on cover_letters;
+create trigger cover_letters_search_vector_trigger
+  before insert or update on cover_letters
+  for each row execute function cover_letters_search_vector();
+
+-- Rebuild vectors for existing (still uncompressed) rows
+update cover_letters set search_text = cover_letter
+  where cover_letter is not null and cover_letter not like '~cz~%';
+
+create index if not exists cover_letters_search_idx
+  on cover_letters using gin (search_vector);
+
+-- Snippets can only be built from uncompressed bodies
+create or replace function search_cover_letters(
+  p_user_id uuid,
+  p_query text,
+  p_limit int default 10,
+  p_offset int default 0
+)
+returns table (
+  id cover_letters.id%type,
+  company text,
+  role text,
+  date_created text,
+  snippet text,
+  rank real,
+  total_count bigint
+)
+language sql
+stable
+security invoker
+as $$
+  select
+    c.id,
+    c.company,
+    c.role,
+    c.date_created::text,
+    case
+      when c.cover_letter like '~cz~%' or coalesce(c.cover_letter, '') = '' then ''
+      else ts_headline('english', c.cover_letter, q, 'MaxWords=35, MinWords=15, StartSel=**, StopSel=**')
+    end,
+    ts_rank(c.search_vector, q),
+    count(*) over ()
+  from cover_letters c, websearch_to_tsquery('english', p_query) q
+  where c.user_id = p_user_id
+    and c.search_vector @@ q
+  order by ts_rank(c.search_vector, q) desc, c.date_created desc
+  limit p_limit
+  offset p_offset;
+$$;
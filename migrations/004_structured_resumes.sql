@@ -0,0 +1,13 @@
+-- Structured resume model stored next to the raw text.
+-- Run in the Supabase SQL editor after 003.
+--
+-- The app parses a resume once when it is saved and stores the result in
+-- `structured` together with a hash of the text it was parsed from. The
+-- sidebar lists resumes by reading only these columns; the raw text is
+-- fetched when a resume is actually selected.
+
+alter table resumes add column if not exists structured jsonb;
+alter table resumes add column if not exists text_hash text;
+
+create index if not exists resumes_user_date_idx on resumes (user_id, date_saved desc);
+create index if not exists resumes_text_hash_idx on resumes (user_id, text_hash);
@@ -0,0 +1,24 @@
+-- Message Batches jobs for bulk cover letter generation.
+-- Run in the Supabase SQL editor after 004.
+--
+-- `python -m scripts.batch_generate submit` records each submitted batch
+-- here, with the write-back target of every request in `jobs`, so a later
+-- `collect` run (from any machine) can fetch the results and store them in
+-- cover_letters. `summary` holds the token counts and cost once written.
+
+create table if not exists generation_batches (
+  id text primary key,
+  status text not null default 'in_progress',
+  created_at timestamptz not null default now(),
+  ended_at timestamptz,
+  request_count int not null default 0,
+  jobs jsonb not null default '{}'::jsonb,
+  summary jsonb
+);
+
+create index if not exists generation_batches_open_idx
+  on generation_batches (created_at)
+  where status <> 'written';
+
+-- Only the service key (batch jobs) reads or writes this table
+alter table generation_batches enable row level security;
@@ -0,0 +1,211 @@
+"""Deterministic normalization of resume and job-description text.
+
+PDF-extracted resumes and pasted job descriptions carry duplicated whitespace,
+broken hyphenation, repeated page headers/footers and long boilerplate (EEO
+statements, benefits lists, "about us" copy). Normalizing before prompt
+assembly keeps every prompt smaller without changing what the model needs.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+NormalizedText = namedtuple("NormalizedText", ["text", "chars_saved", "tokens_saved"])
+
+# Rough Claude tokenizer ratio for English prose
+CHARS_PER_TOKEN = 4
+
+_SPACES = re.compile(r"[ \t\f\v\u00a0\u2000-\u200b\u3000]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_HYPHEN_BREAK = re.compile(r"([a-z])-\n\s*([a-z])")
+# "Page 3", "3 of 5", "3/5" or a bare page number (up to 3 digits, so a bare year is never one)
+_PAGE_MARKER = re.compile(r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+|\d{1,3})$", re.IGNORECASE)
+_YEAR = re.compile(r"^(19|20)\d\d$")
+_DIGITS = re.compile(r"\d+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Section headings that start a boilerplate block in a job description
+_BOILERPLATE_HEADINGS = {
+    "eeo": re.compile(r"^(equal (employment )?opportunity|eeo( statement)?|diversity,? equity,? (and|&) inclusion|our commitment to diversity)\b", re.IGNORECASE),
+    "benefits": re.compile(r"^(benefits|perks|what we offer|(our )?benefits (and|&) perks|compensation (and|&) benefits|why you'?ll love working here)\b", re.IGNORECASE),
+    # "About <Company>", but not "About This Role", "About the Team", "About You", ...
+    "about": re.compile(
+        r"^(about us|about (the|our) company|who we are|"
+        r"about (?!(the|this|our|your)\b)(?!.*\b(role|team|position|opportunity|job|you)\b)[\w&.,'\- ]{1,40})$",
+        re.IGNORECASE
+    ),
+}
+# Headings that end a boilerplate block because real job content resumes
+_CONTENT_HEADING = re.compile(
+    r"^(about ((the|this) (role|position|job|team|opportunity)|you)|the (role|team|opportunity)|"
+    r"((key|core|main|primary) )?responsibilities|job (description|summary|overview)|"
+    r"(role|position) (summary|overview|description)|what you('| wi)ll do|requirements|"
+    r"qualifications|(minimum|basic|preferred) qualifications|what you('| wi)ll bring|who you are|skills|"
+    r"nice to have|bonus points|your impact|the opportunity)\b",
+    re.IGNORECASE
+)
+# Paragraphs containing any of these are EEO statements even without a heading
+_EEO_PHRASES = re.compile(
+    r"(equal opportunity employer|without regard to (race|age|sex|gender)|reasonable accommodation|"
+    r"protected veteran status|e-verify|affirmative action)",
+    re.IGNORECASE
+)
+
+
+def collapse_whitespace(text):
+    """Normalize line endings, collapse runs of spaces and blank lines."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [_SPACES.sub(" ", line).strip() for line in text.split("\n")]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def dehyphenate(text):
+    """Join words broken across lines by a hyphen ("manage-\\nment")."""
+    return _HYPHEN_BREAK.sub(r"\1\2", text)
+
+
+def _page_periodic(positions, min_gap=8, tolerance=0.25):
+    """Whether line positions are spaced like a page header: far apart, at near-equal intervals."""
+    gaps = [b - a for a, b in zip(positions, positions[1:])]
+    median = sorted(gaps)[len(gaps) // 2]
+    return median >= min_gap and all(abs(gap - median) <= max(2, median * tolerance) for gap in gaps)
+
+
+def remove_repeated_headers(text, min_repeats=3, max_length=80):
+    """Drop page numbers, and short lines repeated once per page after their first use.
+
+    A line only counts as a header or footer when its repeats are spaced
+    like pages (far apart, at near-equal intervals), so a job title or
+    employer listed several times stays. Bare years are never removed.
+    """
+    lines = text.split("\n")
+    positions = {}
+    for index, line in enumerate(lines):
+        if line and len(line) <= max_length and not _YEAR.match(line):
+            positions.setdefault(_DIGITS.sub("#", line.lower()), []).append(index)
+    headers = {
+        shape for shape, found in positions.items()
+        if len(found) >= min_repeats and _page_periodic(found)
+    }
+
+    kept = []
+    seen = set()
+    for line in lines:
+        if line and _PAGE_MARKER.match(line):
+            continue
+        shape = _DIGITS.sub("#", line.lower())
+        if line and shape in headers:
+            if shape in seen:
+                continue
+            seen.add(shape)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def _heading_text(line):
+    return line.strip().strip("#*:").strip()
+
+
+def _boilerplate_heading(line, patterns):
+    """Whether `line` is shaped like a heading (bare, or ending in a colon) that starts boilerplate."""
+    heading = _heading_text(line)
+    if not heading or len(heading) > 60:
+        return False
+    if line.strip().strip("#*").rstrip().endswith(":"):
+        return any(p.match(heading) for p in patterns)
+    return any(p.fullmatch(heading) for p in patterns)
+
+
+def _strip_trailing_eeo(lines):
+    """Drop EEO sentences from the end of the text, a sentence at a time, stopping at the first other content."""
+    lines = list(lines)
+    while lines:
+        if not lines[-1].strip():
+            lines.pop()
+            continue
+        sentences = _SENTENCE_END.split(lines[-1])
+        kept = list(sentences)
+        while kept and _EEO_PHRASES.search(kept[-1]):
+            kept.pop()
+        if len(kept) == len(sentences):
+            break
+        if kept:
+            # The line ends with the statement after job content: keep the content and stop
+            lines[-1] = " ".join(kept)
+            break
+        lines.pop()
+    return lines
+
+
+def strip_boilerplate(text, kinds=("eeo", "benefits", "about")):
+    """Remove known job-description boilerplate blocks.
+
+    A block starts at a heading-shaped line ("Benefits", "About Us:", ...)
+    and runs until the next content heading ("Requirements", ...). EEO
+    sentences are also dropped from the end of the text. If nothing would be
+    left, the text is returned unchanged.
+    """
+    patterns = [_BOILERPLATE_HEADINGS[kind] for kind in kinds]
+    kept = []
+    skipping = False
+    for line in text.split("\n"):
+        heading = _heading_text(line)
+        if heading and len(heading) <= 60 and _CONTENT_HEADING.match(heading):
+            skipping = False
+        elif _boilerplate_heading(line, patterns):
+            skipping = True
+            continue
+        if not skipping:
+            kept.append(line)
+
+    if "eeo" in kinds:
+        kept = _strip_trailing_eeo(kept)
+    stripped = "\n".join(kept)
+    return stripped if stripped.strip() else text
+
+
+def normalize_resume(text):
+    """Normalization steps for resume text (typically PDF-extracted)."""
+    return collapse_whitespace(remove_repeated_headers(dehyphenate(collapse_whitespace(text))))
+
+
+def normalize_job_description(text):
+    """Normalization steps for a pasted job description."""
+    return collapse_whitespace(strip_boilerplate(dehyphenate(collapse_whitespace(text))))
+
+
+class TextNormalizer:
+    """Normalizes text with an LRU cache keyed by input hash and tracks savings."""
+
+    _PIPELINES = {"resume": normalize_resume, "job_description": normalize_job_description}
+
+    def __init__(self, max_entries=512):
+        self._cache = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "cache_hits": 0, "chars_saved": 0, "tokens_saved": 0}
+
+    def normalize(self, text, kind):
+        """Return a NormalizedText for `text` using the `kind` pipeline."""
+        if not text:
+            return NormalizedText(text or "", 0, 0)
+        key = hashlib.sha256(f"{kind}\x00{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            self.stats["calls"] += 1
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+        if result is None:
+            cleaned = self._PIPELINES[kind](text)
+            chars_saved = len(text) - len(cleaned)
+            result = NormalizedText(cleaned, chars_saved, chars_saved // CHARS_PER_TOKEN)
+            with self._lock:
+                self._cache[key] = result
+                if len(self._cache) > self._max_entries:
+                    self._cache.popitem(last=False)
+        with self._lock:
+            self.stats["chars_saved"] += result.chars_saved
+            self.stats["tokens_saved"] += result.tokens_saved
+        return result
@@ -0,0 +1,104 @@
+"""Speculative background prefetch with a short-lived result cache.
+
+Used to start generating the statement of interest as soon as its inputs are
+known, so the "Generate Statement" click (or an empty motivation field) is
+served instantly. Results are keyed by owner (user or guest session) and a
+hash of the inputs, so owners with identical inputs never share a result or
+a budget. They expire after a TTL, and each owner has a capped speculative
+spend.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+def input_key(*parts):
+    """Stable hash of the inputs a speculative result depends on."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SpeculativePrefetcher:
+    """Runs `fn` in the background and holds results for a short time."""
+
+    def __init__(self, fn, ttl=300, max_per_owner=10, window=3600, max_workers=2, max_owners=10000):
+        self._fn = fn
+        self._ttl = ttl
+        self._max_per_owner = max_per_owner
+        self._window = window
+        self._max_owners = max_owners
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._entries = {}  # (owner, key) -> (future, created_at)
+        self._spend = OrderedDict()  # owner -> deque of start timestamps, least recently active first
+        self.stats = {"started": 0, "hits": 0, "discarded": 0, "capped": 0}
+
+    def _purge(self, now):
+        expired = [k for k, (_, created) in self._entries.items() if now - created > self._ttl]
+        for key in expired:
+            self._entries.pop(key)[0].cancel()
+
+    def _within_budget(self, owner, now):
+        starts = self._spend.setdefault(owner, deque())
+        self._spend.move_to_end(owner)
+        while starts and now - starts[0] > self._window:
+            starts.popleft()
+        # Owners idle the longest are forgotten first; an owner with no recent starts loses nothing
+        while len(self._spend) > self._max_owners:
+            self._spend.popitem(last=False)
+        return len(starts) < self._max_per_owner
+
+    def start(self, owner, key, *args):
+        """Start computing `key` for `owner` unless cached, in flight or over budget.
+
+        Any other entry belonging to the same owner is discarded, since it was
+        computed for inputs that have since been edited.
+        """
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            for other_owner, other_key in list(self._entries):
+                if other_owner == owner and other_key != key:
+                    self._entries.pop((other_owner, other_key))[0].cancel()
+                    self.stats["discarded"] += 1
+            if (owner, key) in self._entries:
+                return False
+            if not self._within_budget(owner, now):
+                self.stats["capped"] += 1
+                return False
+            self._spend[owner].append(now)
+            self._entries[(owner, key)] = (self._executor.submit(self._fn, *args), now)
+            self.stats["started"] += 1
+            return True
+
+    def take(self, owner, key, timeout=None):
+        """Return `owner`'s result for `key` (waiting up to `timeout` if in flight), or None."""
+        with self._lock:
+            self._purge(time.time())
+            entry = self._entries.get((owner, key))
+        if entry is None:
+            return None
+        future = entry[0]
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeout:
+            return None
+        except Exception:
+            result = None
+        with self._lock:
+            self._entries.pop((owner, key), None)
+            if result is not None:
+                self.stats["hits"] += 1
+        return result
+
+    def ready(self, owner, key):
+        """True if a finished result for `owner` and `key` is cached."""
+        with self._lock:
+            entry = self._entries.get((owner, key))
+        return entry is not None and entry[0].done() and not entry[0].cancelled()
@@ -0,0 +1,129 @@
+"""Prompt builders shared by the app and the batch generation script.
+
+Each builder returns the keyword arguments for `messages.create`, so the
+same request can be sent interactively or packaged into a Message Batches
+job. Inputs are expected to be normalized already.
+"""
+
+from datetime import datetime
+
+COVER_LETTER_MODEL = "claude-3-haiku-20240307"
+
+# Word range asked for at each letter length (letter_check validates against it)
+LETTER_WORDS = {"concise": (200, 325), "standard": (325, 450)}
+
+
+def cover_letter_request(resume_text, candidate_name, candidate_address, company_name, role_title, why_want_job, job_description="", additional_context="", resume_highlight="", length="concise", tone="conversational", date=None):
+    """Request parameters for a cover letter. `date` (default today) is the letter's date line."""
+    # Length instructions
+    length_instructions = {
+        "concise": "Keep the cover letter concise and focused, between {}-{} words. Be direct and impactful.".format(*LETTER_WORDS["concise"]),
+        "standard": "Write a standard-length cover letter, between {}-{} words. Provide more detail while staying focused.".format(*LETTER_WORDS["standard"])
+    }
+
+    # Tone instructions
+    tone_instructions = {
+        "conversational": "Use a warm, conversational tone that is professional but approachable. Write as if speaking to a colleague. Avoid overly formal language while maintaining respect.",
+        "professional": "Use a formal, traditional tone. Choose sophisticated vocabulary, avoid contractions, and maintain a serious, business-like demeanor throughout. This is for corporate, finance, law, or government roles.",
+        "enthusiastic": "Use an energetic, passionate tone that shows genuine excitement about the role and company. Express enthusiasm naturally without going overboard. Perfect for startups, creative roles, or mission-driven organizations.",
+        "confident": "Use a bold, direct tone that emphasizes your unique value proposition. Be assertive about your capabilities without arrogance. Focus on what you bring to the table. Ideal for competitive roles and leadership positions."
+    }
+
+    # Build prompt with XML tags for better structure and clarity
+    prompt = f"""<instructions>
+<length_requirement>
+{length_instructions.get(length, length_instructions["concise"])}
+</length_requirement>
+
+<tone_requirement>
+{tone_instructions.get(tone, tone_instructions["conversational"])}
+</tone_requirement>
+
+<additional_requirements>
+- Do not use emojis
+- Make the letter specific to this candidate and company
+- Use concrete examples from the resume
+- Do not include any XML tags, brackets, or meta-instructions in your output
+- Output only the final cover letter text
+</additional_requirements>
+</instructions>
+
+<resume>
+{resume_text}
+</resume>"""
+
+    # Add resume highlight if provided
+    if resume_highlight:
+        prompt += f"""
+
+<resume_highlight>
+The candidate specifically wants to EMPHASIZE these experiences/achievements from their resume:
+
+{resume_highlight}
+
+IMPORTANT: Make sure to feature and highlight these specific items in the cover letter when relevant.
+</resume_highlight>"""
+
+    prompt += f"""
+
+<job_description>
+{job_description if job_description else "No job description provided. Focus on general fit with the company and role."}
+</job_description>
+
+<candidate_motivation>
+{why_want_job}
+</candidate_motivation>
+
+<additional_context>
+{additional_context if additional_context else "No additional context provided."}
+</additional_context>
+
+<output_format>
+The cover letter must follow this exact structure:
+
+{(date or datetime.now()).strftime("%B %d, %Y")}
+
+{candidate_address}
+
+
+Hiring Manager
+{company_name}
+
+Dear Hiring Manager,
+
+[First paragraph: State why you are writing and include the exact title of the position: {role_title}. If applicable, mention any company connections.]
+
+[Second paragraph: Describe what the candidate offers based on their resume. Provide specific examples of how their qualifications match the job requirements. Use work, classroom, or organizational experiences. Expand on resume details without repeating them verbatim.]
+
+[Third paragraph: Establish synergy between the candidate and {company_name}. Include values, traits, corporate culture, or commitment to diversity that align with the candidate's profile.]
+
+[Final paragraph: Reiterate interest in the position and express interest in an interview. Thank the employer for their time and consideration.]
+
+Sincerely,
+
+
+{candidate_name}
+</output_format>
+
+Generate the complete cover letter now, following the output format exactly and applying all requirements. Replace all bracketed instructions with actual content."""
+
+    # System message for role-setting
+    system_message = """You are an expert cover letter writer with 15 years of experience helping candidates land jobs at top companies across all industries. You excel at:
+
+- Identifying key resume highlights that match job requirements
+- Writing compelling narratives that showcase candidate strengths without exaggeration
+- Adapting tone and style precisely to company culture and industry norms
+- Maintaining appropriate length while maximizing impact and readability
+- Using specific examples and concrete achievements rather than generic statements
+- Crafting authentic, genuine language that sounds human and professional
+
+You understand that cover letters should be concise, focused, and tailored to demonstrate clear value to the employer."""
+
+    return {
+        "model": COVER_LETTER_MODEL,
+        "max_tokens": 1500,
+        "system": system_message,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ]
+    }
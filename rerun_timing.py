@@ -0,0 +1,52 @@
+"""Rerun timings per page scope (full app run or a single fragment).
+
+Each interaction reruns either the whole script or just the fragment that
+holds the widget. Recording both makes the cost of each visible in the
+Diagnostics panel.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from hedging import LatencyTracker
+
+
+class RerunTimings:
+    """Rolling rerun durations (seconds) keyed by scope name."""
+
+    def __init__(self, window=200):
+        self._window = window
+        self._trackers = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, scope, seconds):
+        with self._lock:
+            tracker = self._trackers.get(scope)
+            if tracker is None:
+                tracker = self._trackers[scope] = LatencyTracker(window=self._window, min_samples=1)
+            self._counts[scope] = self._counts.get(scope, 0) + 1
+        tracker.record(seconds)
+
+    @contextmanager
+    def measure(self, scope):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(scope, time.perf_counter() - start)
+
+    def summary(self):
+        """Run count and p50/p95 in milliseconds for every scope."""
+        with self._lock:
+            trackers = dict(self._trackers)
+            counts = dict(self._counts)
+        return {
+            scope: {
+                "runs": counts[scope],
+                "p50_ms": round(tracker.percentile(50) * 1000, 1),
+                "p95_ms": round(tracker.percentile(95) * 1000, 1),
+            }
+            for scope, tracker in sorted(trackers.items())
+        }
@@ -0,0 +1,220 @@
+"""Parse resume text into a structured model, once per distinct text.
+
+The structured form (contact details, sections, roles with dates and bullets,
+skills) is stored alongside the raw text on the `resumes` row. It is reused
+for compact prompt assembly, highlight suggestions and relevance ranking
+without the model or the app re-reading the raw blob.
+"""
+
+import hashlib
+import re
+import threading
+from collections import Counter, OrderedDict
+
+PARSER_VERSION = 1
+
+_KNOWN_HEADINGS = re.compile(
+    r"^(summary|profile|objective|experience|work experience|professional experience|employment( history)?|"
+    r"education|skills|technical skills|core competencies|projects|selected projects|publications|"
+    r"certifications?|awards|honors|leadership|activities|volunteer( experience)?|languages|interests|"
+    r"research( experience)?)$",
+    re.IGNORECASE
+)
+_EXPERIENCE_SECTIONS = ("experience", "employment", "research", "leadership", "volunteer", "projects", "activities")
+_BULLET = re.compile(r"^\s*[-•*▪◦●‣–]\s+")
+_MONTH = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_DATE = rf"(({_MONTH}|spring|summer|fall|autumn|winter)\s+)?(19|20)\d{{2}}"
+_DATE_RANGE = re.compile(rf"{_DATE}(\s*(-|–|—|to)\s*({_DATE}|present|current|now))?", re.IGNORECASE)
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE = re.compile(r"\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}")
+_URL = re.compile(r"(https?://\S+|(linkedin|github)\.com/\S+)", re.IGNORECASE)
+_CAPS_HEADING = re.compile(r"^[A-Z][A-Z &/]{2,}$")
+_ROLE_SEPARATOR = re.compile(r"\s*(?:,| at | \| | - | – | — )\s*")
+_WORD = re.compile(r"[a-z][a-z0-9+#.]*")
+
+
+def text_hash(text):
+    """Hash identifying a resume's text (re-parse only when this changes)."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def _is_heading(line):
+    stripped = line.strip().rstrip(":")
+    if not stripped or len(stripped) > 40 or _BULLET.match(line):
+        return False
+    return bool(_KNOWN_HEADINGS.match(stripped)) or bool(_CAPS_HEADING.match(stripped))
+
+
+def _parse_role(line):
+    """Split "Title, Organization - Summer 2022" style lines into parts."""
+    match = _DATE_RANGE.search(line)
+    dates = match.group(0).strip() if match else ""
+    head = (line[:match.start()] + line[match.end():]) if match else line
+    head = head.strip(" ,|-–—()")
+    parts = _ROLE_SEPARATOR.split(head, maxsplit=1)
+    title, organization = (parts[0], parts[1]) if len(parts) == 2 else (head, "")
+    return {"title": title.strip(), "organization": organization.strip(), "dates": dates, "bullets": []}
+
+
+def parse_resume(text):
+    """Return the structured model for `text`."""
+    lines = [line.rstrip() for line in (text or "").split("\n")]
+    header_lines = []
+    sections = []
+    current = None
+
+    for line in lines:
+        if not line.strip():
+            continue
+        if _is_heading(line):
+            current = {"title": line.strip().rstrip(":").title(), "roles": [], "lines": []}
+            sections.append(current)
+            continue
+        if current is None:
+            header_lines.append(line.strip())
+            continue
+
+        is_experience = current["title"].lower().startswith(_EXPERIENCE_SECTIONS) or any(
+            word in current["title"].lower() for word in _EXPERIENCE_SECTIONS
+        )
+        if _BULLET.match(line):
+            bullet = _BULLET.sub("", line).strip()
+            if current["roles"]:
+                current["roles"][-1]["bullets"].append(bullet)
+            else:
+                current["lines"].append(bullet)
+        elif is_experience and (_DATE_RANGE.search(line) or not current["roles"]):
+            current["roles"].append(_parse_role(line.strip()))
+        elif current["roles"] and not current["roles"][-1]["bullets"]:
+            # Wrapped role line or a detail line right under the role
+            current["roles"][-1]["bullets"].append(line.strip())
+        else:
+            current["lines"].append(line.strip())
+
+    header = " ".join(header_lines)
+    email = _EMAIL.search(header)
+    phone = _PHONE.search(header)
+    skills = []
+    for section in sections:
+        if "skill" in section["title"].lower() or "competenc" in section["title"].lower():
+            for line in section["lines"]:
+                item_text = line.split(":", 1)[-1]
+                skills.extend(s.strip() for s in re.split(r"[,;|•]", item_text) if s.strip())
+
+    return {
+        "version": PARSER_VERSION,
+        "contact": {
+            "name": header_lines[0] if header_lines else "",
+            "email": email.group(0) if email else "",
+            "phone": phone.group(0) if phone else "",
+            "links": [m.group(0) for m in _URL.finditer(header)],
+        },
+        "summary": [line for line in header_lines[1:] if not (_EMAIL.search(line) or _PHONE.search(line))],
+        "sections": sections,
+        "skills": skills,
+    }
+
+
+def compact_resume(structured):
+    """Render a structured resume as compact plain text for prompts."""
+    out = []
+    contact = structured.get("contact", {})
+    if contact.get("name"):
+        out.append(contact["name"])
+    reach = " | ".join(part for part in [contact.get("email"), contact.get("phone")] + contact.get("links", []) if part)
+    if reach:
+        out.append(reach)
+    out.extend(structured.get("summary", []))
+    for section in structured.get("sections", []):
+        out.append("")
+        out.append(section["title"].upper())
+        for role in section["roles"]:
+            label = ", ".join(part for part in (role["title"], role["organization"]) if part)
+            if role["dates"]:
+                label = f"{label} ({role['dates']})" if label else role["dates"]
+            out.append(label)
+            out.extend(f"- {bullet}" for bullet in role["bullets"])
+        out.extend(section["lines"])
+    return "\n".join(out).strip()
+
+
+def rendering_complete(structured, text, min_coverage=0.95):
+    """Whether `compact_resume(structured)` keeps the substance of `text`.
+
+    The parse must have found sections, every role needs a title, and the
+    rendering must keep at least `min_coverage` of the source's content words.
+    """
+    if not structured.get("sections") or any(not role["title"] for role in all_roles(structured)):
+        return False
+    source = term_counts(text)
+    if not source:
+        return False
+    rendered = terms(compact_resume(structured))
+    kept = sum(count for term, count in source.items() if term in rendered)
+    return kept / sum(source.values()) >= min_coverage
+
+
+def all_roles(structured):
+    """Roles across every section, in resume order."""
+    return [role for section in structured.get("sections", []) for role in section["roles"]]
+
+
+def all_bullets(structured):
+    """Every achievement bullet, paired with the role it belongs to."""
+    return [(role, bullet) for role in all_roles(structured) for bullet in role["bullets"]]
+
+
+def term_counts(text):
+    """Counts of the lowercase content words in `text` (the words `terms` returns)."""
+    return Counter(word.strip(".") for word in _WORD.findall((text or "").lower()) if len(word) > 2)
+
+
+def terms(text):
+    """Lowercase content words used for overlap scoring."""
+    return set(term_counts(text))
+
+
+def suggest_highlights(structured, job_description, limit=5):
+    """Resume bullets ranked by term overlap with the job description."""
+    jd_terms = terms(job_description)
+    scored = []
+    for role, bullet in all_bullets(structured):
+        overlap = len(terms(bullet) & jd_terms)
+        if overlap:
+            scored.append((overlap, f"{bullet} ({role['title']})" if role["title"] else bullet))
+    scored.sort(key=lambda item: -item[0])
+    return [text for _, text in scored[:limit]]
+
+
+class ResumeParseCache:
+    """LRU of structured resumes keyed by text hash, so each text is parsed once."""
+
+    def __init__(self, max_entries=1024):
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self.stats = {"parsed": 0, "hits": 0}
+
+    def prime(self, hash_value, structured):
+        """Seed the cache with a structure already stored in the database."""
+        if hash_value and structured and structured.get("version") == PARSER_VERSION:
+            with self._lock:
+                self._entries[hash_value] = structured
+                self._entries.move_to_end(hash_value)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+
+    def get(self, text):
+        """Return (hash, structured) for `text`, parsing only on a miss."""
+        hash_value = text_hash(text)
+        with self._lock:
+            structured = self._entries.get(hash_value)
+            if structured is not None:
+                self._entries.move_to_end(hash_value)
+                self.stats["hits"] += 1
+                return hash_value, structured
+        structured = parse_resume(text)
+        with self._lock:
+            self.stats["parsed"] += 1
+        self.prime(hash_value, structured)
+        return hash_value, structured
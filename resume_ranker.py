@@ -0,0 +1,96 @@
+"""Rank a user's saved resumes against a job description.
+
+Each resume's term vector (log-scaled counts of its content words, capped at
+MAX_TERMS, with its L2 norm) is built when the resume is saved and stored
+in the structured model under "term_vector", so ranking never re-reads or
+re-parses resume text. Ranking scores every resume in one NumPy pass: the
+resumes' weights for the job description's terms form a matrix, the job
+terms are weighted by how few of the user's resumes contain them (so terms
+that every variant shares don't decide the pick), and cosine scores, term
+coverage and each resume's strongest matching terms come out of the same
+arrays.
+"""
+
+import math
+
+import numpy as np
+
+from resume_parser import compact_resume, term_counts
+
+VECTOR_VERSION = 1
+
+# Terms kept per resume vector (the highest weighted)
+MAX_TERMS = 200
+
+# Job-posting filler that would otherwise count as matching terms
+_STOPWORDS = frozenset(
+    "ability able about across against all also and any are build building can candidate company daily for from "
+    "have help hiring including into join looking more must new our part plus preferred qualifications "
+    "related requirements responsibilities role skills strong team that the their this through "
+    "using well what who will with work working years you your".split()
+)
+
+
+def term_vector(structured):
+    """Log-scaled term weights of a structured resume, as stored in structured["term_vector"]."""
+    counts = term_counts(compact_resume(structured))
+    weights = {term: 1.0 + math.log(count) for term, count in counts.items() if term not in _STOPWORDS}
+    kept = sorted(weights.items(), key=lambda item: (-item[1], item[0]))[:MAX_TERMS]
+    return {
+        "version": VECTOR_VERSION,
+        "weights": {term: round(weight, 3) for term, weight in kept},
+        "norm": round(math.sqrt(sum(weight * weight for _, weight in kept)), 4),
+    }
+
+
+def ensure_term_vector(structured):
+    """The stored term vector, building it in place for resumes saved before vectors existed."""
+    vector = structured.get("term_vector")
+    if not vector or vector.get("version") != VECTOR_VERSION:
+        vector = structured["term_vector"] = term_vector(structured)
+    return vector
+
+
+def rank_resumes(vectors, job_description, explain_terms=6):
+    """Score term vectors against a job description, best first.
+
+    Returns [{"index", "score", "matched", "covered", "job_terms", "missing"}], where
+    `index` points into `vectors`, `matched` lists the resume's strongest
+    job terms, `covered` counts the job terms it contains out of `job_terms`,
+    and `missing` lists job terms it lacks that another of the resumes has.
+    """
+    job_counts = {term: count for term, count in term_counts(job_description).items() if term not in _STOPWORDS}
+    if not vectors or not job_counts:
+        return []
+    vocabulary = sorted(job_counts)
+
+    resume_weights = np.array(
+        [[vector["weights"].get(term, 0.0) for term in vocabulary] for vector in vectors], dtype=np.float64
+    )
+    norms = np.array([vector["norm"] or 1.0 for vector in vectors])
+    present = resume_weights > 0
+    resumes = len(vectors)
+    # Smoothed IDF over this user's resumes
+    idf = np.log((1 + resumes) / (1 + present.sum(axis=0))) + 1.0
+    query = (1.0 + np.log(np.array([job_counts[term] for term in vocabulary], dtype=np.float64))) * idf
+
+    contributions = resume_weights * query
+    scores = contributions.sum(axis=1) / (norms * np.linalg.norm(query))
+    covered = present.sum(axis=1)
+    top_terms = np.argsort(-contributions, axis=1, kind="stable")[:, :explain_terms]
+    by_weight = np.argsort(-query, kind="stable")
+    in_any = present.any(axis=0)
+
+    ranked = []
+    for index in np.argsort(-scores, kind="stable"):
+        matched = [vocabulary[t] for t in top_terms[index] if contributions[index, t] > 0]
+        missing = [vocabulary[t] for t in by_weight if in_any[t] and not present[index, t]][:3]
+        ranked.append({
+            "index": int(index),
+            "score": round(float(scores[index]), 4),
+            "matched": matched,
+            "covered": int(covered[index]),
+            "job_terms": len(vocabulary),
+            "missing": missing,
+        })
+    return ranked
@@ -0,0 +1,61 @@
+"""Parse existing resumes into the structured model (migration 004).
+
+Only rows whose text hash is missing or stale are parsed. Rows saved before
+resume ranking also get their term vector added to the structure. Rows are streamed
+in fixed-size chunks ordered by id.
+
+Usage:
+    python -m scripts.backfill_resume_structures [--chunk-size 200]
+"""
+
+import argparse
+import sys
+
+from codec import decode_text
+from resume_parser import PARSER_VERSION, parse_resume, text_hash
+from resume_ranker import VECTOR_VERSION, ensure_term_vector
+from scripts.common import service_client
+
+
+def backfill(client, chunk_size=200):
+    """Store structure and text hash for rows that need it. Returns the number updated."""
+    updated = 0
+    last_id = None
+    while True:
+        query = client.table("resumes").select("id, resume_text, text_hash, structured")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.order("id").limit(chunk_size).execute().data or []
+        if not rows:
+            return updated
+
+        for row in rows:
+            text = decode_text(row.get("resume_text") or "")
+            hash_value = text_hash(text)
+            structured = row.get("structured") or {}
+            if row.get("text_hash") == hash_value and structured.get("version") == PARSER_VERSION:
+                if (structured.get("term_vector") or {}).get("version") == VECTOR_VERSION:
+                    continue
+            else:
+                structured = parse_resume(text)
+            ensure_term_vector(structured)
+            client.table("resumes").update({
+                "structured": structured,
+                "text_hash": hash_value
+            }).eq("id", row["id"]).execute()
+            updated += 1
+
+        last_id = rows[-1]["id"]
+        print(f"Parsed {updated} resume(s) (through id {last_id})", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=200, help="rows fetched per page")
+    args = parser.parse_args()
+    total = backfill(service_client(), args.chunk_size)
+    print(f"Done. {total} resume(s) updated.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Backfill MinHash signatures and LSH bands for existing cover letters.
+
+Streams rows in fixed-size chunks ordered by id (keyset pagination), so memory
+stays constant however large the table is.
+
+Usage:
+    python -m scripts.backfill_signatures [--chunk-size 200]
+"""
+
+import argparse
+import sys
+
+from codec import decode_text
+from dedupe import lsh_bands, minhash_signature
+from scripts.common import service_client
+
+
+def backfill(client, chunk_size=200):
+    """Compute signatures for rows that have none. Returns the number updated."""
+    updated = 0
+    last_id = None
+    while True:
+        query = client.table("cover_letters").select("id, cover_letter").is_("minhash", "null")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.order("id").limit(chunk_size).execute().data or []
+        if not rows:
+            return updated
+
+        for row in rows:
+            if not row.get("cover_letter"):
+                continue
+            signature = minhash_signature(decode_text(row["cover_letter"]))
+            client.table("cover_letters").update({
+                "minhash": signature,
+                "lsh_bands": lsh_bands(signature)
+            }).eq("id", row["id"]).execute()
+            updated += 1
+
+        last_id = rows[-1]["id"]
+        print(f"Backfilled {updated} cover letter(s) (through id {last_id})", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=200, help="rows fetched per page")
+    args = parser.parse_args()
+    total = backfill(service_client(), args.chunk_size)
+    print(f"Done. {total} cover letter(s) updated.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Generate cover letters in bulk with the Message Batches API.
+
+For runs nobody is waiting on, like a career-center cohort or regenerating
+letters after a prompt change. Requests are built with the app's own prompt
+builder (prompts.py) and submitted as Message Batches jobs, which cost half
+the per-token price of interactive calls and don't count against the
+interactive rate limits. Each batch id is stored in `generation_batches`
+(migrations/005) together with the write-back target of every request, so
+`collect` can run later, or from another machine, and save the results to
+`cover_letters`.
+
+Jobs are JSON lines, for example:
+    {"user_id": "...", "resume_id": 12, "company": "Acme", "role": "Analyst",
+     "why_want_job": "...", "job_description": "...", "tone": "professional"}
+`resume_id` loads a saved resume with its name and address; otherwise pass
+`resume_text`, `candidate_name` and `candidate_address`. A job with
+`cover_letter_id` replaces that letter instead of adding a new one.
+
+`sync` runs the same jobs one request at a time through the Messages API,
+for comparing cost per letter and throughput with the batch path.
+
+Usage:
+    python -m scripts.batch_generate submit jobs.jsonl
+    python -m scripts.batch_generate collect [--wait]
+    python -m scripts.batch_generate sync jobs.jsonl [--concurrency 4]
+    STORAGE_BACKEND=sqlite python -m scripts.batch_generate --fake 5 run jobs.jsonl --interval 1
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import anthropic
+
+from codec import encode_text
+from dedupe import lsh_bands, minhash_signature
+from normalize import normalize_job_description, normalize_resume
+from prompts import cover_letter_request
+from resume_parser import compact_resume, parse_resume, rendering_complete
+from scripts.common import service_storage
+
+# Requests per Message Batches job (the API accepts up to 100,000 or 256 MB)
+DEFAULT_BATCH_SIZE = 5000
+
+# USD per million (input, output) tokens for interactive calls; batches cost half
+PRICES_PER_MTOK = {"claude-3-haiku-20240307": (0.25, 1.25)}
+BATCH_DISCOUNT = 0.5
+
+
+def load_jobs(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_request(storage, job):
+    """Messages API parameters for one job, with inputs normalized as the app does."""
+    resume_text = job.get("resume_text", "")
+    candidate_name = job.get("candidate_name", "")
+    candidate_address = job.get("candidate_address", "")
+    if job.get("resume_id") is not None:
+        resume = storage.get_resume(job["user_id"], job["resume_id"], "resume_name, resume_address, resume_text")
+        if resume is None:
+            raise ValueError(f"resume {job['resume_id']} not found for user {job['user_id']}")
+        resume_text = resume_text or resume["resume_text"]
+        candidate_name = candidate_name or resume["resume_name"]
+        candidate_address = candidate_address or resume.get("resume_address") or ""
+
+    if os.environ.get("RESUME_PROMPT_FORMAT", "raw").lower() == "structured":
+        structured = parse_resume(resume_text)
+        if rendering_complete(structured, resume_text):
+            resume_text = compact_resume(structured)
+    return cover_letter_request(
+        normalize_resume(resume_text),
+        candidate_name,
+        candidate_address,
+        job["company"],
+        job["role"],
+        job.get("why_want_job", ""),
+        normalize_job_description(job.get("job_description", "")),
+        job.get("additional_context", ""),
+        job.get("resume_highlight", ""),
+        job.get("length", "concise"),
+        job.get("tone", "conversational")
+    )
+
+
+def write_target(job):
+    """Where a job's letter is saved; kept with the batch until collect runs."""
+    return {
+        "user_id": job["user_id"],
+        "company": job["company"],
+        "role": job["role"],
+        "cover_letter_id": job.get("cover_letter_id")
+    }
+
+
+def save_letter(storage, target, text):
+    """Insert the letter, or replace `cover_letter_id` unless other letters are stored as deltas of it.
+
+    Only a letter owned by the job's user is replaced; any other id is ignored
+    and the letter is added as a new one.
+    """
+    signature = minhash_signature(text)
+    fields = {"cover_letter": text, "minhash": signature, "lsh_bands": lsh_bands(signature)}
+    algorithm = os.getenv("STORAGE_COMPRESSION", "off").lower()
+    if algorithm in ("gzip", "zstd"):
+        fields["cover_letter"] = encode_text(text, algorithm)
+    fields["search_text"] = text
+
+    letter_id = target.get("cover_letter_id")
+    if letter_id is not None and not storage.dependent_cover_letters(target["user_id"], letter_id, "id"):
+        if storage.update_cover_letter(target["user_id"], letter_id, {**fields, "reference_id": None, "delta": None}):
+            return "replaced"
+    storage.insert_cover_letter({
+        **fields,
+        "user_id": target["user_id"],
+        "company": target["company"],
+        "role": target["role"],
+        "date_created": datetime.now().strftime("%Y-%m-%d %H:%M")
+    })
+    return "added"
+
+
+def cost(model, input_tokens, output_tokens, batch):
+    input_price, output_price = PRICES_PER_MTOK.get(model, PRICES_PER_MTOK["claude-3-haiku-20240307"])
+    usd = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+    return usd * BATCH_DISCOUNT if batch else usd
+
+
+def new_summary():
+    return {"letters": 0, "failed": 0, "added": 0, "replaced": 0, "input_tokens": 0, "output_tokens": 0, "model": None}
+
+
+def add_message(summary, message, outcome):
+    summary["letters"] += 1
+    summary[outcome] += 1
+    summary["input_tokens"] += message.usage.input_tokens
+    summary["output_tokens"] += message.usage.output_tokens
+    summary["model"] = message.model
+
+
+def report(label, summary, seconds, batch):
+    """Print letters, throughput and cost (with the other path's price for comparison)."""
+    letters = summary["letters"]
+    model = summary["model"]
+    usd = cost(model, summary["input_tokens"], summary["output_tokens"], batch)
+    other = cost(model, summary["input_tokens"], summary["output_tokens"], not batch)
+    per_letter = usd / letters if letters else 0.0
+    print(f"{label}: {letters} letter(s) ({summary['added']} added, {summary['replaced']} replaced), "
+          f"{summary['failed']} failed, in {seconds:.1f}s ({letters / seconds * 60 if seconds else 0:.1f} letters/min)")
+    print(f"  tokens: {summary['input_tokens']:,} in / {summary['output_tokens']:,} out")
+    print(f"  cost: ${usd:.4f} (${per_letter:.5f}/letter) at {'batch' if batch else 'interactive'} prices; "
+          f"{'interactive' if batch else 'batch'} prices would be ${other:.4f} (${other / letters if letters else 0:.5f}/letter)")
+
+
+def submit(client, storage, jobs, batch_size=DEFAULT_BATCH_SIZE):
+    """Submit jobs as one or more batches and record them. Returns the batch ids."""
+    batch_ids = []
+    for start in range(0, len(jobs), batch_size):
+        chunk = jobs[start:start + batch_size]
+        requests, targets = [], {}
+        for index, job in enumerate(chunk, start):
+            custom_id = f"job-{index}"
+            requests.append({"custom_id": custom_id, "params": build_request(storage, job)})
+            targets[custom_id] = write_target(job)
+        batch = client.messages.batches.create(requests=requests)
+        storage.insert_batch({
+            "id": batch.id,
+            "status": batch.processing_status,
+            "request_count": len(requests),
+            "jobs": targets
+        })
+        batch_ids.append(batch.id)
+        print(f"Submitted {batch.id} with {len(requests)} request(s)", file=sys.stderr)
+    return batch_ids
+
+
+def write_back(client, storage, row, batch):
+    """Save an ended batch's results to cover_letters and mark it written."""
+    summary = {**new_summary(), **(row.get("summary") or {})}
+    done = set(summary.pop("done", []))
+    for entry in client.messages.batches.results(row["id"]):
+        if entry.custom_id in done:
+            continue
+        target = row["jobs"].get(entry.custom_id)
+        if target is None or entry.result.type != "succeeded":
+            summary["failed"] += 1
+        else:
+            message = entry.result.message
+            add_message(summary, message, save_letter(storage, target, message.content[0].text))
+        # Checkpoint every result so an interrupted collect re-saves at most the letter it was on
+        done.add(entry.custom_id)
+        storage.update_batch(row["id"], {"status": "writing", "summary": {**summary, "done": sorted(done)}})
+
+    seconds = (batch.ended_at - batch.created_at).total_seconds() if batch.ended_at else 0.0
+    summary["seconds"] = seconds
+    summary["cost_usd"] = round(cost(summary["model"], summary["input_tokens"], summary["output_tokens"], True), 6)
+    storage.update_batch(row["id"], {
+        "status": "written",
+        "ended_at": batch.ended_at.isoformat() if batch.ended_at else None,
+        "summary": summary
+    })
+    report(row["id"], summary, seconds, batch=True)
+
+
+def collect(client, storage, wait=False, interval=60.0):
+    """Write back every ended batch; with `wait`, poll until none are left open."""
+    while True:
+        pending = 0
+        for row in storage.open_batches():
+            batch = client.messages.batches.retrieve(row["id"])
+            if batch.processing_status != "ended":
+                pending += 1
+                if batch.processing_status != row["status"]:
+                    storage.update_batch(row["id"], {"status": batch.processing_status})
+                counts = batch.request_counts
+                print(f"{row['id']}: {batch.processing_status}, {counts.succeeded} succeeded, "
+                      f"{counts.processing} processing", file=sys.stderr)
+                continue
+            write_back(client, storage, row, batch)
+        if not pending or not wait:
+            return pending
+        time.sleep(interval)
+
+
+def run_sync(client, storage, jobs, concurrency=4):
+    """Generate every job through the Messages API, `concurrency` requests at a time."""
+    summary = new_summary()
+
+    def generate(job):
+        return client.messages.create(**build_request(storage, job))
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [(job, pool.submit(generate, job)) for job in jobs]
+        for job, future in futures:
+            try:
+                message = future.result()
+            except Exception as e:
+                summary["failed"] += 1
+                print(f"{job['company']} - {job['role']}: {e}", file=sys.stderr)
+                continue
+            add_message(summary, message, save_letter(storage, write_target(job), message.content[0].text))
+    report("sync", summary, time.monotonic() - start, batch=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fake", type=float, metavar="SECONDS",
+                        help="use the local fake Claude backend; batches end after SECONDS (sync calls take 1.5s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit_parser = commands.add_parser("submit", help="submit jobs as Message Batches")
+    submit_parser.add_argument("jobs", help="JSON lines file of jobs")
+    submit_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="requests per batch")
+    collect_parser = commands.add_parser("collect", help="write back the results of ended batches")
+    collect_parser.add_argument("--wait", action="store_true", help="poll until every batch has ended")
+    collect_parser.add_argument("--interval", type=float, default=60.0, help="seconds between polls")
+    run_parser = commands.add_parser("run", help="submit, then collect with --wait")
+    run_parser.add_argument("jobs", help="JSON lines file of jobs")
+    run_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="requests per batch")
+    run_parser.add_argument("--interval", type=float, default=60.0, help="seconds between polls")
+    sync_parser = commands.add_parser("sync", help="generate jobs one request at a time, for comparison")
+    sync_parser.add_argument("jobs", help="JSON lines file of jobs")
+    sync_parser.add_argument("--concurrency", type=int, default=4, help="requests in flight at once")
+    args = parser.parse_args()
+
+    if args.fake is not None:
+        from scripts import fake_backends
+        fake_backends.install(llm_latency=1.5, batch_latency=args.fake)
+        os.environ.setdefault("ANTHROPIC_API_KEY", "fake")
+
+    storage = service_storage()
+    client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    if args.command == "submit":
+        submit(client, storage, load_jobs(args.jobs), args.batch_size)
+    elif args.command == "collect":
+        pending = collect(client, storage, args.wait, args.interval)
+        if pending:
+            print(f"{pending} batch(es) still processing; run collect again later.")
+    elif args.command == "run":
+        submit(client, storage, load_jobs(args.jobs), args.batch_size)
+        collect(client, storage, wait=True, interval=args.interval)
+    else:
+        run_sync(client, storage, load_jobs(args.jobs), args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark cover letter exports per second for DOCX and PDF.
+
+Compares the export engine (cached skeletons and font) with the previous
+build-from-scratch approach on the same letter. For PDF, "ttf-fresh" is the
+fair comparison: the old Helvetica baseline is faster but cannot render
+non-Latin-1 text.
+
+Usage:
+    python -m scripts.bench_exports [--iterations 200]
+"""
+
+import argparse
+import io
+import time
+
+from docx import Document
+from docx.shared import Inches, Pt
+from fpdf import FPDF
+
+from export_engine import ExportEngine
+
+SAMPLE_LETTER = """October 19, 2026
+
+123 Main Street
+Boston, MA 02101
+
+
+Hiring Manager
+Anthropic
+
+Dear Hiring Manager,
+
+I am writing to apply for the Software Engineer position at Anthropic. As a recent Computer Science graduate from Boston University, I have followed your work on AI safety closely.
+
+During my internship at TechCorp Inc., I built a data pipeline that reduced processing time by 60%, and I wrote unit tests that reached 95% code coverage. My research on natural language processing models taught me to move carefully from experiment to production.
+
+Anthropic's commitment to building helpful, harmless and honest systems matches what I want from my career. I value careful engineering and clear communication, and I would bring both to your team.
+
+Thank you for your time and consideration. I would welcome the opportunity to discuss how I can contribute to Anthropic's mission.
+
+Sincerely,
+
+
+Jane Smith"""
+
+
+def baseline_docx(text):
+    """Previous export_to_docx: new Document, per-run font sizing."""
+    doc = Document()
+    for section in doc.sections:
+        section.top_margin = Inches(1)
+        section.bottom_margin = Inches(1)
+        section.left_margin = Inches(1)
+        section.right_margin = Inches(1)
+    for line in text.split("\n"):
+        paragraph = doc.add_paragraph(line)
+        for run in paragraph.runs:
+            run.font.size = Pt(11)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def baseline_pdf(text):
+    """Previous export_to_pdf: new FPDF with core Helvetica."""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", "", 11)
+    pdf.multi_cell(0, 6, text)
+    return bytes(pdf.output())
+
+
+def baseline_pdf_unicode(text, font_path):
+    """Build-from-scratch PDF with the same Unicode font, loaded on every export."""
+    pdf = FPDF()
+    pdf.add_font("Body", "", font_path)
+    pdf.add_page()
+    pdf.set_font("Body", "", 11)
+    pdf.multi_cell(0, 6, text)
+    return bytes(pdf.output())
+
+
+def exports_per_second(render, text, iterations):
+    render(text)  # warm caches outside the timed loop
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render(text)
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = ExportEngine()
+    print(f"PDF font: {engine.font_path or 'Helvetica (core, Latin-1 only)'}")
+    results = [
+        ("docx", "baseline", baseline_docx),
+        ("docx", "engine", engine.to_docx),
+        ("pdf", "baseline", baseline_pdf),
+        ("pdf", "engine", engine.to_pdf),
+    ]
+    if engine.font_path:
+        # Same output as the engine, but parsing the font for every export
+        results.insert(3, ("pdf", "ttf-fresh", lambda text: baseline_pdf_unicode(text, engine.font_path)))
+    for fmt, name, render in results:
+        rate = exports_per_second(render, SAMPLE_LETTER, args.iterations)
+        print(f"{fmt:5} {name:10} {rate:8.1f} exports/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Regression check for job-description boilerplate stripping.
+
+Runs representative job descriptions through normalize_job_description and
+checks that boilerplate ("About Acme", benefits, EEO) is dropped while the
+role itself (overview, responsibilities, qualifications) is kept.
+
+Usage:
+    python -m scripts.check_normalize
+"""
+
+import sys
+
+from normalize import normalize_job_description
+
+# (name, job description, lines that must be kept, lines that must be dropped)
+CASES = [
+    (
+        "company about, role about",
+        """About Acme
+Acme builds rockets for everyone.
+
+About This Role
+You will lead the propulsion test program.
+
+Key Responsibilities
+- Run engine test campaigns
+
+Benefits
+- Unlimited PTO
+
+Minimum Qualifications
+- BS in engineering""",
+        ["You will lead the propulsion test program.", "- Run engine test campaigns", "- BS in engineering"],
+        ["Acme builds rockets for everyone.", "- Unlimited PTO"],
+    ),
+    (
+        "team and opportunity headings",
+        """About Us
+We are a fintech startup.
+
+About the Team
+The platform team owns our payments APIs.
+
+About the Opportunity
+Design and ship new payment rails.
+
+Job Summary
+Senior backend role, Python and Postgres.""",
+        ["The platform team owns our payments APIs.", "Design and ship new payment rails.",
+         "Senior backend role, Python and Postgres."],
+        ["We are a fintech startup."],
+    ),
+    (
+        "job description heading after boilerplate",
+        """Who We Are
+A nonprofit improving literacy.
+
+Job Description
+Coordinate volunteer tutors across three sites.
+
+We are an equal opportunity employer and value diversity.""",
+        ["Coordinate volunteer tutors across three sites."],
+        ["A nonprofit improving literacy.", "We are an equal opportunity employer and value diversity."],
+    ),
+]
+
+
+def main():
+    failures = 0
+    for name, text, keep, drop in CASES:
+        lines = normalize_job_description(text).split("\n")
+        missing = [line for line in keep if line not in lines]
+        leftover = [line for line in drop if line in lines]
+        if missing or leftover:
+            failures += 1
+            print(f"FAIL {name}: missing {missing}, not removed {leftover}")
+        else:
+            print(f"ok   {name}")
+    if failures:
+        sys.exit(f"{failures} of {len(CASES)} case(s) failed")
+    print(f"All {len(CASES)} cases passed.")
+
+
+if __name__ == "__main__":
+    main()
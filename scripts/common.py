@@ -0,0 +1,28 @@
+"""Shared helpers for maintenance scripts run outside Streamlit."""
+
+import os
+
+from dotenv import load_dotenv
+from supabase import create_client
+
+from storage import SQLiteStorage, SupabaseStorage
+
+
+def service_client():
+    """Supabase client for batch jobs.
+
+    Uses SUPABASE_SERVICE_KEY when set so jobs can read every user's rows
+    (RLS restricts the anon key to the signed-in user).
+    """
+    load_dotenv()
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY")
+    return create_client(url, key)
+
+
+def service_storage():
+    """Storage for batch jobs, on the backend selected by STORAGE_BACKEND (as in the app)."""
+    load_dotenv()
+    if os.getenv("STORAGE_BACKEND", "supabase").strip().lower() == "sqlite":
+        return SQLiteStorage(os.getenv("SQLITE_PATH", "cover_letter_generator.db"))
+    return SupabaseStorage(service_client())
@@ -0,0 +1,81 @@
+"""Compress large text columns of existing rows (see STORAGE_COMPRESSION).
+
+Walks each table by id in fixed-size chunks and rewrites uncompressed values
+that are large enough to benefit. Reports bytes stored before and after, so
+the egress saving for full-table reads can be measured. Safe to stop and
+re-run: already-compressed values are skipped.
+
+Usage:
+    python -m scripts.compress_existing [--algorithm zstd|gzip] [--dry-run]
+"""
+
+import argparse
+import sys
+
+from codec import encode_text, is_encoded
+from scripts.common import service_client
+
+# Table -> text columns worth compressing
+COMPRESSED_COLUMNS = {
+    "resumes": ["resume_text"],
+    "cover_letters": ["cover_letter"],
+    "ratings": ["cover_letter", "resume_text", "job_description"],
+}
+
+
+def compress_table(client, table, columns, algorithm, chunk_size=200, dry_run=False):
+    """Compress one table. Returns (rows_updated, bytes_before, bytes_after)."""
+    updated = bytes_before = bytes_after = 0
+    last_id = None
+    while True:
+        query = client.table(table).select(", ".join(["id"] + columns))
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.order("id").limit(chunk_size).execute().data or []
+        if not rows:
+            return updated, bytes_before, bytes_after
+
+        for row in rows:
+            changes = {}
+            for column in columns:
+                value = row.get(column)
+                if not value:
+                    continue
+                before = len(value.encode("utf-8"))
+                encoded = value if is_encoded(value) else encode_text(value, algorithm)
+                bytes_before += before
+                bytes_after += len(encoded.encode("utf-8"))
+                if encoded is not value:
+                    changes[column] = encoded
+            if changes and not dry_run:
+                # Cover letters are already indexed; the search trigger keeps their vector
+                client.table(table).update(changes).eq("id", row["id"]).execute()
+            if changes:
+                updated += 1
+
+        last_id = rows[-1]["id"]
+        print(f"{table}: {updated} row(s) compressed (through id {last_id})", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithm", choices=["zstd", "gzip"], default="zstd")
+    parser.add_argument("--chunk-size", type=int, default=200, help="rows fetched per page")
+    parser.add_argument("--dry-run", action="store_true", help="measure savings without writing")
+    args = parser.parse_args()
+
+    client = service_client()
+    total_before = total_after = 0
+    for table, columns in COMPRESSED_COLUMNS.items():
+        updated, before, after = compress_table(client, table, columns, args.algorithm, args.chunk_size, args.dry_run)
+        total_before += before
+        total_after += after
+        saved = 1 - after / before if before else 0
+        print(f"{table}: {updated} row(s), {before:,} -> {after:,} bytes ({saved:.0%} smaller)")
+
+    saved = 1 - total_after / total_before if total_before else 0
+    print(f"Total text egress for a full read: {total_before:,} -> {total_after:,} bytes ({saved:.0%} smaller)")
+
+
+if __name__ == "__main__":
+    main()
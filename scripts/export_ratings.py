@@ -0,0 +1,144 @@
+"""Export the ratings dataset for ML training with constant memory.
+
+Pages through `ratings` with keyset pagination (ordered by id) in fixed-size
+chunks, decodes compressed text, and streams each chunk to gzip-compressed
+JSONL or Parquet. A watermark file records the last exported id so later runs
+only export new ratings. Reads from the backend selected by STORAGE_BACKEND.
+
+Usage:
+    python -m scripts.export_ratings --output ratings.jsonl.gz
+    python -m scripts.export_ratings --format parquet --output ratings.parquet
+    python -m scripts.export_ratings --full --output ratings-all.jsonl.gz
+    STORAGE_BACKEND=sqlite python -m scripts.export_ratings --output ratings.jsonl.gz
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+from datetime import datetime
+
+from codec import decode_text
+from scripts.common import service_storage
+
+DEFAULT_WATERMARK = "ratings_export.watermark.json"
+
+# Columns included in every exported row, in order
+EXPORT_FIELDS = [
+    "id", "user_id", "rating", "company", "role", "timestamp",
+    "resume_text", "job_description", "why_want_job", "cover_letter"
+]
+
+
+def read_watermark(path):
+    """Return the last exported rating id, or None for a full export."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get("last_id")
+
+
+def write_watermark(path, last_id, rows_exported):
+    """Record how far the export got (written atomically)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "last_id": last_id,
+            "rows_exported": rows_exported,
+            "exported_at": datetime.now().isoformat(timespec="seconds")
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def iter_rating_chunks(storage, after_id=None, chunk_size=500):
+    """Yield lists of rating rows with id > after_id, one page at a time."""
+    last_id = after_id
+    while True:
+        rows = storage.page_ratings(last_id, chunk_size)
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+
+
+def export_rows(rows):
+    """The exported fields of each rating, with compressed text decoded."""
+    return [{field: decode_text(row.get(field)) for field in EXPORT_FIELDS} for row in rows]
+
+
+class JsonlGzipWriter:
+    """Streams rows to a gzip-compressed JSON Lines file."""
+
+    def __init__(self, path):
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False))
+            self._file.write("\n")
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Streams rows to a zstd-compressed Parquet file, one row group per chunk."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Parquet export needs pyarrow: pip install pyarrow")
+        self._pa = pa
+        self._schema = pa.schema([(field, pa.string()) for field in EXPORT_FIELDS])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, rows):
+        columns = {
+            field: [None if row[field] is None else str(row[field]) for row in rows]
+            for field in EXPORT_FIELDS
+        }
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def export(storage, writer, after_id=None, chunk_size=500):
+    """Stream ratings after `after_id` through `writer`. Returns (rows, last_id)."""
+    exported = 0
+    last_id = after_id
+    for rows in iter_rating_chunks(storage, after_id, chunk_size):
+        writer.write(export_rows(rows))
+        exported += len(rows)
+        last_id = rows[-1]["id"]
+        print(f"Exported {exported} rating(s) (through id {last_id})", file=sys.stderr)
+    return exported, last_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="destination file")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--chunk-size", type=int, default=500, help="rows fetched per page")
+    parser.add_argument("--watermark-file", default=DEFAULT_WATERMARK)
+    parser.add_argument("--full", action="store_true", help="ignore the watermark and export everything")
+    args = parser.parse_args()
+
+    after_id = None if args.full else read_watermark(args.watermark_file)
+    writer = ParquetWriter(args.output) if args.format == "parquet" else JsonlGzipWriter(args.output)
+    try:
+        exported, last_id = export(service_storage(), writer, after_id, args.chunk_size)
+    finally:
+        writer.close()
+
+    # Only advance the watermark once the file is complete
+    if exported:
+        write_watermark(args.watermark_file, last_id, exported)
+    print(f"Done. {exported} rating(s) written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
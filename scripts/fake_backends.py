@@ -0,0 +1,249 @@
+"""In-process stand-ins for the Anthropic and Supabase clients.
+
+Used by the load-test harness so sessions can be driven through app.py
+without network access or API spend. Each call sleeps for a configurable
+latency to model the real services, and returns objects shaped like the
+SDK responses that app.py reads. Supabase writes land in process-wide
+in-memory tables, which `seed` can pre-populate.
+
+`messages.batches` is a fake Message Batches endpoint: a batch ends
+`batch_latency` seconds after it is created and every request in it
+succeeds. Batches are kept per process, so submitting and collecting must
+happen in the same run.
+
+`install(llm_latency, db_latency, batch_latency)` patches
+`anthropic.Anthropic` and `supabase.create_client`, so it must run before
+app.py (or a script using them) is executed.
+"""
+
+import itertools
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import anthropic
+import supabase
+
+FAKE_LETTER = """October 19, 2026
+
+123 Main Street, Springfield, IL 62701
+
+
+Hiring Manager
+Acme Corp
+
+Dear Hiring Manager,
+
+I am writing to apply for the Data Analyst position at Acme Corp. I have followed Acme's work on supply chain analytics for several years, and the chance to help turn that data into better decisions for your customers is exactly the kind of work I want to be doing.
+
+During my internship at a regional logistics company I built a data pipeline in Python and SQL that cut report processing time by 60%, and I wrote unit tests that brought the codebase to 95% coverage. I also rebuilt the weekly operations dashboard so that managers could see late shipments by route, which helped the team reduce delays by a fifth over one quarter. At university, my research on natural language processing taught me to design careful experiments, document my assumptions and move methodically from a prototype to something other people can rely on.
+
+What draws me to Acme is the way your teams share their analysis openly and treat data quality as everyone's job. I work best in that kind of environment, where questions are welcome and results are checked twice, and I would bring the same care and curiosity to your analytics group.
+
+Thank you for your time and consideration. I would welcome the opportunity to discuss how my experience with pipelines, dashboards and research could contribute to Acme's analytics work.
+
+Sincerely,
+
+
+Jane Smith"""
+
+
+def _message(text, request):
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+    return SimpleNamespace(
+        id="msg_fake",
+        type="message",
+        role="assistant",
+        model=request.get("model"),
+        content=[SimpleNamespace(type="text", text=text)],
+        stop_reason="end_turn",
+        usage=SimpleNamespace(input_tokens=prompt_chars // 4, output_tokens=len(text) // 4)
+    )
+
+
+class _FakeStream:
+    """Context manager mimicking `messages.stream`: one delta event, then the final message."""
+
+    def __init__(self, message, latency):
+        self._message = message
+        self._latency = latency
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        time.sleep(self._latency)
+        yield SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(text=self._message.content[0].text))
+
+    def close(self):
+        pass
+
+    def get_final_message(self):
+        return self._message
+
+
+class FakeBatches:
+    """Stand-in for `messages.batches` shared by every fake client in the process."""
+
+    latency = 0.0
+    batches = {}  # id -> (created_at, requests)
+    lock = threading.Lock()
+    ids = itertools.count(1)
+
+    def __init__(self, text=FAKE_LETTER):
+        self.text = text
+
+    def create(self, requests, **kwargs):
+        with self.lock:
+            batch_id = f"msgbatch_fake{next(self.ids):06d}"
+            self.batches[batch_id] = (time.time(), list(requests))
+        return self.retrieve(batch_id)
+
+    def retrieve(self, batch_id, **kwargs):
+        with self.lock:
+            created_at, requests = self.batches[batch_id]
+        ended = time.time() - created_at >= self.latency
+        return SimpleNamespace(
+            id=batch_id,
+            type="message_batch",
+            processing_status="ended" if ended else "in_progress",
+            request_counts=SimpleNamespace(
+                processing=0 if ended else len(requests),
+                succeeded=len(requests) if ended else 0,
+                errored=0, canceled=0, expired=0
+            ),
+            created_at=datetime.fromtimestamp(created_at, timezone.utc),
+            ended_at=datetime.fromtimestamp(created_at + self.latency, timezone.utc) if ended else None
+        )
+
+    def results(self, batch_id, **kwargs):
+        with self.lock:
+            _, requests = self.batches[batch_id]
+        for request in requests:
+            yield SimpleNamespace(
+                custom_id=request["custom_id"],
+                result=SimpleNamespace(type="succeeded", message=_message(self.text, request["params"]))
+            )
+
+
+class FakeMessages:
+    def __init__(self, latency, text=FAKE_LETTER):
+        self.latency = latency
+        self.text = text
+        self.calls = 0
+        self.batches = FakeBatches(text)
+
+    def create(self, **request):
+        self.calls += 1
+        time.sleep(self.latency)
+        return _message(self.text, request)
+
+    def stream(self, **request):
+        self.calls += 1
+        return _FakeStream(_message(self.text, request), self.latency)
+
+
+class FakeModels:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def list(self, **kwargs):
+        time.sleep(self.latency)
+        return SimpleNamespace(data=[SimpleNamespace(id="claude-3-haiku-20240307", type="model")])
+
+
+class FakeAnthropic:
+    """Replacement for `anthropic.Anthropic` with a fixed per-call latency."""
+
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        self.messages = FakeMessages(self.latency)
+        self.models = FakeModels(self.latency)
+
+
+class FakeQuery:
+    """Chainable query builder over the in-memory tables.
+
+    Filters are ignored (every read returns the table's rows, up to `limit`)
+    and updates and deletes are no-ops, which is enough for single-user
+    scenarios and for timing.
+    """
+
+    def __init__(self, db, table, inserted=None):
+        self._db = db
+        self._table = table
+        self._inserted = inserted
+        self._limit = None
+
+    def insert(self, payload, *args, **kwargs):
+        return FakeQuery(self._db, self._table, payload)
+
+    def limit(self, count, *args, **kwargs):
+        self._limit = count
+        return self
+
+    def __getattr__(self, name):
+        # select, update, delete, eq, order, gt, is_, in_, overlaps, range, ...
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(self._db.latency)
+        with self._db.lock:
+            rows = self._db.tables.setdefault(self._table, [])
+            if self._inserted is not None:
+                row = {"id": next(self._db.ids), **self._inserted}
+                rows.append(row)
+                return SimpleNamespace(data=[row], count=1)
+            data = [dict(row) for row in rows[:self._limit]]
+        return SimpleNamespace(data=data, count=len(data))
+
+
+class FakeAuth:
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            time.sleep(self._db.latency)
+            return SimpleNamespace(user=None, session=None)
+        return call
+
+
+class FakeSupabase:
+    """Replacement for a Supabase client backed by in-memory tables shared by all clients."""
+
+    latency = 0.0
+    tables = {}
+    lock = threading.Lock()
+    ids = itertools.count(1)
+
+    def __init__(self, *args, **kwargs):
+        self.auth = FakeAuth(self)
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return FakeQuery(self, name)
+
+
+def seed(table, rows):
+    """Add rows to a fake table (ids are assigned when missing)."""
+    with FakeSupabase.lock:
+        FakeSupabase.tables.setdefault(table, []).extend(
+            {"id": next(FakeSupabase.ids), **row} for row in rows
+        )
+
+
+def install(llm_latency=0.0, db_latency=0.0, batch_latency=0.0):
+    """Route app.py's Anthropic and Supabase clients to the fakes."""
+    FakeAnthropic.latency = llm_latency
+    FakeSupabase.latency = db_latency
+    FakeBatches.latency = batch_latency
+    anthropic.Anthropic = FakeAnthropic
+    supabase.create_client = FakeSupabase
@@ -0,0 +1,209 @@
+"""Drive N concurrent simulated sessions through app.py and measure reruns.
+
+Each session runs the guest journey with Streamlit's AppTest: home page,
+guest mode, sample data, generate a cover letter, re-render the exports,
+then answer an application question. Anthropic and Supabase are replaced by
+in-process fakes with configurable latency (scripts/fake_backends.py), so
+the numbers reflect the app's own rerun cost plus simulated backend time.
+
+For each N the harness reports rerun latency percentiles, journeys and
+reruns per second, and the process RSS. All sessions share one process,
+like a single Streamlit server.
+
+Usage:
+    python -m scripts.load_test [--sessions 1 5 10 20] [--llm-latency 1.5] [--db-latency 0.05]
+        [--setting NAME=VALUE ...]
+"""
+
+import argparse
+import os
+import resource
+import statistics
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from scripts import fake_backends
+
+APP_PATH = str(Path(__file__).resolve().parent.parent / "app.py")
+STEPS = ["home", "get_started", "guest", "sample_data", "generate", "export", "answer"]
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if peak > 1 << 30 else peak / 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def share_apptest_runtime(secrets):
+    """Let many AppTest sessions run concurrently in one process, like a server.
+
+    AppTest assumes one test at a time: every run installs and then clears a
+    global mock Runtime, swaps st.secrets, and compiles the script into its
+    own cache. Here the first run's Runtime stays installed for everyone,
+    secrets are set once globally, and app.py is compiled once (compiling it
+    from many threads at once also trips a CPython 3.11 ast bug).
+    """
+    import streamlit as st
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1 import app_test
+
+    class PinnedInstance(type):
+        @property
+        def _instance(cls):
+            return Runtime._instance
+
+        @_instance.setter
+        def _instance(cls, value):
+            if value is not None and Runtime._instance is None:
+                Runtime._instance = value
+
+    class PinnedRuntime(Runtime, metaclass=PinnedInstance):
+        pass
+
+    app_test.Runtime = PinnedRuntime
+
+    shared_secrets = Secrets()
+    shared_secrets._secrets = dict(secrets)
+    st.secrets = shared_secrets
+
+    shared_cache = ScriptCache()
+    get_bytecode = ScriptCache.get_bytecode
+    ScriptCache.get_bytecode = lambda self, script_path: get_bytecode(shared_cache, script_path)
+
+
+def _click(at, label):
+    return next(button for button in at.button if button.label == label).click()
+
+
+def run_journey(timeout):
+    """Run one session's journey. Returns ({step: seconds}, error or None)."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timings = {}
+
+    def step(name, action):
+        start = time.perf_counter()
+        action()
+        timings[name] = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].value}\n" + "\n".join(at.exception[0].stack_trace[-4:]))
+
+    try:
+        step("home", at.run)
+        step("get_started", lambda: _click(at, "Get Started").run())
+        step("guest", lambda: _click(at, "Continue as Guest").run())
+        step("sample_data", lambda: _click(at, "Use Sample Data").run())
+        step("generate", lambda: _click(at, "Generate Cover Letter").run())
+        if "last_cover_letter" not in at.session_state:
+            raise RuntimeError("generate: no letter (" + "; ".join(e.value for e in at.error) + ")")
+        # A plain rerun re-renders the .docx/.pdf downloads for the letter
+        step("export", at.run)
+        at.text_area(key="app_question_input").input("Why are you interested in working here?")
+        step("answer", lambda: _click(at, "Generate Answer").run())
+        return timings, None
+    except Exception as e:
+        return timings, f"{type(e).__name__}: {e}"
+
+
+def run_level(sessions, timeout):
+    """Run `sessions` journeys concurrently and summarize them."""
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        outcome = run_journey(timeout)
+        with lock:
+            results.append(outcome)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    by_step = defaultdict(list)
+    for timings, _ in results:
+        for name, seconds in timings.items():
+            by_step[name].append(seconds)
+    reruns = [seconds for values in by_step.values() for seconds in values]
+    errors = [error for _, error in results if error]
+    return {
+        "sessions": sessions,
+        "elapsed": elapsed,
+        "reruns": len(reruns),
+        "p50": percentile(reruns, 50),
+        "p95": percentile(reruns, 95),
+        "p99": percentile(reruns, 99),
+        "max": max(reruns, default=0.0),
+        "journeys_per_s": (len(results) - len(errors)) / elapsed,
+        "reruns_per_s": len(reruns) / elapsed,
+        "rss_mb": rss_mb(),
+        "errors": errors,
+        "step_p50": {name: statistics.median(by_step[name]) for name in STEPS if by_step[name]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 20], help="concurrency levels to run")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="seconds per fake Claude call")
+    parser.add_argument("--db-latency", type=float, default=0.05, help="seconds per fake Supabase call")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per rerun")
+    parser.add_argument("--setting", action="append", default=[], metavar="NAME=VALUE",
+                        help="app setting passed as a secret, e.g. --setting HEDGE_ENABLED=true")
+    args = parser.parse_args()
+    # The fakes ignore the Supabase credentials, but app.py reads them from secrets
+    # AppTest sessions have no IP, so they would all share one guest quota
+    settings = {"SUPABASE_URL": "https://fake.supabase.co", "SUPABASE_KEY": "fake", "QUOTA_GUEST_LIMIT": "1000000"}
+    settings.update(item.split("=", 1) for item in args.setting)
+
+    os.environ.setdefault("ANTHROPIC_API_KEY", "fake")
+    fake_backends.install(args.llm_latency, args.db_latency)
+    share_apptest_runtime(settings)
+
+    # One unmeasured journey compiles app.py and fills the shared resource caches
+    _, error = run_journey(args.timeout)
+    if error:
+        raise SystemExit(f"Warm-up journey failed: {error}")
+    # Per-rerun warnings (bare-mode threads, widget policies) would drown the
+    # report; set after warm-up so loggers created by app imports are included
+    from streamlit import logger
+    logger.set_log_level("error")
+
+    print(f"LLM latency {args.llm_latency}s, DB latency {args.db_latency}s")
+    print(f"{'N':>4} {'reruns':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'max s':>7} "
+          f"{'journeys/s':>11} {'reruns/s':>9} {'RSS MB':>8} {'errors':>7}")
+    for sessions in args.sessions:
+        level = run_level(sessions, args.timeout)
+        print(f"{level['sessions']:>4} {level['reruns']:>7} {level['p50']:>7.3f} {level['p95']:>7.3f} "
+              f"{level['p99']:>7.3f} {level['max']:>7.3f} {level['journeys_per_s']:>11.2f} "
+              f"{level['reruns_per_s']:>9.2f} {level['rss_mb']:>8.1f} {len(level['errors']):>7}")
+        print("     step p50: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in level["step_p50"].items()))
+        for error in sorted(set(level["errors"]))[:3]:
+            print(f"     error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Compact session storage: a shared, deduplicated text store and size diagnostics.
+
+Sessions keep short hash references instead of their own copies of large text
+(resume, job description). Identical text held by many sessions is stored
+once. The store is bounded by bytes and evicts least-recently-used text, but
+never text that a session read or wrote recently (its holder), so a live
+session's reference always resolves. A reference that no longer resolves
+raises TextMissing rather than reading as empty text.
+
+With a shared key-value store (kv_store.connect), new text is also written
+there under `text:<ref>` with a TTL, so a reference saved by one replica
+resolves on another, and local misses are filled from it. If the shared
+store is unreachable, the local copy is used (or the read is a miss) and the
+failure is counted.
+"""
+
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from kv_store import pack, unpack
+
+
+class TextMissing(KeyError):
+    """A text reference was evicted (and isn't in the shared store) or was never stored here."""
+
+
+class TextStore:
+    """Process-wide content-addressed store for large session text."""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, kv=None, ttl=86400, hold_seconds=3600):
+        self._texts = OrderedDict()
+        self._holders = {}  # ref -> {holder: last time that holder used it}
+        self._hold_seconds = hold_seconds
+        self._bytes = 0
+        self._max_bytes = max_bytes
+        self._kv = kv
+        self._ttl = ttl
+        self._shared_at = {}  # ref -> when its shared copy was last written or refreshed
+        self._lock = threading.Lock()
+        self.stats = {"puts": 0, "deduplicated": 0, "evicted": 0, "misses": 0, "shared_reads": 0, "shared_errors": 0,
+                      "over_budget": 0}
+
+    def _hold(self, ref, holder, now):
+        # Caller holds the lock
+        if holder is not None:
+            self._holders.setdefault(ref, {})[holder] = now
+
+    def _held(self, ref, now):
+        # Caller holds the lock. Drops holders that haven't used the text for hold_seconds
+        holders = self._holders.get(ref)
+        if not holders:
+            return False
+        for holder, seen in list(holders.items()):
+            if now - seen > self._hold_seconds:
+                del holders[holder]
+        if not holders:
+            del self._holders[ref]
+            return False
+        return True
+
+    def _keep(self, ref, text, now):
+        # Caller holds the lock. Evicts least recently used text that no live session holds
+        self._texts[ref] = text
+        self._bytes += sys.getsizeof(text)
+        if self._bytes <= self._max_bytes:
+            return
+        for candidate in list(self._texts):
+            if self._bytes <= self._max_bytes:
+                return
+            if candidate == ref or self._held(candidate, now):
+                continue
+            evicted = self._texts.pop(candidate)
+            self._shared_at.pop(candidate, None)
+            self._bytes -= sys.getsizeof(evicted)
+            self.stats["evicted"] += 1
+        # Everything left is in use: go over the cap rather than drop a live session's text
+        self.stats["over_budget"] += 1
+
+    def put(self, text, holder=None):
+        """Store `text` and return its reference (None for empty text).
+
+        `holder` (a session id) keeps the text from being evicted while that
+        holder keeps using it.
+        """
+        if not text:
+            return None
+        ref = hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+        now = time.time()
+        with self._lock:
+            self.stats["puts"] += 1
+            self._hold(ref, holder, now)
+            known = ref in self._texts
+            if known:
+                self._texts.move_to_end(ref)
+                self.stats["deduplicated"] += 1
+            else:
+                self._keep(ref, text, now)
+            # Text put on every rerun keeps its shared copy alive, but refreshes it only now and then
+            share = self._kv is not None and now - self._shared_at.get(ref, 0) > self._ttl / 4
+            if share:
+                self._shared_at[ref] = now
+        if share:
+            try:
+                if not (known and self._kv.expire(f"text:{ref}", self._ttl)):
+                    self._kv.set(f"text:{ref}", pack(text), ex=self._ttl)
+            except Exception:
+                # Keep the local copy and try to share it again on the next put
+                with self._lock:
+                    self._shared_at.pop(ref, None)
+                    self.stats["shared_errors"] += 1
+        return ref
+
+    def get(self, ref, holder=None):
+        """Return the text for `ref` ("" for no reference). Raises TextMissing if it's gone."""
+        if not ref:
+            return ""
+        now = time.time()
+        with self._lock:
+            text = self._texts.get(ref)
+            if text is not None:
+                self._hold(ref, holder, now)
+                self._texts.move_to_end(ref)
+                return text
+        text = None
+        if self._kv is not None:
+            try:
+                text = unpack(self._kv.get(f"text:{ref}"))
+            except Exception:
+                with self._lock:
+                    self.stats["shared_errors"] += 1
+        with self._lock:
+            if text is None:
+                self.stats["misses"] += 1
+                raise TextMissing(ref)
+            self.stats["shared_reads"] += 1
+            self._hold(ref, holder, now)
+            if ref not in self._texts:
+                self._keep(ref, text, now)
+        return text
+
+    def summary(self):
+        with self._lock:
+            return {"texts": len(self._texts), "bytes": self._bytes, "held": len(self._holders), **self.stats}
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate memory held by `obj` and everything it references."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+class SessionFootprints:
+    """Last measured session-state size per session, for process-wide totals."""
+
+    def __init__(self, max_age=3600):
+        self._sizes = {}
+        self._max_age = max_age
+        self._lock = threading.Lock()
+
+    def record(self, session_id, nbytes):
+        with self._lock:
+            self._sizes[session_id] = (nbytes, time.time())
+
+    def summary(self):
+        """Active sessions (seen within max_age) and their total bytes."""
+        cutoff = time.time() - self._max_age
+        with self._lock:
+            for session_id in [s for s, (_, seen) in self._sizes.items() if seen < cutoff]:
+                del self._sizes[session_id]
+            sizes = [nbytes for nbytes, _ in self._sizes.values()]
+        return {
+            "sessions": len(sizes),
+            "total_bytes": sum(sizes),
+            "largest_bytes": max(sizes, default=0),
+        }
@@ -0,0 +1,480 @@
+"""Storage backends for profiles, resumes, cover letters, ratings and generation batches.
+
+`SupabaseStorage` wraps a (per-user) Supabase client and issues the same
+queries the app always has. `SQLiteStorage` keeps everything in one local
+database file for self-hosted single-node deployments and for running the
+test and benchmark scripts without a network. Both return rows as plain
+dicts with the same keys, so app.py doesn't care which one is configured.
+
+Sign-in still goes through Supabase Auth; only the app's data moves.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+
+
+class SupabaseStorage:
+    """Storage on Supabase tables (see migrations/ for the schema)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    # Profiles
+
+    def get_profile(self, user_id):
+        rows = self.client.table("profiles").select("*").eq("id", user_id).execute().data
+        return rows[0] if rows else None
+
+    def save_profile(self, user_id, profile):
+        profile = {**profile, "id": user_id}
+        existing = self.client.table("profiles").select("id").eq("id", user_id).execute()
+        if existing.data:
+            self.client.table("profiles").update(profile).eq("id", user_id).execute()
+        else:
+            self.client.table("profiles").insert(profile).execute()
+
+    # Resumes
+
+    def list_resumes(self, user_id, columns="*"):
+        """A user's resumes, newest first."""
+        return self.client.table("resumes").select(columns).eq("user_id", user_id) \
+            .order("date_saved", desc=True).execute().data or []
+
+    def get_resume(self, user_id, resume_id, columns="*"):
+        rows = self.client.table("resumes").select(columns).eq("user_id", user_id).eq("id", resume_id).execute().data
+        return rows[0] if rows else None
+
+    def insert_resume(self, row):
+        self.client.table("resumes").insert(row).execute()
+
+    # Cover letters
+
+    def list_cover_letters(self, user_id, columns="*"):
+        """A user's cover letters, newest first."""
+        return self.client.table("cover_letters").select(columns).eq("user_id", user_id) \
+            .order("date_created", desc=True).execute().data or []
+
+    def get_cover_letter(self, cover_letter_id, columns="*", user_id=None):
+        query = self.client.table("cover_letters").select(columns).eq("id", cover_letter_id)
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+        rows = query.execute().data
+        return rows[0] if rows else None
+
+    def page_cover_letters(self, user_id, columns="*", after_id=None, limit=50):
+        """One page of a user's cover letters in id order (keyset pagination)."""
+        query = self.client.table("cover_letters").select(columns).eq("user_id", user_id)
+        if after_id is not None:
+            query = query.gt("id", after_id)
+        return query.order("id").limit(limit).execute().data or []
+
+    def dependent_cover_letters(self, user_id, cover_letter_id, columns="*"):
+        """Letters stored as a delta against `cover_letter_id`."""
+        return self.client.table("cover_letters").select(columns).eq("reference_id", cover_letter_id) \
+            .eq("user_id", user_id).execute().data or []
+
+    def similar_cover_letters(self, user_id, bands, columns="*"):
+        """Fully stored letters sharing at least one LSH band key."""
+        return self.client.table("cover_letters").select(columns).eq("user_id", user_id) \
+            .is_("reference_id", "null").overlaps("lsh_bands", bands).execute().data or []
+
+    def insert_cover_letter(self, row):
+        self.client.table("cover_letters").insert(row).execute()
+
+    def update_cover_letter(self, user_id, cover_letter_id, fields):
+        """Update one of the user's letters. Returns False if they have no letter with that id."""
+        return bool(self.client.table("cover_letters").update(fields).eq("id", cover_letter_id)
+                    .eq("user_id", user_id).execute().data)
+
+    def delete_cover_letter(self, user_id, cover_letter_id):
+        self.client.table("cover_letters").delete().eq("id", cover_letter_id).eq("user_id", user_id).execute()
+
+    def search_cover_letters(self, user_id, query, limit=10, offset=0):
+        """Ranked hits with a snippet and the total match count (search_cover_letters RPC)."""
+        return self.client.rpc("search_cover_letters", {
+            "p_user_id": user_id,
+            "p_query": query,
+            "p_limit": limit,
+            "p_offset": offset
+        }).execute().data or []
+
+    # Ratings
+
+    def insert_rating(self, row):
+        self.client.table("ratings").insert(row).execute()
+
+    def page_ratings(self, after_id=None, limit=500):
+        """One page of every user's ratings in id order (keyset pagination)."""
+        query = self.client.table("ratings").select("*")
+        if after_id is not None:
+            query = query.gt("id", after_id)
+        return query.order("id").limit(limit).execute().data or []
+
+    # Generation batches
+
+    def insert_batch(self, row):
+        self.client.table("generation_batches").insert(row).execute()
+
+    def get_batch(self, batch_id):
+        rows = self.client.table("generation_batches").select("*").eq("id", batch_id).execute().data
+        return rows[0] if rows else None
+
+    def open_batches(self):
+        """Batches whose results have not been written back yet, oldest first."""
+        return self.client.table("generation_batches").select("*").neq("status", "written") \
+            .order("created_at").execute().data or []
+
+    def update_batch(self, batch_id, fields):
+        self.client.table("generation_batches").update(fields).eq("id", batch_id).execute()
+
+
+SQLITE_SCHEMA = """
+create table if not exists profiles (
+    id text primary key,
+    linkedin_url text,
+    github_url text,
+    portfolio_url text,
+    candidate_name text,
+    candidate_address text,
+    default_length text,
+    default_tone text
+);
+
+create table if not exists resumes (
+    id integer primary key autoincrement,
+    user_id text not null,
+    resume_name text,
+    resume_address text,
+    resume_text text,
+    date_saved text not null default (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+    text_hash text,
+    structured text
+);
+create index if not exists resumes_user_date_idx on resumes (user_id, date_saved desc);
+create index if not exists resumes_text_hash_idx on resumes (user_id, text_hash);
+
+create table if not exists cover_letters (
+    id integer primary key autoincrement,
+    user_id text not null,
+    company text,
+    role text,
+    cover_letter text,
+    date_created text,
+    reference_id integer,
+    delta text,
+    minhash text
+);
+create index if not exists cover_letters_user_date_idx on cover_letters (user_id, date_created desc);
+create index if not exists cover_letters_user_id_idx on cover_letters (user_id, id);
+create index if not exists cover_letters_reference_idx on cover_letters (reference_id);
+
+-- One row per LSH band key, standing in for the lsh_bands array and its GIN index
+create table if not exists cover_letter_bands (
+    cover_letter_id integer not null references cover_letters (id) on delete cascade,
+    user_id text not null,
+    band text not null
+);
+create index if not exists cover_letter_bands_lookup_idx on cover_letter_bands (user_id, band);
+create index if not exists cover_letter_bands_letter_idx on cover_letter_bands (cover_letter_id);
+
+-- Company and role rank above the body, as in the Postgres search vector
+create virtual table if not exists cover_letters_fts using fts5 (
+    company, role, body, tokenize = 'porter unicode61'
+);
+
+create table if not exists ratings (
+    id integer primary key autoincrement,
+    user_id text not null,
+    rating text,
+    cover_letter text,
+    resume_text text,
+    job_description text,
+    why_want_job text,
+    company text,
+    role text,
+    timestamp text
+);
+create index if not exists ratings_user_idx on ratings (user_id);
+
+create table if not exists generation_batches (
+    id text primary key,
+    status text not null default 'in_progress',
+    created_at text not null default (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+    ended_at text,
+    request_count integer not null default 0,
+    jobs text not null default '{}',
+    summary text
+);
+create index if not exists generation_batches_status_idx on generation_batches (status, created_at);
+"""
+
+# Columns holding lists or dicts, stored as JSON text
+JSON_COLUMNS = {"structured", "minhash", "delta", "jobs", "summary"}
+
+# Column names accepted on insert/update, per table
+TABLE_COLUMNS = {
+    "profiles": ["id", "linkedin_url", "github_url", "portfolio_url", "candidate_name",
+                 "candidate_address", "default_length", "default_tone"],
+    "resumes": ["user_id", "resume_name", "resume_address", "resume_text", "date_saved", "text_hash", "structured"],
+    "cover_letters": ["user_id", "company", "role", "cover_letter", "date_created", "reference_id", "delta", "minhash"],
+    "ratings": ["user_id", "rating", "cover_letter", "resume_text", "job_description", "why_want_job",
+                "company", "role", "timestamp"],
+    "generation_batches": ["id", "status", "created_at", "ended_at", "request_count", "jobs", "summary"],
+}
+
+_COLUMN_LIST = re.compile(r"^\*$|^\w+(\s*,\s*\w+)*$")
+_SEARCH_TERM = re.compile(r"\w+")
+
+
+def _select(columns, table):
+    """Validated select list for the app's column constants ("*" or "a, b, c")."""
+    if not _COLUMN_LIST.match(columns.strip()):
+        raise ValueError(f"invalid column list for {table}: {columns!r}")
+    return columns
+
+
+def _encode(row, table):
+    """Known columns of `row` with JSON columns serialized."""
+    return {
+        key: json.dumps(value) if key in JSON_COLUMNS and value is not None else value
+        for key, value in row.items() if key in TABLE_COLUMNS[table]
+    }
+
+
+def _decode(row):
+    data = dict(row)
+    for key in JSON_COLUMNS & data.keys():
+        if data[key] is not None:
+            data[key] = json.loads(data[key])
+    return data
+
+
+def _search_body(row):
+    """Plain text to index for a letter (compressed bodies send it in search_text)."""
+    if row.get("search_text") is not None:
+        return row["search_text"]
+    body = row.get("cover_letter") or ""
+    return "" if body.startswith("~cz~") else body
+
+
+def fts_query(query):
+    """Turn free text into an FTS5 query matching every word (like websearch_to_tsquery)."""
+    return " ".join(f'"{term}"' for term in _SEARCH_TERM.findall(query))
+
+
+class SQLiteStorage:
+    """Storage in a local SQLite database (WAL mode, one connection per thread).
+
+    Statements use fixed SQL with bound parameters, so sqlite3's per-connection
+    statement cache reuses the prepared statements across calls.
+    """
+
+    def __init__(self, path, statement_cache=256):
+        self.path = path
+        self._statement_cache = statement_cache
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SQLITE_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, cached_statements=self._statement_cache)
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma journal_mode = wal")
+            conn.execute("pragma synchronous = normal")
+            conn.execute("pragma foreign_keys = on")
+            self._local.conn = conn
+        return conn
+
+    def _rows(self, sql, params=()):
+        return [_decode(row) for row in self._conn().execute(sql, params).fetchall()]
+
+    def _first(self, sql, params=()):
+        rows = self._rows(sql, params)
+        return rows[0] if rows else None
+
+    def _insert(self, conn, table, row):
+        data = _encode(row, table)
+        names = ", ".join(data)
+        marks = ", ".join("?" for _ in data)
+        return conn.execute(f"insert into {table} ({names}) values ({marks})", list(data.values())).lastrowid
+
+    # Profiles
+
+    def get_profile(self, user_id):
+        return self._first("select * from profiles where id = ?", (user_id,))
+
+    def save_profile(self, user_id, profile):
+        data = _encode({**profile, "id": user_id}, "profiles")
+        names = ", ".join(data)
+        marks = ", ".join("?" for _ in data)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in data if name != "id")
+        with self._conn() as conn:
+            conn.execute(
+                f"insert into profiles ({names}) values ({marks}) on conflict (id) do update set {updates}",
+                list(data.values())
+            )
+
+    # Resumes
+
+    def list_resumes(self, user_id, columns="*"):
+        return self._rows(
+            f"select {_select(columns, 'resumes')} from resumes where user_id = ? order by date_saved desc, id desc",
+            (user_id,)
+        )
+
+    def get_resume(self, user_id, resume_id, columns="*"):
+        return self._first(
+            f"select {_select(columns, 'resumes')} from resumes where user_id = ? and id = ?",
+            (user_id, resume_id)
+        )
+
+    def insert_resume(self, row):
+        with self._conn() as conn:
+            self._insert(conn, "resumes", row)
+
+    # Cover letters
+
+    def list_cover_letters(self, user_id, columns="*"):
+        return self._rows(
+            f"select {_select(columns, 'cover_letters')} from cover_letters where user_id = ? "
+            "order by date_created desc, id desc",
+            (user_id,)
+        )
+
+    def get_cover_letter(self, cover_letter_id, columns="*", user_id=None):
+        if user_id is None:
+            return self._first(f"select {_select(columns, 'cover_letters')} from cover_letters where id = ?", (cover_letter_id,))
+        return self._first(
+            f"select {_select(columns, 'cover_letters')} from cover_letters where id = ? and user_id = ?",
+            (cover_letter_id, user_id)
+        )
+
+    def page_cover_letters(self, user_id, columns="*", after_id=None, limit=50):
+        return self._rows(
+            f"select {_select(columns, 'cover_letters')} from cover_letters where user_id = ? and id > ? "
+            "order by id limit ?",
+            (user_id, after_id if after_id is not None else -1, limit)
+        )
+
+    def dependent_cover_letters(self, user_id, cover_letter_id, columns="*"):
+        return self._rows(
+            f"select {_select(columns, 'cover_letters')} from cover_letters where reference_id = ? and user_id = ?",
+            (cover_letter_id, user_id)
+        )
+
+    def similar_cover_letters(self, user_id, bands, columns="*"):
+        if not bands:
+            return []
+        marks = ", ".join("?" for _ in bands)
+        return self._rows(
+            f"select {_select(columns, 'cover_letters')} from cover_letters where id in ("
+            f"select cover_letter_id from cover_letter_bands where user_id = ? and band in ({marks})"
+            ") and reference_id is null",
+            (user_id, *bands)
+        )
+
+    def insert_cover_letter(self, row):
+        with self._conn() as conn:
+            cover_letter_id = self._insert(conn, "cover_letters", row)
+            conn.executemany(
+                "insert into cover_letter_bands (cover_letter_id, user_id, band) values (?, ?, ?)",
+                [(cover_letter_id, row["user_id"], band) for band in row.get("lsh_bands") or []]
+            )
+            conn.execute(
+                "insert into cover_letters_fts (rowid, company, role, body) values (?, ?, ?, ?)",
+                (cover_letter_id, row.get("company") or "", row.get("role") or "", _search_body(row))
+            )
+
+    def update_cover_letter(self, user_id, cover_letter_id, fields):
+        data = _encode(fields, "cover_letters")
+        with self._conn() as conn:
+            owned = conn.execute(
+                "select 1 from cover_letters where id = ? and user_id = ?", (cover_letter_id, user_id)
+            ).fetchone()
+            if not owned:
+                return False
+            if data:
+                assignments = ", ".join(f"{name} = ?" for name in data)
+                conn.execute(
+                    f"update cover_letters set {assignments} where id = ? and user_id = ?",
+                    [*data.values(), cover_letter_id, user_id]
+                )
+            if fields.get("lsh_bands") is not None:
+                conn.execute("delete from cover_letter_bands where cover_letter_id = ?", (cover_letter_id,))
+                conn.execute(
+                    "insert into cover_letter_bands (cover_letter_id, user_id, band) "
+                    "select c.id, c.user_id, bands.value from cover_letters c, json_each(?) bands where c.id = ?",
+                    (json.dumps(fields["lsh_bands"]), cover_letter_id)
+                )
+            # Like the Postgres trigger, only new plain text changes the search index
+            if fields.get("search_text") is not None:
+                conn.execute("update cover_letters_fts set body = ? where rowid = ?", (fields["search_text"], cover_letter_id))
+        return True
+
+    def delete_cover_letter(self, user_id, cover_letter_id):
+        with self._conn() as conn:
+            deleted = conn.execute(
+                "delete from cover_letters where id = ? and user_id = ?", (cover_letter_id, user_id)
+            ).rowcount
+            if deleted:
+                conn.execute("delete from cover_letters_fts where rowid = ?", (cover_letter_id,))
+
+    def search_cover_letters(self, user_id, query, limit=10, offset=0):
+        match = fts_query(query)
+        if not match:
+            return []
+        # bm25 is lower-is-better; rank is negated to match ts_rank's ordering
+        return self._rows(
+            """
+            with hits as (
+                select rowid, bm25(cover_letters_fts, 10.0, 10.0, 1.0) as score,
+                    snippet(cover_letters_fts, 2, '**', '**', '...', 35) as snippet
+                from cover_letters_fts
+                where cover_letters_fts match ?
+            )
+            select c.id, c.company, c.role, c.date_created, hits.snippet,
+                -hits.score as rank, count(*) over () as total_count
+            from hits
+            join cover_letters c on c.id = hits.rowid
+            where c.user_id = ?
+            order by hits.score, c.date_created desc
+            limit ? offset ?
+            """,
+            (match, user_id, limit, offset)
+        )
+
+    # Ratings
+
+    def insert_rating(self, row):
+        with self._conn() as conn:
+            self._insert(conn, "ratings", row)
+
+    def page_ratings(self, after_id=None, limit=500):
+        return self._rows(
+            "select * from ratings where id > ? order by id limit ?",
+            (after_id if after_id is not None else -1, limit)
+        )
+
+    # Generation batches
+
+    def insert_batch(self, row):
+        with self._conn() as conn:
+            self._insert(conn, "generation_batches", row)
+
+    def get_batch(self, batch_id):
+        return self._first("select * from generation_batches where id = ?", (batch_id,))
+
+    def open_batches(self):
+        return self._rows("select * from generation_batches where status <> 'written' order by created_at, id")
+
+    def update_batch(self, batch_id, fields):
+        data = _encode(fields, "generation_batches")
+        if not data:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in data)
+        with self._conn() as conn:
+            conn.execute(f"update generation_batches set {assignments} where id = ?", [*data.values(), batch_id])
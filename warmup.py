@@ -0,0 +1,103 @@
+"""Background warm-up of connections, heavy imports and export templates.
+
+A cold instance pays for several one-time costs on the first user's
+requests: importing the Anthropic SDK, opening TLS connections to Claude
+and the database, building the DOCX/PDF skeletons and loading the PDF
+parser. `Warmer` runs those as named tasks on a daemon thread as soon as the
+process starts serving, then re-runs the connection tasks every `interval`
+seconds so pooled keep-alive connections don't expire between visits.
+
+Progress is kept as a state ("cold", "warming", "warm", or "degraded" when
+a task failed) with per-task timings. With `status_path` the same snapshot
+is written to a JSON file after every change, so something outside the
+process (the keep-alive workflow) can tell a warm instance from a cold one.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class Warmer:
+    """Runs warm-up tasks once in the background, and keeps the `keep_warm` ones warm."""
+
+    def __init__(self, tasks, keep_warm=(), interval=240.0, status_path=None):
+        self.tasks = dict(tasks)
+        self.keep_warm = [name for name in keep_warm if name in self.tasks]
+        self.interval = interval
+        self.status_path = status_path
+        self.state = "cold"
+        self.started_at = None
+        self.warm_after = None
+        self._results = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the warm-up thread; later calls do nothing."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.state = "warming"
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+        self._write_status()
+
+    def _run_task(self, name):
+        start = time.perf_counter()
+        try:
+            self.tasks[name]()
+            result = {"ok": True, "seconds": round(time.perf_counter() - start, 3)}
+        except Exception as e:
+            result = {"ok": False, "seconds": round(time.perf_counter() - start, 3), "error": str(e)[:200]}
+        result["at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self._lock:
+            runs = self._results.get(name, {}).get("runs", 0) + 1
+            self._results[name] = {**result, "runs": runs}
+            done = len(self._results) == len(self.tasks)
+            if done:
+                self.state = "warm" if all(r["ok"] for r in self._results.values()) else "degraded"
+                if self.warm_after is None:
+                    self.warm_after = round(time.time() - self.started_at, 3)
+        self._write_status()
+
+    def _run(self):
+        for name in self.tasks:
+            self._run_task(name)
+        while self.keep_warm and self.interval > 0:
+            time.sleep(self.interval)
+            for name in self.keep_warm:
+                self._run_task(name)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "warm_after_seconds": self.warm_after,
+                "keep_warm_interval": self.interval,
+                "tasks": {name: dict(result) for name, result in self._results.items()},
+                "pending": [name for name in self.tasks if name not in self._results],
+            }
+
+    def _write_status(self):
+        if not self.status_path:
+            return
+        status = {
+            **self.snapshot(),
+            "pid": os.getpid(),
+            "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        try:
+            directory = os.path.dirname(self.status_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Write then rename, so a reader never sees a half-written file
+            temp_path = f"{self.status_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(status, f, indent=2)
+            os.replace(temp_path, self.status_path)
+        except OSError:
+            pass